@@ -2,27 +2,89 @@
 Base Agent Class for AI News Generation
 All specialized agents (Politics, Economics, etc.) inherit from this class
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+import os
 import re
 import random
 import string
 
-from services.openai_service import generate_text, generate_json
+from services.openai_service import generate_json_async, track_usage
 from services.perplexity_service import ResearchResult
+from agents.prompt_builder import build_research_context, max_output_tokens, log_prompt_tokens
+
+# Reviews are near-deterministic (temperature 0.2), so identical drafts reuse the review
+REVIEW_CACHE_TTL = 24 * 3600
+
+REVIEW_CRITERIA = ('headline', 'lead', 'factual_density', 'style', 'readability')
+
+# Static system prompt prefixes, memoized per (agent class, section, writing style).
+# OpenAI only caches prompts whose identical prefix is at least 1024 tokens, and
+# these prefixes are ~250-400 tokens, so each prompt also puts its most stable
+# content (e.g. the research an article's reviews share) before anything that
+# changes between calls (drafts, feedback).
+_system_prefix_cache: Dict[Tuple[str, str, str], str] = {}
+
+ARTICLE_OUTPUT_RULES = """OUTPUT FORMAT:
+- DO NOT USE MARKDOWN HEADERS (##, ###, etc.) IN THE BODY
+- Write in flowing paragraphs with natural transitions between topics
+- Use paragraph breaks to separate ideas, NOT section headers
+- Professional newspaper style - no headers, just clean prose
+- Respond as JSON:
+{
+  "title": "Headline here",
+  "excerpt": "1-2 sentence excerpt/subtitle",
+  "body": "Full article body in clean paragraphs WITHOUT any markdown headers"
+}"""
+
+REVIEW_SYSTEM_PROMPT = """You are a senior editor at The Wire Journal. Your job is to critique and score articles before publication.
+
+Be specific, constructive, and demanding. Check factual accuracy against the provided research, The Wire Journal tone and style, clarity and structure, and missing context or perspectives.
+
+Score each criterion from 0 to 2:
+- headline: Headline effectiveness
+- lead: Lead paragraph hook
+- factual_density: Specific, accurate facts, numbers and attributed quotes
+- style: The Wire Journal style adherence
+- readability: Overall clarity and flow
+
+The overall score (1-10) is the sum of the sub-scores. Be strict. 7+ is publishable. 9-10 is exceptional.
+
+Respond with ONLY a JSON object:
+{
+  "score": <number 1-10>,
+  "sub_scores": { "headline": <0-2>, "lead": <0-2>, "factual_density": <0-2>, "style": <0-2>, "readability": <0-2> },
+  "critique": ["<specific, actionable fix>", ...],
+  "summary": "<one-sentence overall assessment>"
+}"""
+
+# Article pipeline mode: 'full' always runs draft -> critique -> improve -> score,
+# 'adaptive' scores the first draft and only revises drafts below the threshold
+PIPELINE_MODE = os.getenv('AGENT_PIPELINE_MODE', 'full')
+QUALITY_THRESHOLD = int(os.getenv('AGENT_QUALITY_THRESHOLD', '8'))
+MAX_IMPROVE_ITERATIONS = int(os.getenv('AGENT_MAX_IMPROVE_ITERATIONS', '2'))
+
+
+def today_string() -> str:
+    """Today's date as written into prompts"""
+    return datetime.now().strftime("%A, %B %d, %Y")
 
 
 class ArticleDraft:
     """Article draft data class"""
     
     def __init__(self, title: str, excerpt: str, body: str, author: str,
-                 sources: List[Dict[str, str]], quality_score: int):
+                 sources: List[Dict[str, str]], quality_score: int,
+                 usage: Optional[Dict[str, Any]] = None,
+                 quality_review: Optional[Dict[str, Any]] = None):
         self.title = title
         self.excerpt = excerpt
         self.body = body
         self.author = author
         self.sources = sources
         self.quality_score = quality_score
+        self.usage = usage or {}  # LLM calls/tokens spent producing this article
+        self.quality_review = quality_review or {}  # Sub-scores and critique behind quality_score
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -31,7 +93,9 @@ class ArticleDraft:
             'body': self.body,
             'author': self.author,
             'sources': self.sources,
-            'quality_score': self.quality_score
+            'quality_score': self.quality_score,
+            'usage': self.usage,
+            'quality_review': self.quality_review
         }
 
 
@@ -51,72 +115,102 @@ class AgentConfig:
 class BaseAgent:
     """Base agent class for all specialized agents"""
     
-    def __init__(self, config: AgentConfig):
+    def __init__(self, config: AgentConfig, mode: Optional[str] = None,
+                 quality_threshold: Optional[int] = None,
+                 max_improve_iterations: Optional[int] = None):
         self.config = config
+        self.mode = mode or PIPELINE_MODE
+        self.quality_threshold = quality_threshold if quality_threshold is not None else QUALITY_THRESHOLD
+        self.max_improve_iterations = max_improve_iterations if max_improve_iterations is not None else MAX_IMPROVE_ITERATIONS
     
-    async def generate_articles(
-        self, 
-        research_results: List[ResearchResult],
+    async def generate_single_article(
+        self,
+        research: ResearchResult,
         word_count: int = 800,
         writing_style: str = 'standard'
-    ) -> List[ArticleDraft]:
+    ) -> ArticleDraft:
         """
-        Main entry point - generates articles from research
+        Generate a single article using the configured pipeline mode
         
-        Args:
-            research_results: List of research results
-            word_count: Target word count for articles
-            writing_style: Writing style identifier
+        Full pipeline:
+        1. Draft - Initial article
+        2. Review - Structured critique and score in one call
+        3. Improve - Improved draft based on the critique points
+        4. Review - Final score and sub-scores for the improved draft
         
-        Returns:
-            List of ArticleDraft objects
+        Adaptive pipeline:
+        1. Draft, then review it
+        2. If the score is below the quality threshold, improve/review again,
+           up to max_improve_iterations times, keeping the best draft
         """
-        articles = []
+        with track_usage() as usage:
+            if self.mode == 'adaptive':
+                final_draft, review, iterations = await self._run_adaptive_pipeline(
+                    research, word_count, writing_style
+                )
+            else:
+                final_draft, review, iterations = await self._run_full_pipeline(
+                    research, word_count, writing_style
+                )
         
-        for research in research_results[:self.config.articles_per_run]:
-            try:
-                article = await self.generate_single_article(research, word_count, writing_style)
-                articles.append(article)
-            except Exception as e:
-                print(f"Failed to generate article: {e}")
+        usage_report = {**usage.to_dict(), 'mode': self.mode, 'improve_iterations': iterations}
+        print(f"[AGENT] {self.config.name} article scored {review['score']}/10 using {usage_report}")
         
-        return articles
+        return ArticleDraft(
+            title=final_draft['title'],
+            excerpt=final_draft['excerpt'],
+            body=final_draft['body'],
+            author=self.config.author,
+            sources=research.sources,
+            quality_score=review['score'],
+            usage=usage_report,
+            quality_review=review
+        )
     
-    async def generate_single_article(
+    async def _run_full_pipeline(
         self,
         research: ResearchResult,
-        word_count: int = 800,
-        writing_style: str = 'standard'
-    ) -> ArticleDraft:
-        """
-        Generate a single article using the full pipeline
-        
-        Pipeline:
-        1. Draft - Initial article
-        2. Critique - Self-critique
-        3. Improve - Improved draft based on critique
-        4. Score - Quality assessment
-        """
+        word_count: int,
+        writing_style: str
+    ) -> Tuple[Dict[str, str], Dict[str, Any], int]:
+        """Draft -> review -> improve -> review. Returns (draft, review, improve iterations)"""
         # Step 1: Generate initial draft
         initial_draft = await self.write_draft(research, word_count, writing_style)
         
-        # Step 2: Self-critique
-        critique = await self.critique_draft(initial_draft, research)
+        # Step 2: Critique and score
+        review = await self.review_draft(initial_draft, research)
         
         # Step 3: Improve based on critique
-        improved_draft = await self.improve_draft(initial_draft, critique, word_count, writing_style)
+        improved_draft = await self.improve_draft(initial_draft, review, word_count, writing_style)
         
-        # Step 4: Score quality
-        quality_score = await self.score_article(improved_draft)
+        # Step 4: Score the improved draft
+        final_review = await self.review_draft(improved_draft, research)
         
-        return ArticleDraft(
-            title=improved_draft['title'],
-            excerpt=improved_draft['excerpt'],
-            body=improved_draft['body'],
-            author=self.config.author,
-            sources=research.sources,
-            quality_score=quality_score
-        )
+        return improved_draft, final_review, 1
+    
+    async def _run_adaptive_pipeline(
+        self,
+        research: ResearchResult,
+        word_count: int,
+        writing_style: str
+    ) -> Tuple[Dict[str, str], Dict[str, Any], int]:
+        """Review first, revise only below the threshold. Returns (draft, review, improve iterations)"""
+        best_draft = await self.write_draft(research, word_count, writing_style)
+        best_review = await self.review_draft(best_draft, research)
+        
+        current_draft, current_review = best_draft, best_review
+        iterations = 0
+        
+        while best_review['score'] < self.quality_threshold and iterations < self.max_improve_iterations:
+            iterations += 1
+            current_draft = await self.improve_draft(current_draft, current_review, word_count, writing_style)
+            current_review = await self.review_draft(current_draft, research)
+            
+            # A revision can score lower than its input; keep the best version
+            if current_review['score'] >= best_review['score']:
+                best_draft, best_review = current_draft, current_review
+        
+        return best_draft, best_review, iterations
     
     async def write_draft(
         self,
@@ -125,14 +219,7 @@ class BaseAgent:
         writing_style: str = 'standard'
     ) -> Dict[str, str]:
         """Step 1: Write initial draft"""
-        system_prompt = self.get_writing_system_prompt()
-        
-        # Inject writing style if not standard
-        if writing_style != 'standard':
-            from agents.writing_styles import get_writing_style
-            style_instruction = get_writing_style(writing_style)
-            if style_instruction:
-                system_prompt += f"\n\n{style_instruction}"
+        system_prompt = self.get_system_prefix(writing_style)
         
         # Use original topic provided by user, or extract from research summary
         original_topic = getattr(research, 'original_topic', None)
@@ -144,45 +231,22 @@ class BaseAgent:
             topic = "Breaking News"
         print(f"[AGENT] Writing article about: {topic}")
         
-        user_prompt = f"""Write a complete news article based on this research:
-
-TOPIC: {topic}
-
-RESEARCH SUMMARY:
-{research.summary}
-
-KEY FACTS:
-{chr(10).join(f"• {point}" for point in research.key_points)}
-
-FULL RESEARCH:
-{research.raw_response}
+        user_prompt = f"""Write a complete news article based on the research below, with a compelling headline, a 1-2 sentence excerpt and the full body.
 
----
+LENGTH: The body MUST be approximately {word_count} words (minimum {int(word_count * 0.9)} words)
 
-Write a complete article with:
-1. A compelling headline
-2. A 1-2 sentence excerpt/subtitle
-3. Full article body - MUST be approximately {word_count} words (minimum {int(word_count * 0.9)} words)
+TODAY'S DATE: {today_string()}
 
-CRITICAL FORMATTING RULES:
-- The body text must contain at least {int(word_count * 0.9)} words
-- DO NOT USE MARKDOWN HEADERS (##, ###, etc.) IN THE BODY
-- Write in flowing paragraphs with natural transitions between topics
-- Use paragraph breaks to separate ideas, NOT section headers
-- Professional newspaper style - no headers, just clean prose
+TOPIC: {topic}
 
-Format your response as JSON:
-{{
-  "title": "Headline here",
-  "excerpt": "Brief excerpt here",
-  "body": "Full article body in clean paragraphs WITHOUT any markdown headers"
-}}"""
+{build_research_context(research, 'draft')}"""
         
-        result = generate_json(
+        log_prompt_tokens('draft', system_prompt, user_prompt)
+        result = await generate_json_async(
             system_prompt,
             user_prompt,
             temperature=0.7,
-            max_tokens=max(4000, int(word_count * 2))
+            max_tokens=max_output_tokens(word_count)
         )
         
         return {
@@ -192,92 +256,85 @@ Format your response as JSON:
             'author': self.config.author
         }
     
-    async def critique_draft(
+    async def review_draft(
         self,
         draft: Dict[str, str],
         research: ResearchResult
-    ) -> str:
-        """Step 2: Critique the draft"""
-        system_prompt = """You are a senior editor at The Wire Journal. Your job is to critique articles before publication.
-
-Be specific, constructive, and demanding. Focus on:
-- Factual accuracy (check against provided research)
-- The Wire Journal tone and style
-- Clarity and structure
-- Headline effectiveness
-- Lead paragraph strength
-- Missing context or perspectives"""
+    ) -> Dict[str, Any]:
+        """
+        Step 2: Critique and score the draft in a single call
+        
+        The research comes before the draft: every review of one article
+        shares system prompt + research, which is over OpenAI's 1024-token
+        minimum for automatic prompt caching, so re-reviews hit the cache.
+        
+        Returns:
+            {
+                "score": int 1-10,
+                "sub_scores": { criterion: 0-2 },
+                "critique": [actionable points],
+                "summary": str
+            }
+        """
+        system_prompt = REVIEW_SYSTEM_PROMPT
         
-        user_prompt = f"""Critique this draft article:
+        user_prompt = f"""Review the draft article at the end against this research.
 
-HEADLINE: {draft['title']}
-EXCERPT: {draft['excerpt']}
+ORIGINAL RESEARCH (for fact-checking):
+{build_research_context(research, 'review')}
 
-BODY:
-{draft['body']}
+TODAY'S DATE: {today_string()}
 
 ---
 
-ORIGINAL RESEARCH (for fact-checking):
-{research.raw_response}
-
----
+HEADLINE: {draft['title']}
+EXCERPT: {draft['excerpt']}
 
-Provide specific, actionable feedback for improvement."""
+BODY:
+{draft['body']}"""
         
-        return generate_text(system_prompt, user_prompt, temperature=0.4)
+        log_prompt_tokens('review', system_prompt, user_prompt)
+        result = await generate_json_async(
+            system_prompt,
+            user_prompt,
+            temperature=0.2,
+            max_tokens=800,
+            cache_ttl=REVIEW_CACHE_TTL
+        )
+        return parse_review(result)
     
     async def improve_draft(
         self,
         draft: Dict[str, str],
-        critique: str,
+        review: Dict[str, Any],
         word_count: int = 800,
         writing_style: str = 'standard'
     ) -> Dict[str, str]:
-        """Step 3: Improve based on critique"""
-        system_prompt = self.get_writing_system_prompt()
+        """Step 3: Improve based on the structured review"""
+        system_prompt = self.get_system_prefix(writing_style)
         
-        # Inject writing style
-        if writing_style != 'standard':
-            from agents.writing_styles import get_writing_style
-            style_instruction = get_writing_style(writing_style)
-            if style_instruction:
-                system_prompt += f"\n\n{style_instruction}"
-        
-        user_prompt = f"""Improve this article based on editorial feedback:
+        user_prompt = f"""Rewrite the article below addressing ALL of the editor's feedback points. Maintain the same general topic but improve quality.
 
-CURRENT DRAFT:
-Headline: {draft['title']}
-Excerpt: {draft['excerpt']}
-Body: {draft['body']}
+LENGTH: The body MUST be approximately {word_count} words (minimum {int(word_count * 0.9)} words)
 
----
+TODAY'S DATE: {today_string()}
 
 EDITOR'S FEEDBACK:
-{critique}
+{format_review_feedback(review)}
 
 ---
 
-Rewrite the article addressing ALL feedback points. Maintain the same general topic but improve quality. 
-
-CRITICAL REQUIREMENTS:
-- The body text MUST be approximately {word_count} words (minimum {int(word_count * 0.9)} words)
-- DO NOT USE MARKDOWN HEADERS (##, ###, etc.) IN THE BODY
-- Write in flowing paragraphs with natural transitions
-- Professional newspaper style - no section headers, just clean prose
-
-Format your response as JSON:
-{{
-  "title": "Improved headline",
-  "excerpt": "Improved excerpt",
-  "body": "Improved article body in clean paragraphs WITHOUT markdown headers"
-}}"""
+CURRENT DRAFT:
+Headline: {draft['title']}
+Excerpt: {draft['excerpt']}
+Body: {draft['body']}"""
         
-        result = generate_json(
+        log_prompt_tokens('improve', system_prompt, user_prompt)
+        result = await generate_json_async(
             system_prompt,
             user_prompt,
             temperature=0.6,
-            max_tokens=max(4000, int(word_count * 2))
+            max_tokens=max_output_tokens(word_count)
         )
         
         return {
@@ -287,44 +344,44 @@ Format your response as JSON:
             'author': self.config.author
         }
     
-    async def score_article(self, draft: Dict[str, str]) -> int:
-        """Step 4: Score article quality"""
-        system_prompt = """You are a quality assurance editor. Score articles on a scale of 1-10.
-
-Criteria:
-- Headline effectiveness (2 points)
-- Lead paragraph hook (2 points)  
-- Factual density (2 points)
-- The Wire Journal style adherence (2 points)
-- Overall readability (2 points)
-
-Be strict. 7+ is publishable. 9-10 is exceptional."""
+    def get_system_prefix(self, writing_style: str = 'standard') -> str:
+        """
+        Static system prompt for writing stages: section prompt + writing style + output rules
         
-        user_prompt = f"""Score this article:
-
-HEADLINE: {draft['title']}
-EXCERPT: {draft['excerpt']}
-BODY: {draft['body']}
-
-Respond with ONLY a JSON object: {{ "score": <number 1-10>, "reasoning": "<brief explanation>" }}"""
+        Memoized in-process so every draft/improve call for the same section and
+        style sends a byte-identical prefix.
+        """
+        key = (type(self).__name__, self.config.section, writing_style)
+        prefix = _system_prefix_cache.get(key)
         
-        result = generate_json(system_prompt, user_prompt, temperature=0.2)
+        if prefix is None:
+            prefix = self.get_writing_system_prompt()
+            
+            # Inject writing style if not standard
+            if writing_style != 'standard':
+                from agents.writing_styles import get_writing_style
+                style_instruction = get_writing_style(writing_style)
+                if style_instruction:
+                    prefix += f"\n\n{style_instruction}"
+            
+            prefix += f"\n\n{ARTICLE_OUTPUT_RULES}"
+            _system_prefix_cache[key] = prefix
         
-        score = result.get('score', 5)
-        return max(1, min(10, int(score)))
+        return prefix
     
     def get_writing_system_prompt(self) -> str:
-        """Get the writing system prompt (can be overridden by subclasses)"""
-        today = datetime.now().strftime("%A, %B %d, %Y")
+        """
+        Get the writing system prompt (can be overridden by subclasses)
         
+        Must not contain per-request content such as the date; that is passed
+        at the end of the user prompt so the system prompt stays cacheable.
+        """
         return f"""You are a senior journalist at The Wire Journal writing for the {self.config.section.upper()} section.
 
-TODAY'S DATE: {today}
-
 CURRENT FACTS (VERIFY ALL INFORMATION IS UP TO DATE):
 - Current U.S. President: Donald Trump (inaugurated January 20, 2025)
 - Current Vice President: JD Vance
-- Only write about events that are current as of {today}
+- Only write about events that are current as of TODAY'S DATE, given with each request
 
 TONE: {self.config.tone_guide}
 
@@ -332,7 +389,7 @@ STYLE GUIDE:
 {self.config.style_guide}
 
 CRITICAL RULES:
-- ALL facts must be current as of {today}
+- ALL facts must be current as of TODAY'S DATE
 - Write in active voice
 - Lead with the most newsworthy element
 - Use specific facts, numbers, and quotes
@@ -344,6 +401,46 @@ CRITICAL RULES:
 - If information seems outdated, do not include it"""
 
 
+def parse_review(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a review response: clamp scores and coerce critique to a list"""
+    raw_sub_scores = result.get('sub_scores') or {}
+    sub_scores = {}
+    for criterion in REVIEW_CRITERIA:
+        try:
+            sub_scores[criterion] = max(0, min(2, int(raw_sub_scores.get(criterion, 0))))
+        except (TypeError, ValueError):
+            sub_scores[criterion] = 0
+    
+    try:
+        score = int(result['score'])
+    except (KeyError, TypeError, ValueError):
+        score = sum(sub_scores.values()) if raw_sub_scores else 5
+    
+    critique = result.get('critique') or []
+    if isinstance(critique, str):
+        critique = [line.strip('-• ').strip() for line in critique.split('\n') if line.strip()]
+    
+    return {
+        'score': max(1, min(10, score)),
+        'sub_scores': sub_scores,
+        'critique': [str(point) for point in critique],
+        'summary': result.get('summary', '')
+    }
+
+
+def format_review_feedback(review: Dict[str, Any]) -> str:
+    """Render a structured review as editor feedback for the improve prompt"""
+    weakest = sorted(review.get('sub_scores', {}).items(), key=lambda item: item[1])[:2]
+    lines = [f"Score: {review.get('score')}/10. {review.get('summary', '')}".strip()]
+    
+    if weakest:
+        lines.append("Weakest areas: " + ", ".join(f"{name} ({score}/2)" for name, score in weakest))
+    
+    lines.append("Required changes:")
+    lines.extend(f"{i + 1}. {point}" for i, point in enumerate(review.get('critique', [])))
+    return "\n".join(lines)
+
+
 def generate_slug(title: str) -> str:
     """Generate a URL-safe slug from a title"""
     # Remove special characters
@@ -3,7 +3,8 @@ Agent Orchestrator
 Manages running multiple agents and storing results
 """
 import asyncio
-from typing import List, Dict, Any, Optional
+import os
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 from agents.politics_agent import PoliticsAgent
@@ -13,11 +14,32 @@ from agents.business_agent import BusinessAgent
 from agents.tech_agent import TechAgent
 from agents.opinion_agent import OpinionAgent
 from agents.satire_agent import SatireAgent
-from agents.base_agent import generate_slug
-from services.perplexity_service import get_trending_topics, perform_research
+from agents.base_agent import BaseAgent, ArticleDraft, generate_slug
+from agents.pipeline import Stage, run_pipeline
+from services.perplexity_service import get_trending_topics, get_trending_topics_batch
+from services.research_store import research_topic, get_research_for_article
+from services.topic_dedup import TopicIndex
+from services.article_cache import invalidate_articles
+from services.article_store import optional_article_columns
 from database.supabase_client import supabase
 
 
+# Per-stage concurrency for the research -> write -> image -> persist pipeline
+RESEARCH_CONCURRENCY = int(os.getenv('PIPELINE_RESEARCH_CONCURRENCY', '2'))
+WRITE_CONCURRENCY = int(os.getenv('PIPELINE_WRITE_CONCURRENCY', '2'))
+IMAGE_CONCURRENCY = int(os.getenv('PIPELINE_IMAGE_CONCURRENCY', '2'))
+PERSIST_CONCURRENCY = int(os.getenv('PIPELINE_PERSIST_CONCURRENCY', '1'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+
+# Rough LLM calls per article, used to report what topic deduplication saved
+LLM_CALLS_PER_ARTICLE = {'full': 4, 'adaptive': 2}
+
+# Attach the first valid source image to each new draft (extraction only, no DALL-E)
+AGENT_AUTO_IMAGES = os.getenv('AGENT_AUTO_IMAGES', 'false').lower() == 'true'
+# Gather image candidates while each draft is written and store them on the article
+AGENT_PREFETCH_IMAGES = os.getenv('AGENT_PREFETCH_IMAGES', 'true').lower() == 'true'
+
+
 # Agent registry
 AGENTS = {
     'politics': PoliticsAgent,
@@ -30,11 +52,213 @@ AGENTS = {
 }
 
 
+def build_article_stages(
+    agent: BaseAgent,
+    agent_name: str,
+    word_count: int,
+    writing_style: str
+) -> List[Stage]:
+    """
+    Build the per-article pipeline stages
+    
+    research (research_topic) -> write (generate_single_article, with image
+    candidates prefetched alongside) -> image selection -> persist
+    
+    Items flow between stages as dicts:
+    { "research", "article", "image_candidates", "image", "media", "saved" }.
+    """
+    async def research_stage(topic: str) -> Dict[str, Any]:
+        print(f"[ORCHESTRATOR] Researching topic: {topic}")
+        # Reuses fresh stored research; attaches the original topic for article generation
+        research = await research_topic(topic, agent_name)
+        return {'research': research}
+    
+    async def write_stage(item: Dict[str, Any]) -> Dict[str, Any]:
+        research = item['research']
+        candidates_task = None
+        if AGENT_PREFETCH_IMAGES and research.sources:
+            from services.image_service import prefetch_image_candidates
+            # Sources are known now; don't make the editor wait for extraction later
+            candidates_task = asyncio.create_task(prefetch_image_candidates(
+                research.original_topic or '', agent.config.section, research.sources
+            ))
+        
+        try:
+            item['article'] = await agent.generate_single_article(research, word_count, writing_style)
+        except BaseException:
+            if candidates_task:
+                candidates_task.cancel()
+            raise
+        
+        item['image_candidates'] = None
+        if candidates_task:
+            try:
+                item['image_candidates'] = await candidates_task
+            except Exception as e:
+                print(f"[ORCHESTRATOR] Image prefetch failed: {e}")
+        return item
+    
+    async def image_stage(item: Dict[str, Any]) -> Dict[str, Any]:
+        item['image'] = None
+        if AGENT_AUTO_IMAGES and item['article'].sources:
+            from services.image_service import GeneratedImage, extract_images_from_sources
+            candidates = (item.get('image_candidates') or {}).get('images') or []
+            extracted = [c for c in candidates if c['source'] == 'extracted']
+            if extracted:
+                item['image'] = GeneratedImage.from_dict(extracted[0])
+            elif not candidates:
+                images = await extract_images_from_sources(item['article'].sources, max_images=1)
+                item['image'] = images[0] if images else None
+        if item['image'] is not None:
+            from services.media_store import mirror_image
+            item['media'] = await mirror_image(item['image'].url)
+        return item
+    
+    async def persist_stage(item: Dict[str, Any]) -> Dict[str, Any]:
+        item['saved'] = await asyncio.to_thread(
+            save_article, item['article'], agent.config.section, item.get('image'), item['research'].id,
+            item.get('media'), item.get('image_candidates')
+        )
+        return item
+    
+    return [
+        Stage('research', research_stage, RESEARCH_CONCURRENCY),
+        Stage('write', write_stage, WRITE_CONCURRENCY),
+        Stage('image', image_stage, IMAGE_CONCURRENCY),
+        Stage('persist', persist_stage, PERSIST_CONCURRENCY),
+    ]
+
+
+async def build_topic_index() -> TopicIndex:
+    """Topic index pre-loaded with recently written articles"""
+    index = TopicIndex()
+    loaded = await asyncio.to_thread(index.load_recent_articles)
+    print(f"[DEDUP] Indexed {loaded} recent article(s)")
+    return index
+
+
+def select_topics(
+    topics: List[str],
+    count: int,
+    section: str,
+    topic_index: TopicIndex,
+    calls_per_article: int
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Pick up to `count` topics that aren't near-duplicates of claimed topics or recent articles
+    
+    Duplicates are dropped and later candidates take their place.
+    
+    Returns:
+        (selected topics, dedup report)
+    """
+    selected = []
+    skipped = []
+    avoided = 0
+    
+    for position, topic in enumerate(topics):
+        if len(selected) >= count:
+            break
+        duplicate = topic_index.claim(topic, section)
+        if duplicate:
+            label, similarity = duplicate
+            print(f"[DEDUP] Skipping '{topic}' ({similarity:.2f} similar to {label})")
+            skipped.append({'topic': topic, 'duplicate_of': label, 'similarity': round(similarity, 2)})
+            # Only topics inside the original selection would have been researched
+            if position < count:
+                avoided += 1
+            continue
+        selected.append(topic)
+    
+    return selected, {
+        'duplicates_skipped': skipped,
+        'research_calls_avoided': avoided,
+        'llm_calls_avoided': avoided * calls_per_article
+    }
+
+
+def summarize_usage(articles: List[ArticleDraft]) -> Dict[str, Any]:
+    """Total LLM calls/tokens for a run, plus the per-article breakdown"""
+    per_article = [{'title': a.title, 'quality_score': a.quality_score, **a.usage} for a in articles]
+    totals = {
+        key: sum(entry.get(key, 0) for entry in per_article)
+        for key in ('llm_calls', 'cache_hits', 'prompt_tokens', 'cached_tokens', 'completion_tokens', 'total_tokens')
+    }
+    return {**totals, 'articles': per_article}
+
+
+def save_article(
+    article: ArticleDraft,
+    section: str,
+    image=None,
+    research_id: Optional[str] = None,
+    media=None,
+    image_candidates: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Insert a draft article (and its selected image, if any) into the database
+    
+    media is the image's MirroredImage; its variant URL replaces the hotlinked one.
+    image_candidates (prefetched while writing) are stored for the image picker.
+    """
+    article_data = {
+        'title': article.title,
+        'excerpt': article.excerpt,
+        'body': article.body,
+        'section': section,
+        'author': article.author,
+        'slug': generate_slug(article.title),
+        'status': 'draft',
+        'quality_score': article.quality_score,
+        'sources': article.sources,
+        'read_time': f'{max(1, len(article.body.split()) // 200)} min read'
+    }
+    
+    # Columns added by later migrations - only those this database has (detected once)
+    optional_data = {'quality_review': article.quality_review}
+    if research_id:
+        optional_data['research_id'] = research_id
+    if image_candidates and image_candidates.get('images'):
+        optional_data['image_candidates'] = image_candidates
+    
+    response = supabase.table('articles').insert({**article_data, **optional_article_columns(optional_data)}).execute()
+    saved = response.data[0]
+    
+    if image is not None:
+        image_data = {
+            'article_id': saved['id'],
+            'image_type': 'extracted',
+            'url': image.url,
+            'origin_url': image.source_url,
+            'alt_text': f"Image from {image.source_domain or 'news source'}",
+        }
+        try:
+            try:
+                image_record = supabase.table('images').insert(
+                    {**image_data, **(media.to_columns() if media else {})}
+                ).execute()
+            except Exception as insert_err:
+                if media is None:
+                    raise
+                print(f"[ORCHESTRATOR] Insert with image variants failed, trying without: {insert_err}")
+                image_record = supabase.table('images').insert({**image_data, 'url': media.url}).execute()
+            if image_record.data:
+                supabase.table('articles').update({
+                    'image_id': image_record.data[0]['id']
+                }).eq('id', saved['id']).execute()
+        except Exception as e:
+            print(f"Failed to save image for '{article.title}': {e}")
+    
+    return saved
+
+
 async def run_single_agent(
     agent_name: str,
     word_count: int = 800,
     writing_style: str = 'standard',
-    custom_topic: Optional[str] = None
+    custom_topic: Optional[str] = None,
+    topics: Optional[List[str]] = None,
+    topic_index: Optional[TopicIndex] = None
 ) -> Dict[str, Any]:
     """
     Run a single agent
@@ -44,6 +268,10 @@ async def run_single_agent(
         word_count: Target word count for articles
         writing_style: Writing style identifier
         custom_topic: Optional custom topic (overrides trending topics)
+        topics: Optional pre-fetched trending topics (e.g. from a batched call);
+            trending topics are fetched for this section if empty
+        topic_index: Optional index shared across a run for near-duplicate
+            topic detection; one is built from recent articles if omitted
     
     Returns:
         Result dictionary with success status and articles created
@@ -58,56 +286,107 @@ async def run_single_agent(
         # Get topics or use custom topic
         if custom_topic:
             topics = [custom_topic]
-        else:
+        elif not topics:
             topics = await get_trending_topics(agent_name)
         
         if not topics:
             return {'success': False, 'articles_created': 0, 'errors': ['No topics found']}
         
-        # Perform research for each topic
-        research_results = []
-        for topic in topics[:agent.config.articles_per_run]:
-            try:
-                print(f"[ORCHESTRATOR] Researching topic: {topic}")
-                research = await perform_research(topic, agent_name)
-                # Attach original topic to research for article generation
-                research.original_topic = topic
-                research_results.append(research)
-            except Exception as e:
-                print(f"Research failed for topic '{topic}': {e}")
+        dedup = None
+        if custom_topic:
+            # An editor's explicit topic is never dropped
+            topics = topics[:agent.config.articles_per_run]
+        else:
+            if topic_index is None:
+                topic_index = await build_topic_index()
+            topics, dedup = select_topics(
+                topics,
+                agent.config.articles_per_run,
+                agent.config.section,
+                topic_index,
+                LLM_CALLS_PER_ARTICLE.get(agent.mode, 4)
+            )
+            if not topics:
+                return {'success': False, 'articles_created': 0, 'errors': ['All topics were already covered'], 'dedup': dedup}
         
-        if not research_results:
-            return {'success': False, 'articles_created': 0, 'errors': ['Research failed for all topics']}
+        stages = build_article_stages(agent, agent_name, word_count, writing_style)
+        outcome = await run_pipeline(topics, stages, queue_size=PIPELINE_QUEUE_SIZE)
         
-        # Generate articles
-        articles = await agent.generate_articles(research_results, word_count, writing_style)
+        saved_count = len(outcome['outputs'])
+        usage = summarize_usage([item['article'] for item in outcome['outputs']])
+        print(f"[ORCHESTRATOR] {agent_name}: saved {saved_count} article(s), stage time {outcome['stage_seconds']}")
         
-        # Save articles to database
-        saved_count = 0
-        for article in articles:
-            try:
-                article_data = {
-                    'title': article.title,
-                    'excerpt': article.excerpt,
-                    'body': article.body,
-                    'section': agent.config.section,
-                    'author': article.author,
-                    'slug': generate_slug(article.title),
-                    'status': 'draft',
-                    'quality_score': article.quality_score,
-                    'sources': article.sources,
-                    'read_time': f'{max(1, len(article.body.split()) // 200)} min read'
-                }
-                
-                supabase.table('articles').insert(article_data).execute()
-                saved_count += 1
-            except Exception as e:
-                print(f"Failed to save article '{article.title}': {e}")
+        if saved_count == 0:
+            return {'success': False, 'articles_created': 0, 'errors': outcome['errors'] or ['No articles were created'], 'dedup': dedup}
         
         return {
             'success': True,
             'articles_created': saved_count,
-            'errors': []
+            'errors': outcome['errors'],
+            'usage': usage,
+            'dedup': dedup
+        }
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'articles_created': 0,
+            'errors': [str(e)]
+        }
+
+
+async def regenerate_article(
+    article_id: str,
+    word_count: int = 800,
+    writing_style: str = 'standard'
+) -> Dict[str, Any]:
+    """
+    Rewrite an existing article from its stored research (no new Perplexity call)
+    
+    Args:
+        article_id: Article to regenerate
+        word_count: Target word count
+        writing_style: Writing style identifier
+    
+    Returns:
+        Result dictionary with success status and articles updated
+    """
+    try:
+        response = await asyncio.to_thread(
+            lambda: supabase.table('articles').select('*').eq('id', article_id).execute()
+        )
+        if not response.data:
+            return {'success': False, 'articles_created': 0, 'errors': ['Article not found']}
+        
+        existing = response.data[0]
+        agent_class = AGENTS.get(existing['section'])
+        if not agent_class:
+            return {'success': False, 'articles_created': 0, 'errors': [f"Unknown section: {existing['section']}"]}
+        
+        research = await asyncio.to_thread(get_research_for_article, existing)
+        if not research:
+            return {'success': False, 'articles_created': 0, 'errors': ['No stored research for this article']}
+        
+        agent = agent_class()
+        article = await agent.generate_single_article(research, word_count, writing_style)
+        
+        updates = {
+            'title': article.title,
+            'excerpt': article.excerpt,
+            'body': article.body,
+            'quality_score': article.quality_score,
+            'read_time': f'{max(1, len(article.body.split()) // 200)} min read'
+        }
+        # Replace the review too, so it describes the new draft
+        updates.update(optional_article_columns({'quality_review': article.quality_review}))
+        await asyncio.to_thread(lambda: supabase.table('articles').update(updates).eq('id', article_id).execute())
+        invalidate_articles('regenerate_article')
+        
+        return {
+            'success': True,
+            'articles_created': 1,
+            'errors': [],
+            'usage': summarize_usage([article])
         }
         
     except Exception as e:
@@ -133,9 +412,26 @@ async def run_all_agents(
         Result dictionary with success status and total articles created
     """
     try:
+        # One topic-discovery call for every section; agents whose slice comes
+        # back empty fall back to their own get_trending_topics call
+        try:
+            topics_by_section = await get_trending_topics_batch(AGENTS.keys())
+        except Exception as e:
+            print(f"[ORCHESTRATOR] Batched topic discovery failed, using per-section calls: {e}")
+            topics_by_section = {}
+        
+        # Shared across agents so two sections can't claim the same story
+        topic_index = await build_topic_index()
+        
         # Run all agents in parallel
         tasks = [
-            run_single_agent(agent_name, word_count, writing_style)
+            run_single_agent(
+                agent_name,
+                word_count,
+                writing_style,
+                topics=topics_by_section.get(agent_name),
+                topic_index=topic_index
+            )
             for agent_name in AGENTS.keys()
         ]
         
@@ -144,18 +440,37 @@ async def run_all_agents(
         # Aggregate results
         total_articles = 0
         errors = []
+        usage_by_section = {}
+        research_calls_avoided = 0
+        llm_calls_avoided = 0
         
-        for result in results:
+        for agent_name, result in zip(AGENTS.keys(), results):
             if isinstance(result, Exception):
                 errors.append(str(result))
             elif isinstance(result, dict):
                 total_articles += result.get('articles_created', 0)
                 errors.extend(result.get('errors', []))
+                if result.get('usage'):
+                    usage_by_section[agent_name] = result['usage']
+                if result.get('dedup'):
+                    research_calls_avoided += result['dedup']['research_calls_avoided']
+                    llm_calls_avoided += result['dedup']['llm_calls_avoided']
         
         return {
             'success': total_articles > 0,
             'articles_created': total_articles,
-            'errors': errors
+            'errors': errors,
+            'usage': {
+                'llm_calls': sum(u['llm_calls'] for u in usage_by_section.values()),
+                'total_tokens': sum(u['total_tokens'] for u in usage_by_section.values()),
+                'cached_tokens': sum(u['cached_tokens'] for u in usage_by_section.values()),
+                'sections': usage_by_section
+            },
+            'dedup': {
+                'duplicates_skipped': topic_index.stats['duplicates'],
+                'research_calls_avoided': research_calls_avoided,
+                'llm_calls_avoided': llm_calls_avoided
+            }
         }
         
     except Exception as e:
@@ -0,0 +1,90 @@
+"""
+Stage Pipeline
+Runs items through async stages connected by bounded queues
+
+Each stage has its own worker count, so a slow stage (e.g. writing) can
+start on the first item while an earlier stage (e.g. research) is still
+working on the next one.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class Stage:
+    """A named pipeline stage with its own concurrency limit"""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], concurrency: int = 1):
+        self.name = name
+        self.handler = handler  # Returns the item for the next stage, or None to drop it
+        self.concurrency = max(1, concurrency)
+
+
+async def run_pipeline(
+    items: Iterable[Any],
+    stages: List[Stage],
+    queue_size: int = 4
+) -> Dict[str, Any]:
+    """
+    Push items through the stages in order
+
+    Args:
+        items: Inputs for the first stage
+        stages: Stages to run, in order
+        queue_size: Max items buffered between two stages
+
+    Returns:
+        { "outputs": [...], "errors": [...], "stage_seconds": {...} }
+        outputs are whatever the last stage returned
+    """
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+    outputs: List[Any] = []
+    errors: List[str] = []
+    busy_seconds: Dict[str, float] = {stage.name: 0.0 for stage in stages}
+
+    async def feed():
+        for item in items:
+            await queues[0].put(item)
+        await queues[0].put(_DONE)
+
+    async def worker(stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                # Leave the marker for sibling workers of this stage
+                await inbox.put(_DONE)
+                return
+
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                print(f"[PIPELINE] {stage.name} failed: {e}")
+                errors.append(f"{stage.name}: {e}")
+                result = None
+            busy_seconds[stage.name] += time.monotonic() - started
+
+            if result is None:
+                continue
+            if outbox is not None:
+                await outbox.put(result)
+            else:
+                outputs.append(result)
+
+    async def run_stage(index: int, stage: Stage):
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+        await asyncio.gather(*[worker(stage, inbox, outbox) for _ in range(stage.concurrency)])
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    await asyncio.gather(feed(), *[run_stage(i, stage) for i, stage in enumerate(stages)])
+
+    return {
+        'outputs': outputs,
+        'errors': errors,
+        'stage_seconds': {name: round(seconds, 2) for name, seconds in busy_seconds.items()},
+    }
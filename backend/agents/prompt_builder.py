@@ -0,0 +1,194 @@
+"""
+Token-Budgeted Prompt Assembly
+Counts tokens locally and fits research into a per-stage input budget
+
+Research arrives as a summary, key facts and the full raw response, and
+the raw response already contains the summary and key facts. The builder
+includes each piece once, in priority order, and trims to the budget.
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+from services.perplexity_service import ResearchResult
+
+# Research token budget per pipeline stage (overridable via environment)
+STAGE_RESEARCH_BUDGETS = {
+    'draft': int(os.getenv('PROMPT_BUDGET_DRAFT', '2500')),
+    'review': int(os.getenv('PROMPT_BUDGET_REVIEW', '1500')),
+}
+
+# Share of a research budget the summary may take before key facts are added
+SUMMARY_BUDGET_SHARE = 0.4
+
+# Don't append a trimmed paragraph when fewer tokens than this are left
+MIN_PARAGRAPH_TOKENS = 50
+
+# English prose averages ~1.35 tokens per word; JSON-wrapped output adds headroom
+TOKENS_PER_WORD = 1.35
+OUTPUT_HEADROOM = 1.25
+OUTPUT_OVERHEAD_TOKENS = 300
+MIN_OUTPUT_TOKENS = 1500
+MAX_OUTPUT_TOKENS = 16000
+
+# Raw-response section headings, plain or Markdown ("KEY FACTS:", "## 3. QUOTES:", "**CONTEXT**")
+_SECTION_HEADINGS = re.compile(
+    r"(?:^|\n)[ \t]*#*[ \t]*(?:\d+\.[ \t]*)?\**[ \t]*(SUMMARY|KEY FACTS|QUOTES|CONTEXT|WHAT'S NEXT|SATIRICAL ANGLES)\b",
+    re.IGNORECASE
+)
+# Sections already passed in as research.summary / research.key_points
+_COVERED_SECTIONS = {'SUMMARY', 'KEY FACTS'}
+
+_encodings: Dict[str, object] = {}
+
+
+def _get_encoding(model: str):
+    """tiktoken encoding for a model, or None when tiktoken is not installed"""
+    if model in _encodings:
+        return _encodings[model]
+
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding('o200k_base')
+    except ImportError:
+        encoding = None
+
+    _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text: str, model: str = 'gpt-4o') -> int:
+    """Count tokens locally (estimates ~4 characters per token without tiktoken)"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, budget: int, model: str = 'gpt-4o') -> str:
+    """Cut text to at most budget tokens, preferring a sentence boundary"""
+    if budget <= 0:
+        return ''
+    if count_tokens(text, model) <= budget:
+        return text
+
+    encoding = _get_encoding(model)
+    if encoding is None:
+        cut = text[:budget * 4]
+    else:
+        cut = encoding.decode(encoding.encode(text)[:budget])
+
+    sentence_end = max(cut.rfind('. '), cut.rfind('\n'))
+    if sentence_end > len(cut) // 2:
+        cut = cut[:sentence_end + 1]
+    return cut.rstrip()
+
+
+def max_output_tokens(word_count: int) -> int:
+    """Size a completion's max_tokens from the requested article length"""
+    estimate = int(word_count * TOKENS_PER_WORD * OUTPUT_HEADROOM) + OUTPUT_OVERHEAD_TOKENS
+    return max(MIN_OUTPUT_TOKENS, min(MAX_OUTPUT_TOKENS, estimate))
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\W+', ' ', text).strip().lower()
+
+
+def _research_remainder(research: ResearchResult) -> List[str]:
+    """
+    Paragraphs of the raw response not already covered by the summary and key facts
+
+    SUMMARY and KEY FACTS sections are dropped outright; without any
+    recognizable headings the whole response is filtered paragraph by paragraph.
+    """
+    raw = research.raw_response or ''
+    headings = list(_SECTION_HEADINGS.finditer(raw))
+    if headings:
+        ends = [match.start() for match in headings[1:]] + [len(raw)]
+        sections = [
+            raw[match.start():end] for match, end in zip(headings, ends)
+            if match.group(1).upper() not in _COVERED_SECTIONS
+        ]
+    else:
+        sections = [raw]
+
+    covered = _normalize(research.summary + ' ' + ' '.join(research.key_points))
+    paragraphs = []
+    for section in sections:
+        for paragraph in re.split(r'\n\s*\n', section):
+            paragraph = paragraph.strip()
+            if paragraph and _normalize(paragraph) not in covered:
+                paragraphs.append(paragraph)
+    return paragraphs
+
+
+def build_research_context(
+    research: ResearchResult,
+    stage: str,
+    model: str = 'gpt-4o',
+    budget: Optional[int] = None
+) -> str:
+    """
+    Assemble research for a prompt within the stage's token budget
+
+    Priority: summary, then key facts, then the remaining raw sections
+    (quotes, context, what's next), each included once and trimmed to fit.
+
+    Args:
+        research: Research result
+        stage: Pipeline stage name (key of STAGE_RESEARCH_BUDGETS)
+        model: Model whose tokenizer to count with
+        budget: Override the stage budget
+
+    Returns:
+        Research text for the prompt
+    """
+    budget = budget if budget is not None else STAGE_RESEARCH_BUDGETS.get(stage, 2000)
+    parts = []
+
+    summary = truncate_to_tokens(research.summary or '', int(budget * SUMMARY_BUDGET_SHARE), model)
+    if summary:
+        parts.append(f"RESEARCH SUMMARY:\n{summary}")
+    remaining = budget - count_tokens(summary, model)
+
+    seen = set()
+    facts = []
+    for point in research.key_points:
+        key = _normalize(point)
+        if key in seen:
+            continue
+        cost = count_tokens(point, model) + 2
+        if cost > remaining:
+            break
+        seen.add(key)
+        facts.append(f"• {point}")
+        remaining -= cost
+    if facts:
+        parts.append("KEY FACTS:\n" + "\n".join(facts))
+
+    details = []
+    for paragraph in _research_remainder(research):
+        if remaining < MIN_PARAGRAPH_TOKENS:
+            break
+        paragraph = truncate_to_tokens(paragraph, remaining, model)
+        if paragraph:
+            details.append(paragraph)
+            remaining -= count_tokens(paragraph, model)
+    if details:
+        parts.append("ADDITIONAL RESEARCH:\n" + "\n\n".join(details))
+
+    return "\n\n".join(parts)
+
+
+def log_prompt_tokens(stage: str, system_prompt: str, user_prompt: str, model: str = 'gpt-4o') -> int:
+    """Log and return the input token count for a stage's prompt"""
+    system_tokens = count_tokens(system_prompt, model)
+    user_tokens = count_tokens(user_prompt, model)
+    total = system_tokens + user_tokens
+    print(f"[PROMPT] {stage}: system={system_tokens} user={user_tokens} total={total} tokens")
+    return total
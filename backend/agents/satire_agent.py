@@ -3,7 +3,6 @@ Satire Agent - The Lighter Side
 Covers satirical news in the style of The Onion
 """
 from agents.base_agent import BaseAgent, AgentConfig
-from datetime import datetime
 
 
 class SatireAgent(BaseAgent):
@@ -30,14 +29,10 @@ class SatireAgent(BaseAgent):
         super().__init__(config)
     
     def get_writing_system_prompt(self) -> str:
-        """Override with satire-specific writing prompt"""
-        today = datetime.now().strftime("%A, %B %d, %Y")
-        
-        return f"""You are a senior satirical journalist at The Wire Journal's humor section "The Lighter Side."
+        """Override with satire-specific writing prompt (static - the date comes with each request)"""
+        return """You are a senior satirical journalist at The Wire Journal's humor section "The Lighter Side."
 Your writing style is inspired by The Onion - absurdist satire delivered with deadpan seriousness.
 
-TODAY'S DATE: {today}
-
 YOUR MISSION:
 Take real news topics and create satirical takes that highlight absurdities, contradictions, or 
 ironies in current events. The humor comes from treating ridiculous premises with complete journalistic seriousness.
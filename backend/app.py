@@ -10,11 +10,15 @@ import os
 
 from config import config
 from routes.auth import auth_bp
-from routes.articles import articles_bp
+from routes.articles import articles_bp, frontpage_bp
 from routes.users import users_bp
 from routes.agents import agents_bp
 from routes.images import images_bp
 from routes.settings import settings_bp
+from routes.media import media_bp
+from services.job_queue import job_queue
+from services.article_store import detect_capabilities
+from services.article_cache import warm_article_cache
 
 
 def create_app(config_name=None):
@@ -45,10 +49,22 @@ def create_app(config_name=None):
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(articles_bp, url_prefix='/api/articles')
+    app.register_blueprint(frontpage_bp, url_prefix='/api/frontpage')
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(agents_bp, url_prefix='/api/agents')
     app.register_blueprint(images_bp, url_prefix='/api/images')
     app.register_blueprint(settings_bp, url_prefix='/api/settings')
+    app.register_blueprint(media_bp, url_prefix='/api/media')
+    
+    # Start agent workers (skip the reloader's parent process so jobs don't run twice)
+    if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_queue.start()
+        
+        # Detect optional image columns / embedded selects once, before the first request
+        try:
+            detect_capabilities()
+        except Exception as e:
+            print(f"[APP] Schema detection failed: {e}")
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -67,6 +83,10 @@ def create_app(config_name=None):
     def internal_error(error):
         return jsonify({'error': 'Internal server error'}), 500
     
+    # Fill the public article cache in the background (after all routes are registered)
+    if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_article_cache(app)
+    
     return app
 
 
@@ -0,0 +1,18 @@
+-- ============================================
+-- AGENT JOB QUEUE SUPPORT FOR agent_runs
+-- Run this in Supabase SQL Editor
+-- ============================================
+
+-- Jobs are inserted as 'queued' before a worker picks them up
+ALTER TABLE agent_runs DROP CONSTRAINT IF EXISTS agent_runs_status_check;
+ALTER TABLE agent_runs ADD CONSTRAINT agent_runs_status_check
+  CHECK (status IN ('queued', 'running', 'success', 'error'));
+
+-- Timing for each run
+ALTER TABLE agent_runs ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE agent_runs ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+
+-- Used on startup to resume unfinished jobs
+CREATE INDEX IF NOT EXISTS idx_agent_runs_status ON agent_runs(status);
+
+COMMENT ON COLUMN agent_runs.metadata IS 'Job kind, request params (word_count, writing_style, topic) and duration_seconds';
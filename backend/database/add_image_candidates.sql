@@ -0,0 +1,10 @@
+-- ============================================
+-- ADD IMAGE CANDIDATES COLUMN TO ARTICLES TABLE
+-- Run this in Supabase SQL Editor
+-- ============================================
+
+-- Image candidates gathered while an agent wrote the draft, so the admin
+-- image picker opens without waiting for extraction/generation
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS image_candidates JSONB;
+
+COMMENT ON COLUMN articles.image_candidates IS 'Result of the image pipeline for this draft: { "images": [...], "breakdown": {...}, "generatedAt": ... }';
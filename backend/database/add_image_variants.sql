@@ -0,0 +1,14 @@
+-- ============================================
+-- ADD MIRRORED VARIANT COLUMNS TO IMAGES TABLE
+-- Run this in Supabase SQL Editor
+-- ============================================
+
+-- Images are mirrored into the local media store; url points at the largest variant
+ALTER TABLE images ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS width INTEGER;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS height INTEGER;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS variants JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_images_content_hash ON images(content_hash);
+
+COMMENT ON COLUMN images.variants IS 'Resized WebP variants: { "w1600": { "url", "width", "height" }, "w800": ..., "w400": ..., "thumb": ... }';
@@ -0,0 +1,10 @@
+-- ============================================
+-- ADD QUALITY REVIEW COLUMN TO ARTICLES TABLE
+-- Run this in Supabase SQL Editor
+-- ============================================
+
+-- Structured editorial review produced by the agent pipeline:
+-- { "score", "sub_scores": { headline, lead, factual_density, style, readability }, "critique": [...], "summary" }
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS quality_review JSONB DEFAULT '{}'::jsonb;
+
+COMMENT ON COLUMN articles.quality_review IS 'Per-criterion sub-scores and critique points behind quality_score';
@@ -0,0 +1,32 @@
+-- ============================================
+-- ADD RESEARCH TABLE
+-- Run this in Supabase SQL Editor
+-- ============================================
+
+-- Perplexity research briefs, reused by reruns and article regeneration
+CREATE TABLE IF NOT EXISTS research (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  topic_key TEXT NOT NULL,  -- normalized topic|section|depth|YYYY-MM-DD
+  topic TEXT NOT NULL,
+  section TEXT NOT NULL,
+  depth TEXT NOT NULL DEFAULT 'deep',
+  summary TEXT NOT NULL DEFAULT '',
+  key_points JSONB DEFAULT '[]'::jsonb,
+  sources JSONB DEFAULT '[]'::jsonb,
+  raw_response TEXT NOT NULL DEFAULT '',
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_research_topic_key ON research(topic_key, created_at DESC);
+
+-- Link articles to the research they were written from
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS research_id UUID REFERENCES research(id) ON DELETE SET NULL;
+
+-- Enable RLS
+ALTER TABLE research ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Anon can manage research" ON research;
+
+CREATE POLICY "Anon can manage research"
+  ON research FOR ALL TO anon
+  USING (true) WITH CHECK (true);
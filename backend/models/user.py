@@ -5,6 +5,7 @@ from typing import Optional, Dict, List, Any
 from datetime import datetime
 import uuid
 from database.supabase_client import supabase
+from services.single_flight import coalesced_select
 
 
 class User:
@@ -82,7 +83,7 @@ class User:
     def find_by_email(email: str) -> Optional[Dict[str, Any]]:
         """Find user by email (includes password_hash for authentication)"""
         try:
-            response = supabase.table('users').select('*').eq('email', email).execute()
+            response = coalesced_select('users').eq('email', email).execute()
             if response.data and len(response.data) > 0:
                 return response.data[0]
             return None
@@ -94,7 +95,7 @@ class User:
     def find_by_id(user_id: str) -> Optional['User']:
         """Find user by ID"""
         try:
-            response = supabase.table('users').select('*').eq('id', user_id).execute()
+            response = coalesced_select('users').eq('id', user_id).execute()
             if response.data and len(response.data) > 0:
                 user_data = response.data[0]
                 return User(
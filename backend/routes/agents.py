@@ -4,9 +4,10 @@ Handles agent execution and article generation
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-import asyncio
 import os
 
+from services.job_queue import job_queue, QueueFullError
+
 agents_bp = Blueprint('agents', __name__)
 
 
@@ -14,10 +15,12 @@ agents_bp = Blueprint('agents', __name__)
 def run_agent():
     """
     POST /api/agents/run
-    Run a specific agent
+    Queue a run of a specific agent
     
     Body: { "section": str, "word_count": int, "writing_style": str, "topic": str (optional) }
-    Returns: { "success": bool, "articles_created": int }
+    Returns: { "success": bool, "job_id": str, "status": str }
+    
+    Poll GET /api/agents/jobs/:id for progress and the final article count.
     """
     try:
         # Check if API keys are configured
@@ -47,24 +50,27 @@ def run_agent():
         print(f"[AGENT] Word count: {word_count}, Style: {writing_style}")
         
         # Import here to avoid circular imports
-        from agents.orchestrator import run_single_agent
+        from agents.orchestrator import AGENTS
         
-        # Run agent
-        result = asyncio.run(run_single_agent(
-            agent_name=agent_name,
-            word_count=word_count,
-            writing_style=writing_style,
-            custom_topic=topic
-        ))
+        if agent_name not in AGENTS:
+            return jsonify({'success': False, 'error': f'Unknown agent: {agent_name}'}), 400
         
-        print(f"[AGENT] Result: {result}")
+        job = job_queue.submit('single', {
+            'agent_name': agent_name,
+            'word_count': word_count,
+            'writing_style': writing_style,
+            'topic': topic
+        })
         
         return jsonify({
-            'success': result['success'],
-            'articles_created': result['articles_created'],
-            'errors': result.get('errors', []),
-            'message': f'Agent {agent_name} completed'
-        }), 200
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'message': f'Agent {agent_name} queued'
+        }), 202
+        
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': 'Agent queue is full', 'message': str(e)}), 429
         
     except Exception as e:
         import traceback
@@ -77,10 +83,12 @@ def run_agent():
 def run_all_agents_route():
     """
     POST /api/agents/run-all
-    Run all agents
+    Queue a run of all agents
     
     Body: { "word_count": int, "writing_style": str }
-    Returns: { "success": bool, "articles_created": int }
+    Returns: { "success": bool, "job_id": str, "status": str }
+    
+    Poll GET /api/agents/jobs/:id for progress and the final article count.
     """
     try:
         # Check if API keys are configured
@@ -105,23 +113,20 @@ def run_all_agents_route():
         
         print(f"[AGENTS] Starting ALL agents. Word count: {word_count}, Style: {writing_style}")
         
-        # Import here to avoid circular imports
-        from agents.orchestrator import run_all_agents
-        
-        # Run all agents
-        result = asyncio.run(run_all_agents(
-            word_count=word_count,
-            writing_style=writing_style
-        ))
-        
-        print(f"[AGENTS] All agents result: {result}")
+        job = job_queue.submit('all', {
+            'word_count': word_count,
+            'writing_style': writing_style
+        })
         
         return jsonify({
-            'success': result['success'],
-            'articles_created': result['articles_created'],
-            'errors': result.get('errors', []),
-            'message': 'All agents completed'
-        }), 200
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'message': 'All agents queued'
+        }), 202
+        
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': 'Agent queue is full', 'message': str(e)}), 429
         
     except Exception as e:
         import traceback
@@ -130,6 +135,68 @@ def run_all_agents_route():
         return jsonify({'success': False, 'error': 'Failed to run agents', 'message': str(e)}), 500
 
 
+@agents_bp.route('/regenerate', methods=['POST'])
+@jwt_required()
+def regenerate_article_route():
+    """
+    POST /api/agents/regenerate
+    Queue a rewrite of an existing article from its stored research
+    
+    Body: { "article_id": str, "word_count": int, "writing_style": str }
+    Returns: { "success": bool, "job_id": str, "status": str }
+    """
+    try:
+        if not os.getenv('OPENAI_API_KEY'):
+            return jsonify({
+                'success': False,
+                'error': 'OPENAI_API_KEY not configured',
+                'message': 'Please add OPENAI_API_KEY to backend/.env'
+            }), 500
+        
+        data = request.get_json() or {}
+        article_id = data.get('article_id')
+        
+        if not article_id:
+            return jsonify({'success': False, 'error': 'article_id is required'}), 400
+        
+        job = job_queue.submit('regenerate', {
+            'article_id': article_id,
+            'word_count': data.get('word_count', 800),
+            'writing_style': data.get('writing_style', 'standard')
+        })
+        
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'message': 'Regeneration queued'
+        }), 202
+        
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': 'Agent queue is full', 'message': str(e)}), 429
+        
+    except Exception as e:
+        print(f"Regenerate article error: {e}")
+        return jsonify({'success': False, 'error': 'Failed to regenerate article', 'message': str(e)}), 500
+
+
+@agents_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """
+    GET /api/agents/jobs/:id
+    Get status of a queued agent run
+    
+    Returns: { "job": { "id", "status", "articles_created", "errors", "started_at", "completed_at", ... } }
+    """
+    job = job_queue.get(job_id)
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({'job': job}), 200
+
+
 @agents_bp.route('/status', methods=['GET'])
 @jwt_required()
 def get_agent_status():
@@ -137,10 +204,14 @@ def get_agent_status():
     GET /api/agents/status
     Get agent run history
     
-    Returns: { "runs": [...] }
+    Returns: { "runs": [...], "queue": {...}, "llm_cache": {...}, "source_cache": {...}, "article_cache": {...}, "single_flight": {...} }
     """
     try:
         from database.supabase_client import supabase
+        from services.llm_cache import get_cache_stats
+        from services.source_cache import get_source_cache_stats
+        from services.article_cache import get_article_cache_stats
+        from services.single_flight import get_single_flight_stats
         
         response = supabase.table('agent_runs')\
             .select('*')\
@@ -148,7 +219,14 @@ def get_agent_status():
             .limit(10)\
             .execute()
         
-        return jsonify({'runs': response.data or []}), 200
+        return jsonify({
+            'runs': response.data or [],
+            'queue': job_queue.get_stats(),
+            'llm_cache': get_cache_stats(),
+            'source_cache': get_source_cache_stats(),
+            'article_cache': get_article_cache_stats(),
+            'single_flight': get_single_flight_stats()
+        }), 200
         
     except Exception as e:
         print(f"Get agent status error: {e}")
@@ -2,85 +2,26 @@
 Articles API Routes
 Handles article CRUD operations
 """
+import os
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, jwt_required
 from database.supabase_client import supabase
 from typing import Optional, List, Dict, Any
+from services.article_store import ARTICLE_VIEWS, parse_view, query_articles, load_images, attach_images, attach_image
+from services.article_cache import read_through, invalidate_articles
+from services.single_flight import coalesced_select
 
 articles_bp = Blueprint('articles', __name__)
+frontpage_bp = Blueprint('frontpage', __name__)
 
+INVALID_VIEW_ERROR = f"Invalid view. Valid: {list(ARTICLE_VIEWS)}"
 
-def enrich_articles_with_images(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """
-    Enrich articles with image URLs and captions by fetching from images table
-    """
-    if not articles:
-        return articles
-    
-    # Get all image_ids that are not None
-    image_ids = [a['image_id'] for a in articles if a.get('image_id')]
-    
-    if not image_ids:
-        return articles
-    
-    try:
-        # Try to fetch images with caption (if column exists)
-        try:
-            images_response = supabase.table('images').select('id, url, caption').in_('id', image_ids).execute()
-        except:
-            # Fallback: caption column might not exist yet
-            images_response = supabase.table('images').select('id, url').in_('id', image_ids).execute()
-        
-        # Create a map of image_id -> {url, caption}
-        image_map = {img['id']: {'url': img['url'], 'caption': img.get('caption')} for img in (images_response.data or [])}
-        
-        # Enrich articles
-        for article in articles:
-            if article.get('image_id') and article['image_id'] in image_map:
-                article['image_url'] = image_map[article['image_id']]['url']
-                article['image_caption'] = image_map[article['image_id']].get('caption')
-            else:
-                article['image_url'] = None
-                article['image_caption'] = None
-    except Exception as e:
-        print(f"Error enriching articles with images: {e}")
-        # If images table doesn't exist or query fails, just return articles as-is
-        for article in articles:
-            article['image_url'] = None
-            article['image_caption'] = None
-    
-    return articles
-
-
-def enrich_article_with_image(article: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Enrich a single article with its image URL and caption
-    """
-    if not article or not article.get('image_id'):
-        article['image_url'] = None
-        article['image_caption'] = None
-        return article
-    
-    try:
-        # Try to fetch with caption (if column exists)
-        try:
-            image_response = supabase.table('images').select('url, caption').eq('id', article['image_id']).execute()
-        except:
-            # Fallback: caption column might not exist yet
-            image_response = supabase.table('images').select('url').eq('id', article['image_id']).execute()
-        
-        if image_response.data and len(image_response.data) > 0:
-            article['image_url'] = image_response.data[0]['url']
-            article['image_caption'] = image_response.data[0].get('caption')
-        else:
-            article['image_url'] = None
-            article['image_caption'] = None
-    except Exception as e:
-        print(f"Error fetching image for article: {e}")
-        article['image_url'] = None
-        article['image_caption'] = None
-    
-    return article
+# Front page rails (the headlines rail is the first FRONTPAGE_HEADLINES of top)
+FRONTPAGE_TOP = 12
+FRONTPAGE_HEADLINES = 10
+FRONTPAGE_OPINION = 8
+FRONTPAGE_SATIRE = 4
+FRONTPAGE_MAX_AGE = int(os.getenv('FRONTPAGE_MAX_AGE', '60'))
 
 
 @articles_bp.route('', methods=['GET'])
@@ -94,6 +35,7 @@ def get_articles():
     - limit: Number of articles (default: 20)
     - status: Filter by status (default: published)
     - user_id: Filter by user preferences (requires JWT)
+    - view: Projection - card (default), summary or full
     
     Returns: { "articles": [...] }
     """
@@ -101,26 +43,36 @@ def get_articles():
         section = request.args.get('section')
         limit = int(request.args.get('limit', 20))
         status = request.args.get('status', 'published')
+        view = parse_view(request.args)
+        if not view:
+            return jsonify({'error': INVALID_VIEW_ERROR}), 400
         
-        query = supabase.table('articles').select('*')
-        
-        # Filter by status
-        query = query.eq('status', status)
-        
-        # Filter by section if provided
-        if section:
-            query = query.eq('section', section)
-        
-        # Order by created_at descending
-        query = query.order('created_at', desc=True)
-        
-        # Limit results
-        query = query.limit(limit)
-        
-        response = query.execute()
+        def load_articles():
+            query = query_articles(ARTICLE_VIEWS[view])
+            
+            # Filter by status
+            query = query.eq('status', status)
+            
+            # Filter by section if provided
+            if section:
+                query = query.eq('section', section)
+            
+            # Order by created_at descending
+            query = query.order('created_at', desc=True)
+            
+            # Limit results
+            query = query.limit(limit)
+            
+            response = query.execute()
+            
+            # Flatten embedded images into image_url etc.
+            return attach_images(response.data or [])
         
-        # Enrich with image URLs
-        articles = enrich_articles_with_images(response.data or [])
+        # Only published lists are public (drafts change on every agent run)
+        if status == 'published':
+            articles = read_through(f"list:{section or '*'}:{limit}:{view}", load_articles)
+        else:
+            articles = load_articles()
         
         return jsonify({'articles': articles}), 200
         
@@ -136,14 +88,21 @@ def get_personalized_articles():
     GET /api/articles/personalized
     Get articles based on user preferences
     
+    Query params:
+    - limit: Number of articles (default: 20)
+    - view: Projection - card (default), summary or full
+    
     Returns: { "articles": [...] }
     """
     try:
         user_id = get_jwt_identity()
         limit = int(request.args.get('limit', 20))
+        view = parse_view(request.args)
+        if not view:
+            return jsonify({'error': INVALID_VIEW_ERROR}), 400
         
         # Get user preferences
-        user_response = supabase.table('users').select('preferences').eq('id', user_id).execute()
+        user_response = coalesced_select('users', 'preferences').eq('id', user_id).execute()
         
         if not user_response.data:
             return jsonify({'error': 'User not found'}), 404
@@ -152,16 +111,15 @@ def get_personalized_articles():
         preferred_sections = preferences.get('sections', ['politics', 'economics', 'world', 'business', 'tech', 'opinion'])
         
         # Get articles from preferred sections
-        response = supabase.table('articles')\
-            .select('*')\
+        response = query_articles(ARTICLE_VIEWS[view])\
             .eq('status', 'published')\
             .in_('section', preferred_sections)\
             .order('created_at', desc=True)\
             .limit(limit)\
             .execute()
         
-        # Enrich with image URLs
-        articles = enrich_articles_with_images(response.data or [])
+        # Flatten embedded images into image_url etc.
+        articles = attach_images(response.data or [])
         
         return jsonify({'articles': articles}), 200
         
@@ -179,13 +137,12 @@ def get_article(article_id):
     Returns: { "article": {...} }
     """
     try:
-        response = supabase.table('articles').select('*').eq('id', article_id).execute()
+        response = query_articles().eq('id', article_id).execute()
         
         if not response.data or len(response.data) == 0:
             return jsonify({'error': 'Article not found'}), 404
         
-        # Enrich with image URL
-        article = enrich_article_with_image(response.data[0])
+        article = attach_image(response.data[0])
         
         return jsonify({'article': article}), 200
         
@@ -203,13 +160,14 @@ def get_article_by_slug(slug):
     Returns: { "article": {...} }
     """
     try:
-        response = supabase.table('articles').select('*').eq('slug', slug).execute()
+        def load_article():
+            response = query_articles().eq('slug', slug).execute()
+            return attach_image(response.data[0]) if response.data else None
         
-        if not response.data or len(response.data) == 0:
-            return jsonify({'error': 'Article not found'}), 404
+        article = read_through(f'slug:{slug}', load_article)
         
-        # Enrich with image URL
-        article = enrich_article_with_image(response.data[0])
+        if not article:
+            return jsonify({'error': 'Article not found'}), 404
         
         return jsonify({'article': article}), 200
         
@@ -248,6 +206,8 @@ def create_article():
         if not response.data:
             return jsonify({'error': 'Failed to create article'}), 500
         
+        invalidate_articles('create_article')
+        
         return jsonify({
             'article': response.data[0],
             'message': 'Article created successfully'
@@ -285,6 +245,8 @@ def update_article(article_id):
         if not response.data or len(response.data) == 0:
             return jsonify({'error': 'Article not found'}), 404
         
+        invalidate_articles('update_article')
+        
         return jsonify({
             'article': response.data[0],
             'success': True,
@@ -307,6 +269,7 @@ def delete_article(article_id):
     """
     try:
         supabase.table('articles').delete().eq('id', article_id).execute()
+        invalidate_articles('delete_article')
         
         return jsonify({'message': 'Article deleted successfully'}), 200
         
@@ -334,6 +297,8 @@ def set_lead_article(article_id):
             # Insert new
             supabase.table('site_settings').insert({'key': 'lead_article_id', 'value': article_id}).execute()
         
+        invalidate_articles('set_lead_article')
+        
         return jsonify({'success': True, 'message': 'Lead story updated'}), 200
         
     except Exception as e:
@@ -401,10 +366,12 @@ def save_article_image(article_id):
     POST /api/articles/:id/image
     Save image for article
     
-    Body: { "imageData": { id, url, source, sourceDomain, prompt, sourceUrl, caption? } }
-    Returns: { "success": bool, "imageId": str, "imageUrl": str, "caption": str }
+    Body: { "imageData": { id, url, source, sourceDomain, prompt, sourceUrl, width?, height?, caption? } }
+    Returns: { "success": bool, "imageId": str, "imageUrl": str, "variants": {...}, "caption": str }
     
     If no caption is provided, one will be auto-generated using AI.
+    The image is mirrored into the media store (resized WebP variants);
+    if mirroring fails the original URL is stored as before.
     """
     try:
         data = request.get_json()
@@ -451,7 +418,15 @@ def save_article_image(article_id):
                     print(f"[CAPTION] Auto-generation failed: {caption_err}")
                     caption = ''
         
-        # Save image to database - try with caption first, fallback without
+        # Mirror into the media store so we keep compact URLs that don't expire
+        mirrored = None
+        if image_url:
+            import asyncio
+            from services.media_store import mirror_image
+            from services.job_queue import run_pooled
+            mirrored = asyncio.run(run_pooled(mirror_image(image_url)))
+        
+        # Save image to database - try with caption and variants first, fallback without
         image_insert_data = {
             'article_id': article_id,
             'image_type': image_type,
@@ -460,15 +435,22 @@ def save_article_image(article_id):
             'prompt': image_data.get('prompt', ''),
             'alt_text': alt_text,
         }
-        
-        # Try to include caption (if column exists)
+        if mirrored:
+            image_insert_data.update(mirrored.to_columns())
+        elif image_data.get('width') and image_data.get('height'):
+            # Probed dimensions, so pages can reserve layout space
+            image_insert_data['width'] = image_data['width']
+            image_insert_data['height'] = image_data['height']
+        
+        # Try to include caption and variant columns (if they exist)
         try:
             image_insert_data['caption'] = caption
             image_record = supabase.table('images').insert(image_insert_data).execute()
         except Exception as insert_err:
-            # Caption column might not exist, try without it
-            print(f"[IMAGES] Insert with caption failed, trying without: {insert_err}")
-            image_insert_data.pop('caption', None)
+            # Optional columns might not exist, try without them
+            print(f"[IMAGES] Insert with optional columns failed, trying without: {insert_err}")
+            for column in ('caption', 'content_hash', 'width', 'height', 'variants'):
+                image_insert_data.pop(column, None)
             image_record = supabase.table('images').insert(image_insert_data).execute()
         
         if not image_record.data:
@@ -480,11 +462,14 @@ def save_article_image(article_id):
         supabase.table('articles').update({
             'image_id': saved_image_id
         }).eq('id', article_id).execute()
+        invalidate_articles('save_article_image')
         
+        from services.media_store import public_url, public_variants
         return jsonify({
             'success': True,
             'imageId': saved_image_id,
-            'imageUrl': image_url,
+            'imageUrl': public_url(image_insert_data['url']),
+            'variants': public_variants(mirrored.variants) if mirrored else None,
             'caption': caption
         }), 200
         
@@ -500,6 +485,7 @@ def save_article_image(article_id):
             }).eq('id', article_id).execute()
             
             if response.data:
+                invalidate_articles('save_article_image')
                 return jsonify({
                     'success': True,
                     'imageId': image_data.get('id'),
@@ -528,6 +514,8 @@ def publish_article(article_id):
         if not response.data or len(response.data) == 0:
             return jsonify({'error': 'Article not found'}), 404
         
+        invalidate_articles('publish_article')
+        
         return jsonify({
             'article': response.data[0],
             'message': 'Article published successfully'
@@ -567,6 +555,33 @@ def track_reading(article_id):
         return jsonify({'error': 'Failed to track reading'}), 500
 
 
+def load_lead_article() -> Dict[str, Any]:
+    """{ "article": {...} | None } for the lead story"""
+    # Get from site_settings
+    response = coalesced_select('site_settings', 'value').eq('key', 'lead_article_id').execute()
+    
+    if response.data and len(response.data) > 0:
+        lead_article_id = response.data[0]['value']
+        
+        # Get article (image embedded)
+        article_response = query_articles().eq('id', lead_article_id).execute()
+        
+        if article_response.data and len(article_response.data) > 0:
+            return {'article': attach_image(article_response.data[0])}
+    
+    # Fallback: get most recent published article
+    response = query_articles()\
+        .eq('status', 'published')\
+        .order('created_at', desc=True)\
+        .limit(1)\
+        .execute()
+    
+    if response.data and len(response.data) > 0:
+        return {'article': attach_image(response.data[0])}
+    
+    return {'article': None}
+
+
 @articles_bp.route('/lead', methods=['GET'])
 def get_lead_article():
     """
@@ -576,32 +591,7 @@ def get_lead_article():
     Returns: { "article": {...} }
     """
     try:
-        # Get from site_settings
-        response = supabase.table('site_settings').select('value').eq('key', 'lead_article_id').execute()
-        
-        if response.data and len(response.data) > 0:
-            lead_article_id = response.data[0]['value']
-            
-            # Get article
-            article_response = supabase.table('articles').select('*').eq('id', lead_article_id).execute()
-            
-            if article_response.data and len(article_response.data) > 0:
-                article = enrich_article_with_image(article_response.data[0])
-                return jsonify({'article': article}), 200
-        
-        # Fallback: get most recent published article
-        response = supabase.table('articles')\
-            .select('*')\
-            .eq('status', 'published')\
-            .order('created_at', desc=True)\
-            .limit(1)\
-            .execute()
-        
-        if response.data and len(response.data) > 0:
-            article = enrich_article_with_image(response.data[0])
-            return jsonify({'article': article}), 200
-        
-        return jsonify({'article': None}), 200
+        return jsonify(read_through('lead:article', load_lead_article)), 200
         
     except Exception as e:
         print(f"Get lead article error: {e}")
@@ -614,25 +604,34 @@ def get_articles_by_section(section):
     GET /api/articles/sections/:section
     Get articles for a specific section
     
+    Query params:
+    - limit: Number of articles (default: 20)
+    - view: Projection - card (default), summary or full
+    
     Returns: { "articles": [...] }
     """
     try:
         limit = int(request.args.get('limit', 20))
+        view = parse_view(request.args)
+        if not view:
+            return jsonify({'error': INVALID_VIEW_ERROR}), 400
         
         valid_sections = ['politics', 'economics', 'world', 'business', 'tech', 'opinion', 'satire']
         if section not in valid_sections:
             return jsonify({'error': f'Invalid section. Valid: {valid_sections}'}), 400
         
-        response = supabase.table('articles')\
-            .select('*')\
-            .eq('status', 'published')\
-            .eq('section', section)\
-            .order('created_at', desc=True)\
-            .limit(limit)\
-            .execute()
+        def load_section():
+            response = query_articles(ARTICLE_VIEWS[view])\
+                .eq('status', 'published')\
+                .eq('section', section)\
+                .order('created_at', desc=True)\
+                .limit(limit)\
+                .execute()
+            
+            # Flatten embedded images into image_url etc.
+            return attach_images(response.data or [])
         
-        # Enrich with image URLs
-        articles = enrich_articles_with_images(response.data or [])
+        articles = read_through(f'section:{section}:{limit}:{view}', load_section)
         
         return jsonify({'articles': articles}), 200
         
@@ -667,16 +666,15 @@ def search_articles():
         # Search in title, excerpt, and body
         search_pattern = f'%{query}%'
         
-        response = supabase.table('articles')\
-            .select('id, title, excerpt, slug, section, author, created_at, image_id')\
+        response = query_articles(ARTICLE_VIEWS['card'])\
             .eq('status', 'published')\
             .or_(f'title.ilike.{search_pattern},excerpt.ilike.{search_pattern}')\
             .order('created_at', desc=True)\
             .limit(limit)\
             .execute()
         
-        # Enrich with image URLs
-        articles = enrich_articles_with_images(response.data or [])
+        # Flatten embedded images into image_url etc.
+        articles = attach_images(response.data or [])
         
         return jsonify({
             'articles': articles,
@@ -690,3 +688,75 @@ def search_articles():
         print(traceback.format_exc())
         return jsonify({'error': 'Failed to search articles', 'message': str(e)}), 500
 
+
+def build_frontpage() -> Dict[str, Any]:
+    """
+    Assemble the homepage in one pass
+    
+    Rails reference rows by id; each row appears once in 'articles' however
+    many rails it's on, and all rows share one image lookup. The lead is sent
+    separately because it gets the full-size image.
+    """
+    card = ARTICLE_VIEWS['card']
+    
+    def published(section: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        query = query_articles(card).eq('status', 'published')
+        if section:
+            query = query.eq('section', section)
+        return query.order('created_at', desc=True).limit(limit).execute().data or []
+    
+    top = published(None, FRONTPAGE_TOP)
+    opinion = published('opinion', FRONTPAGE_OPINION)
+    satire = published('satire', FRONTPAGE_SATIRE)
+    
+    rows: Dict[str, Dict[str, Any]] = {}
+    for row in top + opinion + satire:
+        rows.setdefault(row['id'], row)
+    
+    # Lead: the configured lead article, falling back to the newest story
+    lead_id = None
+    settings = coalesced_select('site_settings', 'value').eq('key', 'lead_article_id').execute()
+    if settings.data:
+        lead_id = settings.data[0]['value']
+    lead = None
+    if lead_id and lead_id in rows:
+        lead = dict(rows[lead_id])
+    elif lead_id:
+        response = query_articles(card).eq('id', lead_id).execute()
+        lead = response.data[0] if response.data else None
+    if lead is None and top:
+        lead = dict(top[0])
+    
+    unique = list(rows.values())
+    load_images(unique + ([lead] if lead else []))
+    attach_images(unique)
+    if lead:
+        attach_image(lead)
+    
+    return {
+        'lead': lead,
+        'articles': rows,
+        'top': [row['id'] for row in top],
+        'headlines': [row['id'] for row in top[:FRONTPAGE_HEADLINES]],
+        'opinion': [row['id'] for row in opinion],
+        'satire': [row['id'] for row in satire],
+    }
+
+
+@frontpage_bp.route('', methods=['GET'])
+def get_frontpage():
+    """
+    GET /api/frontpage
+    Lead story plus top, headlines, opinion and satire rails in one response
+    
+    Returns: { "lead": {...}, "articles": { id: {...} }, "top": [id], "headlines": [id], "opinion": [id], "satire": [id] }
+    """
+    try:
+        response = jsonify(read_through('frontpage:home', build_frontpage))
+        response.headers['Cache-Control'] = f'public, max-age={FRONTPAGE_MAX_AGE}'
+        response.add_etag()
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        print(f"Get frontpage error: {e}")
+        return jsonify({'error': 'Failed to get front page'}), 500
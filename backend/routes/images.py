@@ -1,24 +1,74 @@
 """
 Images API Routes
-Handles image generation for articles using 3-tier pipeline
+Handles image generation for articles (source extraction, then AI generation)
 """
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from typing import Dict, Any, List, Optional
 import asyncio
 
 images_bp = Blueprint('images', __name__)
 
 
+def get_stored_candidates(article_id: str) -> Optional[Dict[str, Any]]:
+    """Image candidates stored on an article, if any (None if the column doesn't exist yet)"""
+    from services.article_store import detect_capabilities
+    if 'image_candidates' not in detect_capabilities()['article_columns']:
+        return None
+    
+    try:
+        from database.supabase_client import supabase
+        response = supabase.table('articles').select('image_candidates').eq('id', article_id).execute()
+    except Exception as e:
+        print(f"[API] Could not load image candidates for {article_id}: {e}")
+        return None
+    
+    if not response.data:
+        return None
+    candidates = response.data[0].get('image_candidates')
+    return candidates if candidates and candidates.get('images') else None
+
+
+def public_images(images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Candidates with media-store paths turned into the URLs clients should request"""
+    from services.media_store import public_url
+    return [{**image, 'url': public_url(image.get('url'))} for image in images]
+
+
+def store_candidates(article_id: str, result: Dict[str, Any]) -> None:
+    """Store generated candidates on the article so reopening the picker is instant"""
+    from datetime import datetime, timezone
+    from services.article_store import detect_capabilities
+    
+    if 'image_candidates' not in detect_capabilities()['article_columns']:
+        return
+    
+    try:
+        from database.supabase_client import supabase
+        supabase.table('articles').update({
+            'image_candidates': {**result, 'generatedAt': datetime.now(timezone.utc).isoformat()}
+        }).eq('id', article_id).execute()
+    except Exception as e:
+        print(f"[API] Could not store image candidates for {article_id}: {e}")
+
+
 @images_bp.route('/generate', methods=['POST'])
+@jwt_required(optional=True)
 def generate_images():
     """
     POST /api/images/generate
-    Generate images for an article using 3-tier pipeline:
+    Generate images for an article:
     1. Extract OG images from sources (free, authentic)
-    2. Gemini Imagen (if configured)
-    3. DALL-E fallback
+    2. AI generation - DALL-E and/or Gemini Imagen, optionally raced
     
-    Body: { "title": str, "excerpt": str, "section": str, "sources": [...] }
-    Returns: { "images": [...], "success": bool, "breakdown": {...} }
+    Body: { "title": str, "excerpt": str, "section": str, "sources": [...],
+            "articleId": str (optional), "refresh": bool (optional) }
+    Returns: { "images": [...], "success": bool, "breakdown": {...}, "prefetched": bool }
+    
+    With articleId, candidates prefetched while the agent wrote the draft are
+    returned immediately (unless refresh is set), and freshly generated
+    candidates are stored on the article. Requests with articleId or refresh
+    read/write the article and require a JWT.
     """
     try:
         data = request.get_json()
@@ -26,6 +76,8 @@ def generate_images():
         excerpt = data.get('excerpt', '')
         section = data.get('section')
         sources = data.get('sources', [])
+        article_id = data.get('articleId')
+        refresh = bool(data.get('refresh'))
         
         if not title:
             return jsonify({'error': 'title is required', 'success': False}), 400
@@ -33,18 +85,34 @@ def generate_images():
         if not section:
             return jsonify({'error': 'section is required', 'success': False}), 400
         
+        if (article_id or refresh) and not get_jwt_identity():
+            return jsonify({'error': 'Authentication required for articleId/refresh', 'success': False}), 401
+        
+        if article_id and not refresh:
+            stored = get_stored_candidates(article_id)
+            if stored:
+                print(f"[API] Returning {len(stored['images'])} prefetched image(s) for article {article_id}")
+                return jsonify({
+                    'success': True,
+                    'images': public_images(stored['images']),
+                    'breakdown': stored.get('breakdown', {}),
+                    'prefetched': True,
+                    'message': f"Loaded {len(stored['images'])} prefetched image(s)"
+                }), 200
+        
         print(f"\n[API] Image generation request for: {title[:50]}...")
         
         # Import here to avoid circular imports
         from services.image_service import generate_images_for_article
+        from services.job_queue import run_pooled
         
         # Run async function
-        result = asyncio.run(generate_images_for_article(
+        result = asyncio.run(run_pooled(generate_images_for_article(
             title=title,
             excerpt=excerpt,
             section=section,
             sources=sources
-        ))
+        )))
         
         if not result['success']:
             return jsonify({
@@ -54,10 +122,14 @@ def generate_images():
                 'breakdown': result.get('breakdown', {})
             }), 500
         
+        if article_id:
+            store_candidates(article_id, result)
+        
         return jsonify({
             'success': True,
-            'images': result['images'],
+            'images': public_images(result['images']),
             'breakdown': result['breakdown'],
+            'prefetched': False,
             'message': f"Generated {len(result['images'])} image(s)"
         }), 200
         
@@ -99,6 +171,9 @@ def select_image(image_id):
         if not response.data:
             return jsonify({'error': 'Failed to select image'}), 500
         
+        from services.article_cache import invalidate_articles
+        invalidate_articles('select_image')
+        
         return jsonify({'success': True, 'message': 'Image selected successfully'}), 200
         
     except Exception as e:
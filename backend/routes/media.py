@@ -0,0 +1,23 @@
+"""
+Media API Routes
+Serves mirrored article images from the local media store
+"""
+from flask import Blueprint, send_from_directory
+
+from services.media_store import MEDIA_ROOT
+
+media_bp = Blueprint('media', __name__)
+
+# Files are content-addressed, so a URL's bytes never change
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+@media_bp.route('/<path:filename>', methods=['GET'])
+def get_media(filename):
+    """
+    GET /api/media/:hash[:2]/:hash/:variant
+    Serve a stored image variant
+    """
+    response = send_from_directory(MEDIA_ROOT, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
@@ -3,7 +3,8 @@ Settings API Routes
 Handles site settings
 """
 from flask import Blueprint, jsonify
-from database.supabase_client import supabase
+from services.article_cache import read_through
+from services.single_flight import coalesced_select
 
 settings_bp = Blueprint('settings', __name__)
 
@@ -17,12 +18,15 @@ def get_lead_article_id():
     Returns: { "leadArticleId": str | null }
     """
     try:
-        response = supabase.table('site_settings').select('value').eq('key', 'lead_article_id').execute()
+        def load_setting():
+            response = coalesced_select('site_settings', 'value').eq('key', 'lead_article_id').execute()
+            
+            if response.data and len(response.data) > 0:
+                return {'leadArticleId': response.data[0]['value']}
+            
+            return {'leadArticleId': None}
         
-        if response.data and len(response.data) > 0:
-            return jsonify({'leadArticleId': response.data[0]['value']}), 200
-        
-        return jsonify({'leadArticleId': None}), 200
+        return jsonify(read_through('setting:lead_article_id', load_setting)), 200
         
     except Exception as e:
         print(f"Get lead article ID error: {e}")
@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
 from database.supabase_client import supabase
+from services.article_store import ARTICLE_VIEWS, parse_view, article_select, attach_images
 
 users_bp = Blueprint('users', __name__)
 
@@ -180,6 +181,9 @@ def get_bookmarks(user_id):
     GET /api/users/:id/bookmarks
     Get user's bookmarked articles
     
+    Query params:
+    - view: Article projection - card (default), summary or full
+    
     Returns: { "bookmarks": [...] }
     """
     try:
@@ -188,9 +192,13 @@ def get_bookmarks(user_id):
         if current_user_id != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Get bookmarks with article details
+        view = parse_view(request.args)
+        if not view:
+            return jsonify({'error': f"Invalid view. Valid: {list(ARTICLE_VIEWS)}"}), 400
+        
+        # Get bookmarks with article details (image embedded)
         response = supabase.table('user_bookmarks')\
-            .select('*, articles(*)')\
+            .select(f"id, created_at, articles({article_select(ARTICLE_VIEWS[view])})")\
             .eq('user_id', user_id)\
             .order('created_at', desc=True)\
             .execute()
@@ -205,6 +213,7 @@ def get_bookmarks(user_id):
                         'bookmarked_at': bookmark['created_at'],
                         'article': article
                     })
+            attach_images([b['article'] for b in bookmarks])
         
         return jsonify({'bookmarks': bookmarks}), 200
         
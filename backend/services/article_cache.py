@@ -0,0 +1,258 @@
+"""
+Article Cache
+Read-through cache for the public article endpoints
+
+Public pages (lists, sections, lead, slug pages, front page, lead setting)
+only change when an editor mutates an article, so responses are cached
+per key with a TTL and dropped wholesale by invalidate_articles(), which
+the mutating routes call after a successful write.
+
+Tiers:
+1. In-process memory (parsed payloads, no JSON decoding on a hit)
+2. Optional shared tier (ARTICLE_CACHE_SHARED=true): a disk-only
+   ResponseCache in SQLite, shared by workers on the same host
+
+Invalidation bumps a generation number instead of deleting keys. With
+the shared tier the generation lives in SQLite, so a publish in one
+worker invalidates every worker's memory tier within
+ARTICLE_CACHE_GENERATION_CHECK seconds (the generation is re-read with a
+plain SELECT at most that often, so memory hits don't touch the disk).
+"""
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from services.llm_cache import ResponseCache
+
+# Cache configuration (overridable via environment)
+ARTICLE_CACHE_ENABLED = os.getenv('ARTICLE_CACHE_ENABLED', 'true').lower() == 'true'
+ARTICLE_CACHE_MEMORY_ITEMS = int(os.getenv('ARTICLE_CACHE_MEMORY_ITEMS', '512'))
+ARTICLE_CACHE_SHARED = os.getenv('ARTICLE_CACHE_SHARED', 'false').lower() == 'true'
+# How long a worker trusts its last read of the shared generation (seconds)
+ARTICLE_CACHE_GENERATION_CHECK = float(os.getenv('ARTICLE_CACHE_GENERATION_CHECK', '1'))
+ARTICLE_CACHE_PATH = os.getenv(
+    'ARTICLE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'article_cache.sqlite3')
+)
+
+# TTLs in seconds, by key kind (the part of the key before the first ':')
+ARTICLE_CACHE_TTLS = {
+    'list': int(os.getenv('ARTICLE_CACHE_LIST_TTL', '60')),
+    'section': int(os.getenv('ARTICLE_CACHE_SECTION_TTL', '120')),
+    'lead': int(os.getenv('ARTICLE_CACHE_LEAD_TTL', '60')),
+    'slug': int(os.getenv('ARTICLE_CACHE_SLUG_TTL', '300')),
+    'frontpage': int(os.getenv('ARTICLE_CACHE_FRONTPAGE_TTL', '60')),
+    'setting': int(os.getenv('ARTICLE_CACHE_SETTING_TTL', '300')),
+}
+DEFAULT_TTL = 60
+
+# Endpoints requested at startup so the first visitors hit a warm cache
+WARM_PATHS = [
+    '/api/frontpage',
+    '/api/articles/lead',
+    '/api/settings/lead-article',
+    '/api/articles',
+] + [
+    f'/api/articles/sections/{section}'
+    for section in ('politics', 'economics', 'world', 'business', 'tech', 'opinion', 'satire')
+]
+
+_GENERATION_KEY = 'generation'
+# Effectively forever; the generation must outlive every cached entry
+_GENERATION_TTL = 365 * 24 * 3600
+
+
+class ArticleCache:
+    """Memory (+ optional shared) read-through cache with generation-based invalidation"""
+
+    def __init__(self, memory_items: int = 512, shared: Optional[ResponseCache] = None):
+        self.memory_items = memory_items
+        self.shared = shared
+        self._memory: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._generation_checked = 0.0
+        self.stats = {
+            'memory_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+            'warmed': 0,
+        }
+        # Per key kind: [hits, misses]
+        self._kinds: Dict[str, list] = {}
+
+    def generation(self) -> int:
+        """Current generation (re-read from the shared tier at most every ARTICLE_CACHE_GENERATION_CHECK)"""
+        if self.shared is None:
+            return self._generation
+
+        now = time.monotonic()
+        if now - self._generation_checked < ARTICLE_CACHE_GENERATION_CHECK:
+            return self._generation
+        value = self.shared.peek(_GENERATION_KEY)
+        with self._lock:
+            if value is not None:
+                self._generation = max(self._generation, int(value))
+            self._generation_checked = now
+            return self._generation
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(found, value) for a key in the current generation"""
+        generation = self.generation()
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, entry_generation = entry
+                if expires_at > now and entry_generation == generation:
+                    self._memory.move_to_end(key)
+                    self._count(key, 'memory_hits')
+                    return True, value
+                del self._memory[key]
+
+        if self.shared is not None:
+            raw = self.shared.get(f'{generation}:{key}')
+            if raw is not None:
+                value = json.loads(raw)
+                with self._lock:
+                    # The shared tier doesn't expose expiry; keep the local copy for the shortest TTL
+                    self._remember(key, value, now + min(ARTICLE_CACHE_TTLS.values()), generation)
+                    self._count(key, 'shared_hits')
+                return True, value
+
+        with self._lock:
+            self._count(key, 'misses')
+        return False, None
+
+    def set(self, key: str, value: Any, ttl: float, generation: Optional[int] = None) -> None:
+        """Store a JSON-serializable payload for ttl seconds"""
+        if generation is None:
+            generation = self.generation()
+        with self._lock:
+            self._remember(key, value, time.time() + ttl, generation)
+        if self.shared is not None:
+            self.shared.set(f'{generation}:{key}', json.dumps(value), ttl)
+
+    def invalidate(self) -> int:
+        """Start a new generation, dropping every cached payload; returns the new generation"""
+        current = self.shared.peek(_GENERATION_KEY) if self.shared is not None else None
+        with self._lock:
+            self._generation = max(self._generation, int(current or 0)) + 1
+            self._generation_checked = time.monotonic()
+            self._memory.clear()
+            self.stats['invalidations'] += 1
+            generation = self._generation
+        if self.shared is not None:
+            self.shared.set(_GENERATION_KEY, str(generation), _GENERATION_TTL)
+        return generation
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, overall and per key kind"""
+        generation = self.generation()
+        with self._lock:
+            hits = self.stats['memory_hits'] + self.stats['shared_hits']
+            lookups = hits + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+                'by_kind': {
+                    kind: {
+                        'hits': counts[0],
+                        'misses': counts[1],
+                        'hit_ratio': round(counts[0] / (counts[0] + counts[1]), 3) if any(counts) else 0.0,
+                    }
+                    for kind, counts in self._kinds.items()
+                },
+                'memory_items': len(self._memory),
+                'generation': generation,
+                'shared': self.shared is not None,
+            }
+
+    def _count(self, key: str, outcome: str) -> None:
+        self.stats[outcome] += 1
+        counts = self._kinds.setdefault(_kind(key), [0, 0])
+        counts[0 if outcome != 'misses' else 1] += 1
+
+    def _remember(self, key: str, value: Any, expires_at: float, generation: int) -> None:
+        self._memory[key] = (value, expires_at, generation)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+
+def _kind(key: str) -> str:
+    return key.split(':', 1)[0]
+
+
+# Process-wide cache instance (the shared tier is disk-only so generations are never stale)
+article_cache = ArticleCache(
+    memory_items=ARTICLE_CACHE_MEMORY_ITEMS,
+    shared=ResponseCache(path=ARTICLE_CACHE_PATH, memory_items=0) if ARTICLE_CACHE_SHARED else None
+)
+
+
+def read_through(key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+    """
+    Cached payload for key, calling loader() and caching its result on a miss
+
+    Args:
+        key: '<kind>:<details>' - kind picks the TTL from ARTICLE_CACHE_TTLS
+        loader: Builds the JSON-serializable payload; None results aren't cached
+        ttl: Override the kind's TTL
+
+    The generation is read before loading, so a payload built while an
+    invalidation happens is filed under the old generation and never served.
+    """
+    if not ARTICLE_CACHE_ENABLED:
+        return loader()
+
+    found, value = article_cache.get(key)
+    if found:
+        return value
+
+    generation = article_cache.generation()
+    value = loader()
+    if value is not None:
+        article_cache.set(key, value, ttl if ttl is not None else ARTICLE_CACHE_TTLS.get(_kind(key), DEFAULT_TTL), generation)
+    return value
+
+
+def invalidate_articles(reason: str) -> None:
+    """Drop every cached public article payload (call after a successful write)"""
+    try:
+        generation = article_cache.invalidate()
+        print(f"[ARTICLE CACHE] Invalidated ({reason}), generation {generation}")
+    except Exception as e:
+        print(f"[ARTICLE CACHE] Invalidation failed ({reason}): {e}")
+
+
+def warm_article_cache(app) -> None:
+    """Request the WARM_PATHS once in a background thread so their payloads are cached"""
+    if not ARTICLE_CACHE_ENABLED:
+        return
+
+    def warm():
+        started = time.time()
+        client = app.test_client()
+        warmed = 0
+        for path in WARM_PATHS:
+            try:
+                if client.get(path).status_code == 200:
+                    warmed += 1
+            except Exception as e:
+                print(f"[ARTICLE CACHE] Warm-up of {path} failed: {e}")
+        with article_cache._lock:
+            article_cache.stats['warmed'] += warmed
+        print(f"[ARTICLE CACHE] Warmed {warmed}/{len(WARM_PATHS)} endpoint(s) in {time.time() - started:.1f}s")
+
+    threading.Thread(target=warm, name='article-cache-warmup', daemon=True).start()
+
+
+def get_article_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters for the public article cache"""
+    return {'enabled': ARTICLE_CACHE_ENABLED, **article_cache.get_stats()}
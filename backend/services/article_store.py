@@ -0,0 +1,215 @@
+"""
+Article Store
+Reads articles together with their selected image in one query
+
+List endpoints select a named projection (ARTICLE_VIEWS) instead of '*';
+only single-article pages and editors need the body and sources.
+
+Articles reference their image through articles.image_id, so PostgREST can
+embed the image row in the article select. Which optional images columns
+exist (caption, mirrored variants) and whether embedding works are detected
+once at startup; databases that can't embed fall back to one batched
+images query per request.
+"""
+import threading
+from typing import Dict, Any, List, Optional
+
+from services.media_store import CARD_VARIANT, public_url, variant_url, variant_srcset
+from services.single_flight import CoalescedQuery, coalesced_select
+
+# Article projections: lists render cards, so they don't need body/sources
+ARTICLE_VIEWS = {
+    'card': 'id, title, excerpt, slug, section, author, read_time, created_at, image_id',
+    'summary': 'id, title, excerpt, slug, section, author, read_time, created_at, updated_at, '
+               'image_id, status, quality_score, research_id',
+    'full': '*',
+}
+DEFAULT_LIST_VIEW = 'card'
+
+# Optional images columns, probed in this order
+_OPTIONAL_IMAGE_COLUMNS = {
+    'caption': 'caption',
+    'variants': 'variants, width, height',
+}
+
+# Optional articles columns added by later migrations
+OPTIONAL_ARTICLE_COLUMNS = ('quality_review', 'research_id', 'image_candidates')
+
+_capabilities: Optional[Dict[str, Any]] = None
+_capabilities_lock = threading.Lock()
+
+
+def detect_capabilities() -> Dict[str, Any]:
+    """
+    Probe the schema once: optional images/articles columns and embedded selects
+
+    Safe to call repeatedly; only the first call queries the database.
+    """
+    global _capabilities
+    if _capabilities is not None:
+        return _capabilities
+
+    with _capabilities_lock:
+        if _capabilities is not None:
+            return _capabilities
+
+        from database.supabase_client import supabase
+
+        capabilities: Dict[str, Any] = {'embed': False, 'caption': False, 'variants': False, 'article_columns': []}
+        try:
+            supabase.table('images').select('url').limit(1).execute()
+        except Exception as e:
+            # Database unreachable (or no images table): use the base shape and probe again next time
+            print(f"[ARTICLES] Could not probe images schema: {e}")
+            return capabilities
+
+        for name, columns in _OPTIONAL_IMAGE_COLUMNS.items():
+            try:
+                supabase.table('images').select(columns).limit(1).execute()
+                capabilities[name] = True
+            except Exception:
+                capabilities[name] = False
+
+        for column in OPTIONAL_ARTICLE_COLUMNS:
+            try:
+                supabase.table('articles').select(column).limit(1).execute()
+                capabilities['article_columns'].append(column)
+            except Exception:
+                pass
+
+        try:
+            supabase.table('articles').select(f"id, {_embed_clause(capabilities)}").limit(1).execute()
+            capabilities['embed'] = True
+        except Exception as e:
+            print(f"[ARTICLES] Embedded image selects unavailable, using batched lookups: {e}")
+
+        print(f"[ARTICLES] Schema capabilities: {capabilities}")
+        _capabilities = capabilities
+        return _capabilities
+
+
+def _image_columns(capabilities: Dict[str, Any]) -> str:
+    columns = ['url']
+    for name, names in _OPTIONAL_IMAGE_COLUMNS.items():
+        if capabilities.get(name):
+            columns.append(names)
+    return ', '.join(columns)
+
+
+def _embed_clause(capabilities: Dict[str, Any]) -> str:
+    # image_id disambiguates from images.article_id, which points the other way
+    return f"image:images!image_id({_image_columns(capabilities)})"
+
+
+def optional_article_columns(data: Dict[str, Any]) -> Dict[str, Any]:
+    """The entries of data for optional articles columns that exist in this database"""
+    available = detect_capabilities()['article_columns']
+    return {column: value for column, value in data.items() if column in available}
+
+
+def article_select(columns: str = '*') -> str:
+    """Select clause for articles with the image embedded when supported"""
+    capabilities = detect_capabilities()
+    if columns != '*':
+        # Drop optional columns this database doesn't have (e.g. research_id in the summary view)
+        columns = ', '.join(
+            column for column in (c.strip() for c in columns.split(','))
+            if column not in OPTIONAL_ARTICLE_COLUMNS or column in capabilities['article_columns']
+        )
+    if not capabilities['embed']:
+        return columns
+    return f"{columns}, {_embed_clause(capabilities)}"
+
+
+def parse_view(args, default: str = DEFAULT_LIST_VIEW) -> Optional[str]:
+    """Projection named by ?view= (or ?fields=) in request args, or None if it isn't one of ARTICLE_VIEWS"""
+    view = args.get('view') or args.get('fields') or default
+    return view if view in ARTICLE_VIEWS else None
+
+
+def query_articles(columns: str = '*') -> CoalescedQuery:
+    """
+    An articles select query (image embedded when supported); add filters and
+    call attach_images on the rows
+
+    Identical queries running concurrently share one upstream call.
+    """
+    return coalesced_select('articles', article_select(columns))
+
+
+def _apply_image(article: Dict[str, Any], image: Optional[Dict[str, Any]], full: bool) -> None:
+    if not image:
+        article['image_url'] = None
+        article['image_thumb_url'] = None
+        article['image_srcset'] = None
+        article['image_width'] = None
+        article['image_height'] = None
+        article['image_caption'] = None
+        return
+
+    variants = image.get('variants')
+    if full:
+        article['image_url'] = public_url(image['url'])
+        article['image_srcset'] = variant_srcset(variants)
+    else:
+        article['image_url'] = variant_url(variants, CARD_VARIANT) or public_url(image['url'])
+        article['image_srcset'] = None
+    article['image_thumb_url'] = variant_url(variants, 'thumb') or article['image_url']
+    article['image_width'] = image.get('width')
+    article['image_height'] = image.get('height')
+    article['image_caption'] = image.get('caption')
+
+
+def attach_images(articles: List[Dict[str, Any]], full: bool = False) -> List[Dict[str, Any]]:
+    """
+    Flatten each article's image into image_url, image_thumb_url, image_srcset,
+    image_width, image_height and image_caption
+
+    Lists (full=False) reference the card-sized variant of mirrored images;
+    single-article pages (full=True) get the largest variant and a srcset.
+    Rows selected without an embedded image are filled with one batched
+    images query (see load_images).
+    """
+    if not articles:
+        return articles
+
+    load_images(articles)
+    for article in articles:
+        _apply_image(article, article.pop('image', None), full)
+    return articles
+
+
+def load_images(articles: List[Dict[str, Any]]) -> None:
+    """
+    Make sure every row carries its raw embedded image under 'image'
+
+    Rows already selected with the embed are left alone; the rest share one
+    batched images query. Call this on the union of rows before
+    attach_images/attach_image when several lists are built together.
+    """
+    missing = [a for a in articles if 'image' not in a]
+    if not missing:
+        return
+    images = _fetch_images(list({a['image_id'] for a in missing if a.get('image_id')}))
+    for article in missing:
+        article['image'] = images.get(article.get('image_id'))
+
+
+def attach_image(article: Dict[str, Any]) -> Dict[str, Any]:
+    """attach_images for a single article page"""
+    return attach_images([article], full=True)[0]
+
+
+def _fetch_images(image_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Batched images lookup for databases without embedded selects"""
+    if not image_ids:
+        return {}
+
+    try:
+        response = coalesced_select('images', f"id, {_image_columns(detect_capabilities())}")\
+            .in_('id', sorted(image_ids))\
+            .execute()
+    except Exception as e:
+        print(f"[ARTICLES] Error fetching images: {e}")
+        return {}
+    return {image['id']: image for image in (response.data or [])}
@@ -0,0 +1,65 @@
+"""
+Image Hashing
+Perceptual (difference) hashes for spotting the same photo under different URLs
+
+Wire photos are syndicated across outlets and CDN sizes, so exact URL
+matching misses them. A dHash is computed from a tiny grayscale decode
+(9x8), and two images whose hashes differ in only a few bits are treated
+as the same photo. Needs Pillow; without it no hashes are produced.
+"""
+import os
+import io
+from typing import Iterable, Optional
+
+# Max differing bits (of 64) for two images to count as the same photo
+DHASH_THRESHOLD = int(os.getenv('IMAGE_DHASH_THRESHOLD', '10'))
+HASH_SIZE = 8
+
+
+def _pillow():
+    """PIL.Image, or None when Pillow is not installed"""
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+
+def hashing_available() -> bool:
+    return _pillow() is not None
+
+
+def dhash(data: bytes) -> Optional[int]:
+    """64-bit difference hash of an encoded image, or None if it can't be decoded"""
+    Image = _pillow()
+    if Image is None:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Lets JPEG decode at a fraction of full size
+            image.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+            small = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+            pixels = list(small.getdata())
+    except Exception as e:
+        print(f"[IMAGES] Could not decode image for hashing: {e}")
+        return None
+
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def find_near_duplicate(image_hash: int, hashes: Iterable[int], threshold: int = DHASH_THRESHOLD) -> Optional[int]:
+    """The first hash within threshold bits of image_hash, if any"""
+    for other in hashes:
+        if hamming_distance(image_hash, other) <= threshold:
+            return other
+    return None
@@ -0,0 +1,223 @@
+"""
+Image Probe
+Reads an image's format and dimensions from its first bytes
+
+Candidate images are checked with a ranged GET of the first bytes instead
+of HEAD: the PNG/JPEG/WebP/GIF header gives width and height after a few
+KB, so 1x1 trackers, icons and odd-shaped banners are rejected before the
+body is downloaded. Only images that pass are perceptually hashed.
+"""
+import os
+import struct
+import asyncio
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+
+from services import image_hash
+
+# Candidate size rules (overridable via environment)
+MIN_IMAGE_WIDTH = int(os.getenv('IMAGE_MIN_WIDTH', '400'))
+MIN_IMAGE_HEIGHT = int(os.getenv('IMAGE_MIN_HEIGHT', '200'))
+MIN_ASPECT_RATIO = float(os.getenv('IMAGE_MIN_ASPECT', '0.5'))
+MAX_ASPECT_RATIO = float(os.getenv('IMAGE_MAX_ASPECT', '3.0'))
+
+# Bytes requested when only the header is needed (JPEG EXIF blocks can push SOF past 16 KB)
+PROBE_BYTES = 64 * 1024
+# Largest image downloaded for perceptual hashing (bigger ones are probed only)
+HASH_MAX_BYTES = int(os.getenv('IMAGE_HASH_MAX_BYTES', str(4 * 1024 * 1024)))
+
+# JPEG start-of-frame markers (all except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class ImageInfo:
+    """Format, dimensions and (optionally) perceptual hash of an image"""
+
+    def __init__(self, format: str, width: int, height: int, image_hash: Optional[int] = None):
+        self.format = format
+        self.width = width
+        self.height = height
+        self.image_hash = image_hash
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'format': self.format,
+            'width': self.width,
+            'height': self.height,
+            'hash': format(self.image_hash, '016x') if self.image_hash is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ImageInfo':
+        return cls(
+            format=data['format'],
+            width=data['width'],
+            height=data['height'],
+            image_hash=int(data['hash'], 16) if data.get('hash') else None
+        )
+
+
+def parse_image_header(data: bytes) -> Optional[Tuple[str, int, int]]:
+    """
+    (format, width, height) from the start of a PNG, JPEG, WebP or GIF file
+
+    Returns None if the format is unknown or more bytes are needed.
+    """
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        if len(data) >= 24 and data[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', data[16:24])
+            return 'png', width, height
+        return None
+
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        if len(data) >= 10:
+            width, height = struct.unpack('<HH', data[6:10])
+            return 'gif', width, height
+        return None
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        chunk = data[12:16]
+        if chunk == b'VP8 ' and len(data) >= 30:
+            width, height = struct.unpack('<HH', data[26:30])
+            return 'webp', width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L' and len(data) >= 25:
+            b0, b1, b2, b3 = data[21:25]
+            width = 1 + (((b1 & 0x3F) << 8) | b0)
+            height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+            return 'webp', width, height
+        if chunk == b'VP8X' and len(data) >= 30:
+            width = 1 + int.from_bytes(data[24:27], 'little')
+            height = 1 + int.from_bytes(data[27:30], 'little')
+            return 'webp', width, height
+        return None
+
+    if data[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 4 <= len(data):
+            if data[offset] != 0xFF:
+                return None
+            marker = data[offset + 1]
+            if marker == 0xFF:  # Fill byte
+                offset += 1
+                continue
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # Markers without a length
+                offset += 2
+                continue
+            if marker in _JPEG_SOF_MARKERS:
+                if offset + 9 > len(data):
+                    return None
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return 'jpeg', width, height
+            offset += 2 + struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        return None
+
+    return None
+
+
+def rejection_reason(width: int, height: int) -> Optional[str]:
+    """Why an image is unsuitable as an article image, or None if it's fine"""
+    if width < MIN_IMAGE_WIDTH or height < MIN_IMAGE_HEIGHT:
+        return f"too small ({width}x{height})"
+    aspect = width / height
+    if aspect < MIN_ASPECT_RATIO or aspect > MAX_ASPECT_RATIO:
+        return f"bad aspect ratio ({width}x{height})"
+    return None
+
+
+def _complete(response: httpx.Response, received: int) -> bool:
+    """Whether the bytes read so far are the whole image"""
+    if response.status_code == 206:
+        # Content-Range: bytes 0-65535/123456
+        total = response.headers.get('content-range', '').rpartition('/')[2]
+        return total.isdigit() and int(total) <= received
+    return True  # 200: the server sent the whole body and we read it to the end
+
+
+async def _fetch_for_hash(url: str, client: httpx.AsyncClient) -> Optional[bytes]:
+    """Full image bytes for hashing, or None if it's larger than HASH_MAX_BYTES or unreachable"""
+    buffer = bytearray()
+    try:
+        async with client.stream('GET', url, headers={'Accept': 'image/*'}, timeout=5.0) as response:
+            if response.status_code != 200:
+                return None
+            if int(response.headers.get('content-length') or 0) > HASH_MAX_BYTES:
+                return None
+            async for chunk in response.aiter_bytes():
+                buffer += chunk
+                if len(buffer) > HASH_MAX_BYTES:
+                    return None
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        return None
+    return bytes(buffer)
+
+
+async def probe_image(url: str, client: httpx.AsyncClient, want_hash: Optional[bool] = None) -> Optional[ImageInfo]:
+    """
+    Check a candidate image from its first bytes
+
+    Always starts with a ranged GET of the first PROBE_BYTES. Only images
+    that pass the size/aspect rules are hashed: from the ranged bytes when
+    they already hold the whole image, otherwise with a second bounded
+    fetch (skipped for images over HASH_MAX_BYTES).
+
+    Args:
+        url: Image URL
+        client: HTTP client
+        want_hash: Also perceptually hash the image
+            (defaults to whether hashing is available)
+
+    Returns:
+        ImageInfo, or None if the image is unreachable, unreadable, too small
+        or badly proportioned
+    """
+    if want_hash is None:
+        want_hash = image_hash.hashing_available()
+
+    # Servers that ignore Range send the whole image; we stop reading after the header
+    headers = {'Accept': 'image/*', 'Range': f'bytes=0-{PROBE_BYTES - 1}'}
+
+    buffer = bytearray()
+    header = None
+    complete = False
+    try:
+        async with client.stream('GET', url, headers=headers, timeout=5.0) as response:
+            if response.status_code not in (200, 206):
+                return None
+            if not response.headers.get('content-type', '').startswith('image/'):
+                return None
+
+            finished = True
+            async for chunk in response.aiter_bytes():
+                buffer += chunk
+                if header is None:
+                    header = parse_image_header(bytes(buffer))
+                    if header is None and len(buffer) >= PROBE_BYTES:
+                        return None
+                    if header is not None:
+                        reason = rejection_reason(header[1], header[2])
+                        if reason:
+                            print(f"[IMAGES] Rejected {url[:80]}: {reason}")
+                            return None
+                if len(buffer) >= PROBE_BYTES and header is not None:
+                    finished = False
+                    break
+            complete = finished and _complete(response, len(buffer))
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        return None
+
+    if header is None:
+        return None
+
+    hashed = None
+    if want_hash:
+        data = bytes(buffer) if complete else await _fetch_for_hash(url, client)
+        if data is not None:
+            hashed = await asyncio.to_thread(image_hash.dhash, data)
+            if hashed is None:
+                return None  # Claims to be an image but doesn't decode
+    return ImageInfo(header[0], header[1], header[2], hashed)
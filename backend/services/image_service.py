@@ -1,16 +1,39 @@
 """
 Image Generation Service
-3-Tier Pipeline:
+Pipeline:
 1. Extract OG images from news sources (free, fast, authentic)
-2. DALL-E generation (fallback since we have OpenAI key)
+2. AI generation (DALL-E and/or Gemini Imagen) for whatever is still missing
 """
 import os
 import httpx
-import re
 import uuid
+import time
+import base64
+import asyncio
 from typing import List, Dict, Optional, Any
 from urllib.parse import urlparse
 
+from services import source_cache, image_hash
+from services.image_probe import ImageInfo, probe_image, parse_image_header
+from services.media_store import store_image
+from services.page_metadata import get_page_metadata, get_scrape_client, apply_metadata, HostLimiter
+
+# Source extraction limits (overridable via environment)
+EXTRACT_CONCURRENCY = int(os.getenv('IMAGE_EXTRACT_CONCURRENCY', '8'))
+EXTRACT_PER_HOST = int(os.getenv('IMAGE_EXTRACT_PER_HOST', '2'))
+EXTRACT_DEADLINE = float(os.getenv('IMAGE_EXTRACT_DEADLINE', '8'))
+MAX_EXTRACT_SOURCES = 10
+
+# AI image providers, in order of preference. With racing on, every configured
+# provider gets each variation and the first successes win.
+IMAGE_PROVIDERS = [p.strip() for p in os.getenv('IMAGE_PROVIDERS', 'dalle,gemini').split(',') if p.strip()]
+IMAGE_PROVIDER_RACE = os.getenv('IMAGE_PROVIDER_RACE', 'false').lower() == 'true'
+AI_IMAGE_TIMEOUT = float(os.getenv('AI_IMAGE_TIMEOUT', '60'))
+GEMINI_IMAGE_MODEL = os.getenv('GEMINI_IMAGE_MODEL', 'imagen-3.0-generate-002')
+
+# Also generate AI images when prefetching candidates for agent drafts (costs an image call per draft)
+PREFETCH_AI_IMAGES = os.getenv('AGENT_PREFETCH_AI_IMAGES', 'false').lower() == 'true'
+
 
 class GeneratedImage:
     """Generated image data class"""
@@ -18,13 +41,30 @@ class GeneratedImage:
     def __init__(self, id: str, url: str, source: str, 
                  prompt: Optional[str] = None, 
                  source_domain: Optional[str] = None,
-                 source_url: Optional[str] = None):
+                 source_url: Optional[str] = None,
+                 width: Optional[int] = None,
+                 height: Optional[int] = None):
         self.id = id
         self.url = url
         self.source = source  # 'extracted', 'gemini', or 'dalle'
         self.prompt = prompt
         self.source_domain = source_domain
         self.source_url = source_url
+        self.width = width
+        self.height = height
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GeneratedImage':
+        return cls(
+            id=data['id'],
+            url=data['url'],
+            source=data['source'],
+            prompt=data.get('prompt'),
+            source_domain=data.get('sourceDomain'),
+            source_url=data.get('sourceUrl'),
+            width=data.get('width'),
+            height=data.get('height')
+        )
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -34,6 +74,8 @@ class GeneratedImage:
             'prompt': self.prompt,
             'sourceDomain': self.source_domain,
             'sourceUrl': self.source_url,
+            'width': self.width,
+            'height': self.height,
         }
 
 
@@ -46,99 +88,153 @@ def get_domain(url: str) -> str:
         return 'unknown'
 
 
-async def extract_og_image(url: str) -> Optional[str]:
-    """Extract OG image from a single URL"""
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                url,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (compatible; NewsBot/1.0)',
-                    'Accept': 'text/html',
-                },
-                follow_redirects=True
-            )
-            
-            if response.status_code != 200:
-                return None
-            
-            html = response.text
-            
-            # Try og:image first (most common)
-            match = re.search(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']', html, re.IGNORECASE)
-            if match:
-                return match.group(1)
-            
-            # Try content before property
-            match = re.search(r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:image["\']', html, re.IGNORECASE)
-            if match:
-                return match.group(1)
-            
-            # Try twitter:image
-            match = re.search(r'<meta[^>]+name=["\']twitter:image["\'][^>]+content=["\']([^"\']+)["\']', html, re.IGNORECASE)
-            if match:
-                return match.group(1)
-            
-            # Try twitter:image:src
-            match = re.search(r'<meta[^>]+name=["\']twitter:image:src["\'][^>]+content=["\']([^"\']+)["\']', html, re.IGNORECASE)
-            if match:
-                return match.group(1)
-            
-            return None
-    except Exception as e:
-        print(f"Failed to extract image from {url}: {e}")
-        return None
+async def extract_og_image(url: str, client: Optional[httpx.AsyncClient] = None) -> Optional[str]:
+    """Extract OG image from a single URL (reads only the page head)"""
+    metadata = await get_page_metadata(url, client)
+    return metadata.image if metadata else None
 
 
-async def validate_image_url(url: str) -> bool:
-    """Validate that an image URL is accessible"""
-    try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            response = await client.head(url, follow_redirects=True)
-            
-            if response.status_code != 200:
-                return False
-            
-            content_type = response.headers.get('content-type', '')
-            return content_type.startswith('image/')
-    except:
-        return False
+async def inspect_image(url: str, client: Optional[httpx.AsyncClient] = None) -> Optional[ImageInfo]:
+    """
+    Probe a candidate image (format, size, perceptual hash), cached per image URL
+    
+    Returns None for images that are unreachable, unreadable, too small or
+    badly proportioned (see image_probe).
+    """
+    cached = await asyncio.to_thread(source_cache.get_image_info, url)
+    if cached:
+        return ImageInfo.from_dict(cached)
+    
+    info = await probe_image(url, client or get_scrape_client())
+    if info is not None:
+        await asyncio.to_thread(source_cache.set_image_info, url, info.to_dict())
+    return info
+
+
+async def validate_image_url(url: str, client: Optional[httpx.AsyncClient] = None) -> bool:
+    """Validate that an image URL is accessible and usable as an article image"""
+    return await inspect_image(url, client) is not None
 
 
-async def extract_images_from_sources(sources: List[Dict], max_images: int = 3) -> List[GeneratedImage]:
+async def extract_images_from_sources(
+    sources: List[Dict],
+    max_images: int = 3,
+    deadline: float = EXTRACT_DEADLINE
+) -> List[GeneratedImage]:
     """
     Tier 1: Extract OG images from source URLs
     Returns up to max_images unique, validated images
+    
+    Results are cached per source URL, and domains in failure backoff are
+    skipped without a request (see source_cache). Sources enriched after
+    research already carry their og:image and only need the image checked;
+    other sources are fetched once (the metadata is kept on the source dict).
+    
+    Candidates are probed from their first bytes (too small or badly
+    proportioned images are rejected) and perceptually hashed, and
+    near-duplicates of an image already picked (the same wire photo under
+    another URL) don't count toward max_images.
+    
+    Work runs concurrently over the pooled client, at most EXTRACT_PER_HOST
+    at a time per host. Returns as soon as max_images valid images are
+    found or the deadline passes; outstanding fetches are cancelled.
     """
+    by_url: Dict[str, Dict] = {}
+    for source in sources:
+        url = source.get('url')
+        if url and url not in by_url:
+            by_url[url] = source
+    urls = list(by_url)[:MAX_EXTRACT_SOURCES]
+    
     images = []
     seen_urls = set()
+    if not urls or max_images <= 0:
+        return images
     
-    print(f"[IMAGES] Tier 1: Extracting from {len(sources)} sources...")
+    prefetched = sum(1 for url in urls if by_url[url].get('enriched'))
+    print(f"[IMAGES] Tier 1: Extracting from {len(urls)} sources ({prefetched} with stored metadata)...")
     
-    for source in sources[:10]:  # Limit to first 10 sources
-        if len(images) >= max_images:
-            break
-            
-        url = source.get('url')
-        if not url:
-            continue
+    client = get_scrape_client()
+    limiter = HostLimiter(EXTRACT_CONCURRENCY, EXTRACT_PER_HOST)
+    
+    skipped = {'cached': 0, 'backoff': 0}
+    
+    async def extract(url: str):
+        # SQLite lookups run off the event loop
+        found, image_url, cached_info, blocked = await asyncio.to_thread(source_cache.lookup_source_image, url)
+        if found:
+            skipped['cached'] += 1
+            return url, image_url, ImageInfo.from_dict(cached_info) if cached_info else None
+        if blocked:
+            skipped['backoff'] += 1
+            return url, None, None
         
-        image_url = await extract_og_image(url)
+        source = by_url[url]
+        # Only a page fetched (successfully) here can count a failure; get_page_metadata
+        # already counted failed fetches, including the one made when the source was enriched
+        count_failure = not source.get('enriched')
+        info = None
+        async with limiter.slot(url):
+            if not source.get('enriched'):
+                metadata = await get_page_metadata(url, client)
+                count_failure = metadata is not None
+                apply_metadata(source, metadata)
+            image_url = source.get('image')
+            if image_url:
+                info = await inspect_image(image_url, client)
         
-        if image_url and image_url not in seen_urls:
-            is_valid = await validate_image_url(image_url)
-            if is_valid:
-                seen_urls.add(image_url)
-                images.append(GeneratedImage(
-                    id=f"extracted-{uuid.uuid4().hex[:8]}",
-                    url=image_url,
-                    source='extracted',
-                    source_domain=get_domain(url),
-                    source_url=url
-                ))
-                print(f"[IMAGES] Extracted image from {get_domain(url)}")
-    
-    print(f"[IMAGES] Extracted {len(images)} valid images from sources")
+        await asyncio.to_thread(
+            source_cache.record_source_image, url, image_url if info else None, count_failure
+        )
+        if info:
+            return url, image_url, info
+        return url, None, None
+    
+    hashes: List[int] = []
+    duplicates = 0
+    tasks = [asyncio.create_task(extract(url)) for url in urls]
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            try:
+                url, image_url, info = await next_done
+            except asyncio.TimeoutError:
+                print(f"[IMAGES] Extraction deadline ({deadline}s) reached")
+                break
+            
+            if not image_url or image_url in seen_urls:
+                continue
+            seen_urls.add(image_url)
+            
+            # The same wire photo often appears under different URLs and sizes
+            if info and info.image_hash is not None:
+                if image_hash.find_near_duplicate(info.image_hash, hashes) is not None:
+                    duplicates += 1
+                    print(f"[IMAGES] Skipping near-duplicate image from {get_domain(url)}")
+                    continue
+                hashes.append(info.image_hash)
+            
+            images.append(GeneratedImage(
+                id=f"extracted-{uuid.uuid4().hex[:8]}",
+                url=image_url,
+                source='extracted',
+                source_domain=get_domain(url),
+                source_url=url,
+                width=info.width if info else None,
+                height=info.height if info else None
+            ))
+            print(f"[IMAGES] Extracted image from {get_domain(url)}")
+            if len(images) >= max_images:
+                break
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            print(f"[IMAGES] Cancelled {len(pending)} outstanding source fetch(es)")
+    
+    print(f"[IMAGES] Extracted {len(images)} valid images from sources "
+          f"({skipped['cached']} cached, {skipped['backoff']} skipped in backoff, {duplicates} near-duplicates)")
     return images
 
 
@@ -158,81 +254,232 @@ def generate_image_prompt(title: str, section: str) -> str:
     return f'Professional photojournalistic image for a major newspaper. Topic: "{title}". Visual style: {style}. Requirements: Realistic editorial photo, landscape orientation, no text or logos, neutral professional lighting.'
 
 
-async def generate_with_dalle(prompt: str, count: int) -> List[GeneratedImage]:
+class ImageProvider:
+    """An AI image provider; generate() returns one image per call"""
+    
+    name = ''
+    
+    def is_configured(self) -> bool:
+        raise NotImplementedError
+    
+    async def generate(self, prompt: str, client: httpx.AsyncClient) -> Optional[GeneratedImage]:
+        raise NotImplementedError
+
+
+class DalleProvider(ImageProvider):
+    """OpenAI DALL-E 3"""
+    
+    name = 'dalle'
+    
+    def is_configured(self) -> bool:
+        return bool(os.getenv('OPENAI_API_KEY'))
+    
+    async def generate(self, prompt: str, client: httpx.AsyncClient) -> Optional[GeneratedImage]:
+        response = await client.post(
+            'https://api.openai.com/v1/images/generations',
+            headers={
+                'Authorization': f"Bearer {os.getenv('OPENAI_API_KEY')}",
+                'Content-Type': 'application/json'
+            },
+            json={
+                'model': 'dall-e-3',
+                'prompt': prompt,
+                'n': 1,
+                'size': '1792x1024',
+                'quality': 'standard',
+            }
+        )
+        
+        if response.status_code != 200:
+            print(f"[IMAGES] DALL-E error: {response.status_code} - {response.text[:200]}")
+            return None
+        
+        data = response.json()
+        if not (data.get('data') and data['data'][0].get('url')):
+            return None
+        
+        return GeneratedImage(
+            id=f"dalle-{uuid.uuid4().hex[:8]}",
+            url=data['data'][0]['url'],
+            source='dalle',
+            prompt=prompt,
+            width=1792,
+            height=1024
+        )
+
+
+class GeminiProvider(ImageProvider):
     """
-    Tier 3: Generate images with DALL-E 3
+    Google Imagen through the Gemini API
+
+    Images come back inline as base64; they're written to the media store
+    so candidates carry a hosted URL instead of a data: URL.
     """
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("[IMAGES] OpenAI API key not configured, skipping DALL-E...")
-        return []
     
-    print(f"[IMAGES] Tier 3: Generating {count} images with DALL-E...")
-    images = []
+    name = 'gemini'
+    
+    def is_configured(self) -> bool:
+        return bool(os.getenv('GEMINI_API_KEY'))
     
-    variations = [
+    async def generate(self, prompt: str, client: httpx.AsyncClient) -> Optional[GeneratedImage]:
+        response = await client.post(
+            f'https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_IMAGE_MODEL}:predict',
+            headers={
+                'x-goog-api-key': os.getenv('GEMINI_API_KEY'),
+                'Content-Type': 'application/json'
+            },
+            json={
+                'instances': [{'prompt': prompt}],
+                'parameters': {'sampleCount': 1, 'aspectRatio': '16:9'},
+            }
+        )
+        
+        if response.status_code != 200:
+            print(f"[IMAGES] Gemini error: {response.status_code} - {response.text[:200]}")
+            return None
+        
+        predictions = response.json().get('predictions') or []
+        if not predictions or not predictions[0].get('bytesBase64Encoded'):
+            return None
+        
+        mime_type = predictions[0].get('mimeType', 'image/png')
+        data = base64.b64decode(predictions[0]['bytesBase64Encoded'])
+        stored = await store_image(data, mime_type, 'Gemini image')
+        if stored is None:
+            return None
+        
+        header = parse_image_header(data)
+        return GeneratedImage(
+            id=f"gemini-{uuid.uuid4().hex[:8]}",
+            url=stored.url,
+            source='gemini',
+            prompt=prompt,
+            width=stored.width or (header[1] if header else None),
+            height=stored.height or (header[2] if header else None)
+        )
+
+
+PROVIDERS: Dict[str, ImageProvider] = {
+    'dalle': DalleProvider(),
+    'gemini': GeminiProvider(),
+}
+
+
+def prompt_variations(prompt: str) -> List[str]:
+    return [
         prompt,
         prompt + ' Wide establishing shot.',
         prompt + ' Detailed close-up perspective.',
     ]
+
+
+async def generate_ai_images(
+    prompt: str,
+    count: int,
+    race: bool = IMAGE_PROVIDER_RACE
+) -> Dict[str, Any]:
+    """
+    Tier 2: Generate images with the configured AI providers
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for i in range(min(count, 3)):
-            try:
-                variation = variations[i] if i < len(variations) else prompt
-                
-                response = await client.post(
-                    'https://api.openai.com/v1/images/generations',
-                    headers={
-                        'Authorization': f'Bearer {api_key}',
-                        'Content-Type': 'application/json'
-                    },
-                    json={
-                        'model': 'dall-e-3',
-                        'prompt': variation,
-                        'n': 1,
-                        'size': '1792x1024',
-                        'quality': 'standard',
-                    }
-                )
-                
-                if response.status_code != 200:
-                    print(f"[IMAGES] DALL-E error: {response.status_code} - {response.text[:200]}")
-                    continue
-                
-                data = response.json()
-                
-                if data.get('data') and data['data'][0].get('url'):
-                    images.append(GeneratedImage(
-                        id=f"dalle-{uuid.uuid4().hex[:8]}",
-                        url=data['data'][0]['url'],
-                        source='dalle',
-                        prompt=variation
-                    ))
-                    print(f"[IMAGES] Generated DALL-E image {i + 1}")
-                    
-            except Exception as e:
-                print(f"[IMAGES] DALL-E image {i + 1} failed: {e}")
+    Variations are requested concurrently. With race on, every configured
+    provider gets every variation and the first `count` successes are kept;
+    otherwise providers are tried in IMAGE_PROVIDERS order, each asked only
+    for the images still missing. Requests still running once `count`
+    images are in hand are cancelled.
     
-    return images
+    Returns:
+        { "images": [...], "latency": { provider: {...} } }
+    """
+    providers = [PROVIDERS[name] for name in IMAGE_PROVIDERS if name in PROVIDERS and PROVIDERS[name].is_configured()]
+    if not providers:
+        print("[IMAGES] No AI image provider configured, skipping generation...")
+        return {'images': [], 'latency': {}}
+    
+    variations = prompt_variations(prompt)
+    count = min(count, len(variations))
+    images: List[GeneratedImage] = []
+    latency: Dict[str, Dict[str, Any]] = {}
+    
+    async def timed(provider: ImageProvider, variation: str, client: httpx.AsyncClient) -> Optional[GeneratedImage]:
+        stats = latency.setdefault(provider.name, {'requests': 0, 'succeeded': 0, 'cancelled': 0, 'seconds': []})
+        stats['requests'] += 1
+        started = time.monotonic()
+        try:
+            image = await provider.generate(variation, client)
+        except asyncio.CancelledError:
+            stats['cancelled'] += 1
+            raise
+        except Exception as e:
+            print(f"[IMAGES] {provider.name} image failed: {e}")
+            image = None
+        stats['seconds'].append(time.monotonic() - started)
+        if image:
+            stats['succeeded'] += 1
+        return image
+    
+    async def collect(tasks: List[asyncio.Task]) -> None:
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                image = await next_done
+                if image:
+                    images.append(image)
+                    print(f"[IMAGES] Generated {image.source} image {len(images)}")
+                    if len(images) >= count:
+                        break
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async with httpx.AsyncClient(timeout=AI_IMAGE_TIMEOUT) as client:
+        if race:
+            names = ', '.join(p.name for p in providers)
+            print(f"[IMAGES] Tier 2: Racing {names} for {count} image(s)...")
+            await collect([
+                asyncio.create_task(timed(provider, variation, client))
+                for variation in variations[:count]
+                for provider in providers
+            ])
+        else:
+            for provider in providers:
+                needed = count - len(images)
+                if needed <= 0:
+                    break
+                print(f"[IMAGES] Tier 2: Generating {needed} image(s) with {provider.name}...")
+                await collect([
+                    asyncio.create_task(timed(provider, variation, client))
+                    for variation in variations[len(images):count]
+                ])
+    
+    for stats in latency.values():
+        seconds = stats.pop('seconds')
+        stats['avg_seconds'] = round(sum(seconds) / len(seconds), 2) if seconds else None
+        stats['max_seconds'] = round(max(seconds), 2) if seconds else None
+    
+    return {'images': images[:count], 'latency': latency}
 
 
 async def generate_images_for_article(
     title: str,
     excerpt: str,
     section: str,
-    sources: Optional[List[Dict]] = None
+    sources: Optional[List[Dict]] = None,
+    allow_ai: bool = True
 ) -> Dict[str, Any]:
     """
     Main image generation pipeline
     
-    3-Tier approach:
     1. Extract from news sources (free, authentic)
-    2. Skip Gemini (requires separate API key)
-    3. DALL-E fallback (uses OpenAI key we have)
+    2. AI generation for the rest (DALL-E and/or Gemini, see generate_ai_images),
+       skipped when allow_ai is False
+    
+    The breakdown reports how many images came from each source plus the
+    latency of each tier/provider.
     """
     all_images = []
     target_count = 3
+    latency: Dict[str, Any] = {}
     
     print(f"\n{'='*50}")
     print(f"[IMAGES] Pipeline for: {title[:50]}...")
@@ -241,32 +488,58 @@ async def generate_images_for_article(
     
     # Tier 1: Extract from sources
     if sources and len(sources) > 0:
+        started = time.monotonic()
         extracted = await extract_images_from_sources(sources, target_count)
+        latency['extracted'] = {'seconds': round(time.monotonic() - started, 2)}
         all_images.extend(extracted)
         print(f"[IMAGES] After extraction: {len(all_images)} images")
     
-    # Tier 2: Skip Gemini (would need GEMINI_API_KEY)
-    
-    # Tier 3: DALL-E fallback
-    if len(all_images) < target_count:
+    # Tier 2: AI generation
+    if allow_ai and len(all_images) < target_count:
         needed = target_count - len(all_images)
         prompt = generate_image_prompt(title, section)
-        dalle_images = await generate_with_dalle(prompt, needed)
-        all_images.extend(dalle_images)
-        print(f"[IMAGES] After DALL-E: {len(all_images)} images")
+        generated = await generate_ai_images(prompt, needed)
+        all_images.extend(generated['images'])
+        latency.update(generated['latency'])
+        print(f"[IMAGES] After AI generation: {len(all_images)} images")
     
     # Determine breakdown
     breakdown = {
         'extracted': len([i for i in all_images if i.source == 'extracted']),
         'gemini': len([i for i in all_images if i.source == 'gemini']),
         'dalle': len([i for i in all_images if i.source == 'dalle']),
+        'latency': latency,
     }
     
     print(f"\n[IMAGES] Final result: {len(all_images)} images")
-    print(f"[IMAGES] Sources: {[i.source for i in all_images]}\n")
+    print(f"[IMAGES] Sources: {[i.source for i in all_images]}")
+    print(f"[IMAGES] Latency: {latency}\n")
     
     return {
         'success': len(all_images) > 0,
         'images': [img.to_dict() for img in all_images],
         'breakdown': breakdown,
     }
+
+
+async def prefetch_image_candidates(topic: str, section: str, sources: List[Dict]) -> Dict[str, Any]:
+    """
+    Image candidates for a draft, generated while the article is being written
+    
+    The title isn't known yet, so the topic stands in for it in AI prompts.
+    
+    Returns:
+        generate_images_for_article's result plus generatedAt, stored on the
+        article as image_candidates
+    """
+    from datetime import datetime, timezone
+    
+    result = await generate_images_for_article(
+        title=topic,
+        excerpt='',
+        section=section,
+        sources=sources,
+        allow_ai=PREFETCH_AI_IMAGES
+    )
+    result['generatedAt'] = datetime.now(timezone.utc).isoformat()
+    return result
@@ -0,0 +1,408 @@
+"""
+Agent Job Queue
+Runs agent pipelines in background worker threads so API requests return immediately
+
+Jobs are recorded in the agent_runs table (status, timing, article counts)
+so they survive restarts. Each process stamps its active jobs with its
+worker id and a heartbeat; on startup, only jobs whose heartbeat is stale
+(their process is gone) are recovered: queued ones are claimed and
+resumed, and ones that were mid-run are marked as interrupted. Jobs that
+other live workers are running are left alone.
+"""
+import os
+import time
+import uuid
+import queue
+import socket
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List
+
+# Worker pool configuration (overridable via environment)
+AGENT_WORKERS = int(os.getenv('AGENT_WORKERS', '2'))
+AGENT_QUEUE_LIMIT = int(os.getenv('AGENT_QUEUE_LIMIT', '10'))
+
+# Finished jobs kept in memory for fast status lookups (older ones are read from agent_runs)
+FINISHED_JOBS_KEPT = 100
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Heartbeats for this process's active jobs; jobs not heard from for JOB_STALE_AFTER are recoverable
+JOB_HEARTBEAT_INTERVAL = int(os.getenv('AGENT_JOB_HEARTBEAT_INTERVAL', '30'))
+JOB_STALE_AFTER = int(os.getenv('AGENT_JOB_STALE_AFTER', '180'))
+
+# Identifies this process in agent_runs.metadata
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at capacity and a new job is refused"""
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _is_stale(row: Dict[str, Any]) -> bool:
+    """Whether an active agent_runs row's worker has stopped heartbeating"""
+    metadata = row.get('metadata') or {}
+    last_seen = _parse_time(metadata.get('heartbeat_at')) \
+        or _parse_time(row.get('started_at')) \
+        or _parse_time(row.get('created_at'))
+    if last_seen is None:
+        return True
+    return (_now() - last_seen).total_seconds() > JOB_STALE_AFTER
+
+
+class AgentJob:
+    """Agent job data class"""
+
+    def __init__(self, id: str, kind: str, params: Dict[str, Any], status: str = 'queued'):
+        self.id = id
+        self.kind = kind  # 'single', 'all' or 'regenerate'
+        self.params = params
+        self.status = status  # 'queued', 'running', 'success' or 'error'
+        self.created_at = _now()
+        self.started_at: Optional[datetime] = None
+        self.completed_at: Optional[datetime] = None
+        self.articles_created = 0
+        self.errors: List[str] = []
+        self.usage: Dict[str, Any] = {}
+        self.dedup: Dict[str, Any] = {}
+        self.persisted = False
+
+    @property
+    def agent_name(self) -> str:
+        if self.kind == 'regenerate':
+            return 'regenerate'
+        return self.params.get('agent_name') or 'all'
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        if not self.started_at:
+            return None
+        end = self.completed_at or _now()
+        return round((end - self.started_at).total_seconds(), 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'agent_name': self.agent_name,
+            'status': self.status,
+            'params': self.params,
+            'articles_created': self.articles_created,
+            'errors': self.errors,
+            'usage': self.usage,
+            'dedup': self.dedup,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'duration_seconds': self.duration_seconds,
+        }
+
+
+async def run_pooled(coro):
+    """Await an agent coroutine, then release the loop's pooled HTTP connections"""
+    from services.openai_service import close_async_client
+    from services.page_metadata import close_scrape_client
+    try:
+        return await coro
+    finally:
+        await close_async_client()
+        await close_scrape_client()
+
+
+class AgentJobQueue:
+    """Bounded queue of agent jobs executed by a fixed pool of worker threads"""
+
+    def __init__(self, workers: int = 2, limit: int = 10):
+        self.workers = max(1, workers)
+        self.limit = max(1, limit)
+        self._queue: "queue.Queue[AgentJob]" = queue.Queue()
+        self._jobs: Dict[str, AgentJob] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start worker threads and resume jobs left over from a previous process"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'agent-worker-{i + 1}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat, name='agent-heartbeat', daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+        print(f"[JOBS] Started {self.workers} agent worker(s), queue limit {self.limit}")
+        self._recover()
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> AgentJob:
+        """
+        Enqueue a job, applying admission control
+
+        An identical job that is already queued or running is returned instead
+        of being enqueued twice.
+
+        Raises:
+            QueueFullError: if the number of active jobs is at the limit
+        """
+        self.start()
+
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status in ACTIVE_STATUSES and job.kind == kind and job.params == params:
+                    return job
+
+            active = sum(1 for job in self._jobs.values() if job.status in ACTIVE_STATUSES)
+            if active >= self.limit:
+                raise QueueFullError(f'Agent queue is full ({active} active jobs)')
+
+            job = AgentJob(id=str(uuid.uuid4()), kind=kind, params=params)
+            self._jobs[job.id] = job
+            self._prune_finished()
+
+        self._insert_run(job)
+        self._queue.put(job)
+        print(f"[JOBS] Queued {job.agent_name} job {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get job status from memory, falling back to the agent_runs table"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return job.to_dict()
+
+        try:
+            from database.supabase_client import supabase
+            response = supabase.table('agent_runs').select('*').eq('id', job_id).execute()
+            if response.data:
+                return _run_row_to_dict(response.data[0])
+        except Exception as e:
+            print(f"[JOBS] Failed to load job {job_id}: {e}")
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {'workers': self.workers, 'limit': self.limit, **counts}
+
+    def _prune_finished(self) -> None:
+        finished = [job for job in self._jobs.values() if job.status not in ACTIVE_STATUSES]
+        for job in finished[:-FINISHED_JOBS_KEPT]:
+            del self._jobs[job.id]
+
+    def _heartbeat(self) -> None:
+        """Periodically re-stamp this process's active jobs so other workers don't recover them"""
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            with self._lock:
+                active = [job for job in self._jobs.values() if job.status in ACTIVE_STATUSES]
+            for job in active:
+                self._update_run(job)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._execute(job)
+            except Exception as e:
+                print(f"[JOBS] Worker error on job {job.id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job: AgentJob) -> None:
+        from agents.orchestrator import run_single_agent, run_all_agents, regenerate_article
+
+        job.status = 'running'
+        job.started_at = _now()
+        self._update_run(job)
+        print(f"[JOBS] Running {job.agent_name} job {job.id}")
+
+        try:
+            if job.kind == 'all':
+                coro = run_all_agents(
+                    word_count=job.params.get('word_count', 800),
+                    writing_style=job.params.get('writing_style', 'standard')
+                )
+            elif job.kind == 'regenerate':
+                coro = regenerate_article(
+                    article_id=job.params['article_id'],
+                    word_count=job.params.get('word_count', 800),
+                    writing_style=job.params.get('writing_style', 'standard')
+                )
+            else:
+                coro = run_single_agent(
+                    agent_name=job.params['agent_name'],
+                    word_count=job.params.get('word_count', 800),
+                    writing_style=job.params.get('writing_style', 'standard'),
+                    custom_topic=job.params.get('topic')
+                )
+
+            result = asyncio.run(run_pooled(coro))
+            job.articles_created = result.get('articles_created', 0)
+            job.errors = result.get('errors', [])
+            job.usage = result.get('usage', {})
+            job.dedup = result.get('dedup') or {}
+            job.status = 'success' if result.get('success') else 'error'
+        except Exception as e:
+            job.errors.append(str(e))
+            job.status = 'error'
+
+        job.completed_at = _now()
+        self._update_run(job)
+        print(f"[JOBS] Job {job.id} finished: {job.status}, {job.articles_created} article(s) in {job.duration_seconds}s")
+
+    def _insert_run(self, job: AgentJob) -> None:
+        """Record the job in agent_runs; the job still runs if this fails"""
+        try:
+            from database.supabase_client import supabase
+            supabase.table('agent_runs').insert({
+                'id': job.id,
+                'agent_name': job.agent_name,
+                'status': 'queued',
+                'metadata': {
+                    'kind': job.kind,
+                    'params': job.params,
+                    'worker': WORKER_ID,
+                    'heartbeat_at': _now().isoformat(),
+                }
+            }).execute()
+            job.persisted = True
+        except Exception as e:
+            print(f"[JOBS] Failed to record job {job.id} in agent_runs: {e}")
+
+    def _update_run(self, job: AgentJob) -> None:
+        if not job.persisted:
+            return
+
+        updates: Dict[str, Any] = {
+            'status': job.status,
+            'articles_created': job.articles_created,
+            'error_message': '; '.join(job.errors) or None,
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+            'metadata': {
+                'kind': job.kind,
+                'params': job.params,
+                'duration_seconds': job.duration_seconds,
+                'usage': job.usage,
+                'dedup': job.dedup,
+                'worker': WORKER_ID,
+                'heartbeat_at': _now().isoformat(),
+            }
+        }
+
+        try:
+            from database.supabase_client import supabase
+            supabase.table('agent_runs').update(updates).eq('id', job.id).execute()
+        except Exception as e:
+            print(f"[JOBS] Failed to update job {job.id} in agent_runs: {e}")
+
+    def _recover(self) -> None:
+        """
+        Recover unfinished jobs whose worker has stopped heartbeating
+
+        Stale queued jobs are claimed (a conditional update, so only one
+        starting process resumes each) and re-enqueued; stale running jobs
+        are marked as interrupted. Rows with a fresh heartbeat belong to a
+        live worker and are skipped.
+        """
+        try:
+            from database.supabase_client import supabase
+            response = supabase.table('agent_runs')\
+                .select('*')\
+                .in_('status', list(ACTIVE_STATUSES))\
+                .order('created_at')\
+                .execute()
+        except Exception as e:
+            print(f"[JOBS] Could not check agent_runs for unfinished jobs: {e}")
+            return
+
+        skipped = 0
+        for row in response.data or []:
+            with self._lock:
+                if row['id'] in self._jobs:
+                    continue
+
+            if not _is_stale(row):
+                skipped += 1
+                continue
+
+            metadata = row.get('metadata') or {}
+            if row['status'] == 'running' or 'params' not in metadata:
+                try:
+                    supabase.table('agent_runs').update({
+                        'status': 'error',
+                        'error_message': 'Interrupted by server restart',
+                        'completed_at': _now().isoformat()
+                    }).eq('id', row['id']).eq('status', row['status']).execute()
+                except Exception as e:
+                    print(f"[JOBS] Failed to mark job {row['id']} as interrupted: {e}")
+                continue
+
+            # Claim the job: only succeeds if no other process re-stamped it since we read it
+            try:
+                claim = supabase.table('agent_runs')\
+                    .update({'metadata': {**metadata, 'worker': WORKER_ID, 'heartbeat_at': _now().isoformat()}})\
+                    .eq('id', row['id'])\
+                    .eq('status', 'queued')
+                if metadata.get('heartbeat_at'):
+                    claim = claim.eq('metadata->>heartbeat_at', metadata['heartbeat_at'])
+                else:
+                    claim = claim.is_('metadata->>heartbeat_at', 'null')
+                if not claim.execute().data:
+                    continue
+            except Exception as e:
+                print(f"[JOBS] Failed to claim job {row['id']}: {e}")
+                continue
+
+            job = AgentJob(id=row['id'], kind=metadata.get('kind', 'single'), params=metadata['params'])
+            job.persisted = True
+            with self._lock:
+                self._jobs[job.id] = job
+            self._queue.put(job)
+            print(f"[JOBS] Resumed queued job {job.id}")
+
+        if skipped:
+            print(f"[JOBS] Left {skipped} active job(s) owned by other live workers")
+
+
+def _run_row_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape an agent_runs row like AgentJob.to_dict()"""
+    metadata = row.get('metadata') or {}
+    return {
+        'id': row['id'],
+        'agent_name': row.get('agent_name'),
+        'status': row.get('status'),
+        'params': metadata.get('params', {}),
+        'articles_created': row.get('articles_created', 0),
+        'errors': [row['error_message']] if row.get('error_message') else [],
+        'usage': metadata.get('usage', {}),
+        'dedup': metadata.get('dedup', {}),
+        'created_at': row.get('created_at'),
+        'started_at': row.get('started_at'),
+        'completed_at': row.get('completed_at'),
+        'duration_seconds': metadata.get('duration_seconds'),
+    }
+
+
+# Process-wide job queue
+job_queue = AgentJobQueue(workers=AGENT_WORKERS, limit=AGENT_QUEUE_LIMIT)
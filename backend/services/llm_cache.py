@@ -0,0 +1,270 @@
+"""
+LLM Response Cache
+Content-addressed cache for chat completion responses
+
+Two tiers:
+1. In-memory LRU (fast, per process)
+2. SQLite on disk (survives restarts, shared by workers on the same host)
+
+Entries are keyed by a hash of (model, system prompt, user prompt,
+temperature, max_tokens, json mode) and carry a per-entry TTL chosen
+by the call site. Both tiers are size-capped with LRU eviction.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Cache configuration (overridable via environment)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_PATH = os.getenv(
+    'LLM_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'llm_cache.sqlite3')
+)
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv('LLM_CACHE_MEMORY_ITEMS', '256'))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Disk hits record last_access in memory and write it in batches (on the next write, or every N hits)
+TOUCH_BATCH = 64
+
+
+def make_cache_key(payload: Dict[str, Any]) -> str:
+    """Hash the parts of a chat completion request that determine its output"""
+    messages = payload.get('messages', [])
+    key_material = {
+        'model': payload.get('model'),
+        'messages': [(m.get('role'), m.get('content')) for m in messages],
+        'temperature': payload.get('temperature'),
+        'max_tokens': payload.get('max_tokens'),
+        'response_format': payload.get('response_format'),
+    }
+    encoded = json.dumps(key_material, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory + SQLite) LRU cache with per-entry TTLs"""
+
+    def __init__(self, path: str, memory_items: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self._touched: Dict[str, float] = {}
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+        }
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the on-disk tier lazily; the cache degrades to memory-only on failure"""
+        if self._db is not None:
+            return self._db
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            db.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)')
+            db.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+            db.commit()
+            self._disk_bytes = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            self._db = db
+        except sqlite3.Error as e:
+            print(f"[LLM CACHE] Disk tier unavailable, using memory only: {e}")
+            self._db = None
+
+        return self._db
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached value, or None on miss/expiry"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+            db = self._connect()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        'SELECT value, expires_at FROM responses WHERE key = ?', (key,)
+                    ).fetchone()
+                    if row and row[1] > now:
+                        self._touched[key] = now
+                        if len(self._touched) >= TOUCH_BATCH:
+                            self._flush_touches(db)
+                            db.commit()
+                        self._remember(key, row[0], row[1])
+                        self.stats['disk_hits'] += 1
+                        return row[0]
+                    if row:
+                        self._delete_disk(db, key)
+                except sqlite3.Error as e:
+                    print(f"[LLM CACHE] Disk read failed: {e}")
+
+            self.stats['misses'] += 1
+            return None
+
+    def peek(self, key: str) -> Optional[str]:
+        """
+        Read a value straight from disk without touching LRU state or stats
+
+        For small coordination values (e.g. a generation counter) that other
+        processes update; skips the memory tier, which could be stale.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                entry = self._memory.get(key)
+                return entry[0] if entry and entry[1] > time.time() else None
+            try:
+                row = db.execute(
+                    'SELECT value FROM responses WHERE key = ? AND expires_at > ?', (key, time.time())
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"[LLM CACHE] Disk read failed: {e}")
+                return None
+            return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """Store a value in both tiers for ttl seconds"""
+        now = time.time()
+        expires_at = now + ttl
+        size = len(value.encode('utf-8'))
+
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self.stats['writes'] += 1
+
+            db = self._connect()
+            if db is None or size > self.max_bytes:
+                return
+
+            try:
+                self._flush_touches(db)
+                self._delete_disk(db, key)
+                db.execute(
+                    'INSERT INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                    (key, value, size, expires_at, now)
+                )
+                self._disk_bytes += size
+                self._evict_disk(db)
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"[LLM CACHE] Disk write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        """Drop one entry from both tiers"""
+        with self._lock:
+            self._memory.pop(key, None)
+            db = self._connect()
+            if db is not None:
+                try:
+                    self._delete_disk(db, key)
+                    db.commit()
+                except sqlite3.Error as e:
+                    print(f"[LLM CACHE] Disk delete failed: {e}")
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute('DELETE FROM responses')
+                db.commit()
+                self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus current tier sizes"""
+        with self._lock:
+            lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            return {
+                **self.stats,
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+                'memory_items': len(self._memory),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        if self.memory_items <= 0:
+            return  # Disk-only cache
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _flush_touches(self, db: sqlite3.Connection) -> None:
+        """Write batched last_access times (caller commits)"""
+        if self._touched:
+            db.executemany(
+                'UPDATE responses SET last_access = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _delete_disk(self, db: sqlite3.Connection, key: str) -> None:
+        row = db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+        if row:
+            db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._disk_bytes -= row[0]
+
+    def _evict_disk(self, db: sqlite3.Connection) -> None:
+        """Drop expired rows, then least recently used rows until under the size cap"""
+        if self._disk_bytes <= self.max_bytes:
+            return
+
+        db.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+        self._disk_bytes = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+        while self._disk_bytes > self.max_bytes:
+            row = db.execute(
+                'SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 1'
+            ).fetchone()
+            if not row:
+                break
+            db.execute('DELETE FROM responses WHERE key = ?', (row[0],))
+            self._disk_bytes -= row[1]
+            self.stats['evictions'] += 1
+
+
+# Process-wide cache instance
+response_cache = ResponseCache(
+    path=LLM_CACHE_PATH,
+    memory_items=LLM_CACHE_MEMORY_ITEMS,
+    max_bytes=LLM_CACHE_MAX_BYTES
+)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters for the shared LLM response cache"""
+    return {'enabled': LLM_CACHE_ENABLED, **response_cache.get_stats()}
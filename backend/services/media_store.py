@@ -0,0 +1,298 @@
+"""
+Media Store
+Mirrors chosen article images into a local content-addressed store
+
+Hotlinked source/DALL-E URLs expire and inline base64 images bloat every
+query that touches the images table. An image is downloaded once, keyed
+by the SHA-256 of its bytes, and rendered to resized WebP variants:
+
+    <MEDIA_ROOT>/<hash[:2]>/<hash>/w1600.webp, w800.webp, w400.webp, thumb.webp
+
+Only the variant URLs and dimensions are stored in the database, as
+paths relative to the media route (/api/media/...), so stored rows don't
+depend on where the API is deployed. public_url() turns them into
+MEDIA_BASE_URL URLs when responses need an absolute origin. Without
+Pillow the original bytes are stored as the single variant.
+"""
+import os
+import io
+import json
+import base64
+import hashlib
+import asyncio
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+# Storage configuration (overridable via environment)
+MEDIA_ROOT = os.getenv(
+    'MEDIA_ROOT',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'media')
+)
+# Path the media blueprint is mounted at; stored URLs are relative to it
+MEDIA_PATH = '/api/media'
+# Public URL of MEDIA_PATH (e.g. https://api.example.com/api/media or a CDN) used in
+# responses; unset, responses keep relative paths for a same-origin frontend
+MEDIA_BASE_URL = os.getenv('MEDIA_BASE_URL', '').rstrip('/')
+MEDIA_MAX_BYTES = int(os.getenv('MEDIA_MAX_BYTES', str(15 * 1024 * 1024)))
+WEBP_QUALITY = int(os.getenv('MEDIA_WEBP_QUALITY', '80'))
+
+# Responsive widths, largest first; the thumbnail is a center crop
+VARIANT_WIDTHS = (1600, 800, 400)
+THUMB_SIZE = (320, 180)
+
+# Variant used for article lists/cards
+CARD_VARIANT = 'w800'
+
+_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+
+
+class MirroredImage:
+    """A mirrored image and its stored variants"""
+
+    def __init__(self, content_hash: str, width: Optional[int], height: Optional[int],
+                 variants: Dict[str, Dict[str, Any]]):
+        self.content_hash = content_hash
+        self.width = width
+        self.height = height
+        self.variants = variants  # name -> { url, width, height }
+
+    @property
+    def url(self) -> str:
+        """URL of the largest variant"""
+        return next(iter(self.variants.values()))['url']
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'contentHash': self.content_hash,
+            'width': self.width,
+            'height': self.height,
+            'variants': self.variants,
+        }
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Columns for the images table"""
+        return {
+            'url': self.url,
+            'content_hash': self.content_hash,
+            'width': self.width,
+            'height': self.height,
+            'variants': self.variants,
+        }
+
+
+def _pillow():
+    """PIL.Image, or None when Pillow is not installed"""
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+
+def _media_dir(content_hash: str) -> str:
+    return os.path.join(MEDIA_ROOT, content_hash[:2], content_hash)
+
+
+def _media_url(content_hash: str, filename: str) -> str:
+    return f"{MEDIA_PATH}/{content_hash[:2]}/{content_hash}/{filename}"
+
+
+def public_url(url: Optional[str]) -> Optional[str]:
+    """A stored media path as clients should request it (other URLs unchanged)"""
+    if url and MEDIA_BASE_URL and url.startswith(MEDIA_PATH + '/'):
+        return MEDIA_BASE_URL + url[len(MEDIA_PATH):]
+    return url
+
+
+def public_variants(variants: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Variants with public_url() applied to each URL"""
+    if not variants:
+        return variants
+    return {name: {**variant, 'url': public_url(variant.get('url'))} for name, variant in variants.items()}
+
+
+def _hash_from_url(url: str) -> Optional[str]:
+    """Content hash of a (relative, public or absolute) URL pointing into this store"""
+    if MEDIA_BASE_URL and url.startswith(MEDIA_BASE_URL + '/'):
+        path = url[len(MEDIA_BASE_URL):]
+    else:
+        path = urlparse(url).path
+        if not path.startswith(MEDIA_PATH + '/'):
+            return None
+        path = path[len(MEDIA_PATH):]
+    parts = path.strip('/').split('/')
+    return parts[1] if len(parts) == 3 and parts[0] == parts[1][:2] else None
+
+
+def _load_manifest(content_hash: str) -> Optional[MirroredImage]:
+    try:
+        with open(os.path.join(_media_dir(content_hash), 'manifest.json')) as f:
+            data = json.load(f)
+        return MirroredImage(content_hash, data.get('width'), data.get('height'), data['variants'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _render_variants(data: bytes, content_type: str, content_hash: str) -> MirroredImage:
+    """Write variants for an image to disk (runs in a worker thread)"""
+    directory = _media_dir(content_hash)
+    os.makedirs(directory, exist_ok=True)
+    variants: Dict[str, Dict[str, Any]] = {}
+
+    Image = _pillow()
+    width = height = None
+    if Image is None:
+        filename = f"original.{_EXTENSIONS.get(content_type, 'img')}"
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(data)
+        variants['original'] = {'url': _media_url(content_hash, filename), 'width': None, 'height': None}
+    else:
+        with Image.open(io.BytesIO(data)) as source:
+            source = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            width, height = source.size
+
+            widths = [w for w in VARIANT_WIDTHS if w < width] or [width]
+            if width <= VARIANT_WIDTHS[0] and width not in widths:
+                widths.insert(0, width)
+            for target in widths:
+                resized = source if target == width else source.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS
+                )
+                name = f"w{target}"
+                resized.save(os.path.join(directory, f"{name}.webp"), 'WEBP', quality=WEBP_QUALITY, method=4)
+                variants[name] = {'url': _media_url(content_hash, f"{name}.webp"), 'width': resized.width, 'height': resized.height}
+
+            thumb = _center_crop(source, THUMB_SIZE[0] / THUMB_SIZE[1]).resize(THUMB_SIZE, Image.LANCZOS)
+            thumb.save(os.path.join(directory, 'thumb.webp'), 'WEBP', quality=WEBP_QUALITY, method=4)
+            variants['thumb'] = {'url': _media_url(content_hash, 'thumb.webp'), 'width': THUMB_SIZE[0], 'height': THUMB_SIZE[1]}
+
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump({'width': width, 'height': height, 'variants': variants}, f)
+    return MirroredImage(content_hash, width, height, variants)
+
+
+def _center_crop(image, aspect: float):
+    width, height = image.size
+    if width / height > aspect:
+        new_width = round(height * aspect)
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+    new_height = round(width / aspect)
+    top = (height - new_height) // 2
+    return image.crop((0, top, width, top + new_height))
+
+
+async def _download(url: str) -> Tuple[bytes, str]:
+    """Image bytes and content type from an http(s) or data: URL"""
+    if url.startswith('data:'):
+        header, _, payload = url.partition(',')
+        content_type = header[5:].split(';')[0] or 'image/png'
+        return base64.b64decode(payload), content_type
+
+    from services.page_metadata import get_scrape_client
+    client = get_scrape_client()
+    async with client.stream('GET', url, headers={'Accept': 'image/*'}, timeout=20.0) as response:
+        response.raise_for_status()
+        content_type = response.headers.get('content-type', '').split(';')[0]
+        if not content_type.startswith('image/'):
+            raise ValueError(f"not an image ({content_type or 'no content type'})")
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > MEDIA_MAX_BYTES:
+                raise ValueError(f"image larger than {MEDIA_MAX_BYTES} bytes")
+            chunks.append(chunk)
+    return b''.join(chunks), content_type
+
+
+async def mirror_image(url: str) -> Optional[MirroredImage]:
+    """
+    Download an image once and store its variants
+
+    Args:
+        url: Source image URL (http(s) or data: URL)
+
+    Returns:
+        MirroredImage, or None if the image couldn't be downloaded or decoded
+    """
+    content_hash = _hash_from_url(url)
+    if content_hash:
+        # Already mirrored (e.g. a generated image stored at creation)
+        return _load_manifest(content_hash)
+
+    try:
+        data, content_type = await _download(url)
+    except Exception as e:
+        print(f"[MEDIA] Failed to download {url[:100]}: {e}")
+        return None
+
+    return await store_image(data, content_type, url)
+
+
+async def store_image(data: bytes, content_type: str, label: str = 'image') -> Optional[MirroredImage]:
+    """
+    Store image bytes and their variants (for images that arrive inline)
+
+    Args:
+        data: Encoded image bytes
+        content_type: MIME type of data
+        label: What to call the image in logs
+
+    Returns:
+        MirroredImage, or None if the image is too large or couldn't be decoded
+    """
+    if len(data) > MEDIA_MAX_BYTES:
+        print(f"[MEDIA] {label[:100]} is larger than {MEDIA_MAX_BYTES} bytes")
+        return None
+
+    content_hash = hashlib.sha256(data).hexdigest()
+    existing = _load_manifest(content_hash)
+    if existing:
+        print(f"[MEDIA] Already stored {content_hash[:12]}")
+        return existing
+
+    try:
+        mirrored = await asyncio.to_thread(_render_variants, data, content_type, content_hash)
+    except Exception as e:
+        print(f"[MEDIA] Failed to render variants for {label[:100]}: {e}")
+        return None
+
+    print(f"[MEDIA] Stored {content_hash[:12]} ({len(data)} bytes) as {', '.join(mirrored.variants)}")
+    return mirrored
+
+
+def variant_url(variants: Optional[Dict[str, Any]], name: str = CARD_VARIANT) -> Optional[str]:
+    """URL of a named variant, falling back to the nearest smaller, then any variant"""
+    if not variants:
+        return None
+    if name in variants:
+        return public_url(variants[name]['url'])
+
+    sized = sorted(
+        (v for key, v in variants.items() if key.startswith('w') and v.get('width')),
+        key=lambda v: v['width'], reverse=True
+    )
+    if name.startswith('w') and name[1:].isdigit():
+        for variant in sized:
+            if variant['width'] <= int(name[1:]):
+                return public_url(variant['url'])
+    return public_url((sized[-1] if sized else next(iter(variants.values())))['url'])
+
+
+def variant_srcset(variants: Optional[Dict[str, Any]]) -> Optional[str]:
+    """srcset attribute value for the width variants"""
+    if not variants:
+        return None
+    entries = [
+        f"{public_url(v['url'])} {v['width']}w"
+        for key, v in variants.items()
+        if key.startswith('w') and v.get('width')
+    ]
+    return ', '.join(entries) or None
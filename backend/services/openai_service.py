@@ -1,15 +1,102 @@
 """
 OpenAI Service for AI Generation
 Uses direct HTTP calls for Python 3.14 compatibility
+
+Connections are pooled process-wide: one shared sync client for the
+blocking helpers and one async client per event loop for the awaitable
+helpers used by the agent pipeline.
 """
 import os
+import asyncio
+import threading
+import weakref
+import contextvars
 import httpx
 import json
-from typing import Dict, Any
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple, Iterator
+
+from services.llm_cache import LLM_CACHE_ENABLED, make_cache_key, response_cache
 
 # API configuration
 OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 
+# Connection pool configuration (overridable via environment)
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '120'))
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
+OPENAI_MAX_KEEPALIVE = int(os.getenv('OPENAI_MAX_KEEPALIVE', '10'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30'))
+OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'true').lower() == 'true'
+
+# Response cache TTLs (seconds) for call sites that are cacheable by default
+CAPTION_CACHE_TTL = 7 * 24 * 3600
+
+_sync_client: Optional[httpx.Client] = None
+_sync_client_lock = threading.Lock()
+
+# httpx.AsyncClient connections are bound to the loop that opened them, and
+# routes start a fresh loop per request with asyncio.run(), so keep one
+# pooled client per running loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+class UsageTracker:
+    """Accumulates LLM calls and token usage for a unit of work (e.g. one article)"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0  # Prompt tokens served from the provider's prefix cache
+        self.completion_tokens = 0
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+    
+    def record(self, usage: Dict[str, Any]) -> None:
+        self.calls += 1
+        self.prompt_tokens += usage.get('prompt_tokens', 0) or 0
+        self.cached_tokens += (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0) or 0
+        self.completion_tokens += usage.get('completion_tokens', 0) or 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'llm_calls': self.calls,
+            'cache_hits': self.cache_hits,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'completion_tokens': self.completion_tokens,
+            'total_tokens': self.total_tokens
+        }
+
+
+_usage_tracker: contextvars.ContextVar[Optional[UsageTracker]] = contextvars.ContextVar('openai_usage_tracker', default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageTracker]:
+    """
+    Count every completion made inside the block (including awaited ones)
+    
+    Usage:
+        with track_usage() as usage:
+            await generate_json_async(...)
+        print(usage.to_dict())
+    """
+    tracker = UsageTracker()
+    token = _usage_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _usage_tracker.reset(token)
+
+
+def _record_usage(data: Dict[str, Any]) -> None:
+    tracker = _usage_tracker.get()
+    if tracker is not None:
+        tracker.record(data.get('usage') or {})
+
 
 def _get_api_key() -> str:
     """Get OpenAI API key from environment"""
@@ -19,12 +106,172 @@ def _get_api_key() -> str:
     return api_key
 
 
+def _http2_enabled() -> bool:
+    """HTTP/2 needs the optional 'h2' package; fall back to HTTP/1.1 without it"""
+    if not OPENAI_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+    )
+
+
+def get_sync_client() -> httpx.Client:
+    """Get the process-wide pooled sync client"""
+    global _sync_client
+    
+    if _sync_client is None:
+        with _sync_client_lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(
+                    timeout=OPENAI_TIMEOUT,
+                    limits=_pool_limits(),
+                    http2=_http2_enabled()
+                )
+    return _sync_client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Get the pooled async client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=OPENAI_TIMEOUT,
+            limits=_pool_limits(),
+            http2=_http2_enabled()
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the pooled async client for the running loop (call before the loop ends)"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def _headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {_get_api_key()}",
+        "Content-Type": "application/json"
+    }
+
+
+def _build_payload(
+    system_prompt: str,
+    user_prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    json_mode: bool = False
+) -> Dict[str, Any]:
+    """Build a chat completions request body"""
+    if json_mode:
+        # Add JSON instruction to system prompt
+        system_prompt = system_prompt + "\n\nRespond ONLY with valid JSON, no markdown or other text."
+    
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+    
+    return payload
+
+
+def _parse_completion(response: httpx.Response) -> Dict[str, Any]:
+    """Raise on API errors, otherwise return the decoded response body"""
+    if response.status_code != 200:
+        raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
+    data = response.json()
+    _record_usage(data)
+    return data
+
+
+def _message_content(data: Dict[str, Any]) -> str:
+    return data["choices"][0]["message"]["content"] or ""
+
+
+def _post_completion(payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """POST a chat completion through the shared sync client"""
+    response = get_sync_client().post(
+        OPENAI_API_URL,
+        headers=_headers(),
+        json=payload,
+        timeout=timeout or OPENAI_TIMEOUT
+    )
+    return _parse_completion(response)
+
+
+async def _post_completion_async(payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """POST a chat completion through the loop's pooled async client"""
+    response = await get_async_client().post(
+        OPENAI_API_URL,
+        headers=_headers(),
+        json=payload,
+        timeout=timeout or OPENAI_TIMEOUT
+    )
+    return _parse_completion(response)
+
+
+def _cache_lookup(payload: Dict[str, Any], cache_ttl: Optional[float]) -> Tuple[Optional[str], Optional[str]]:
+    """Return (cache_key, cached_content); key is None when caching is off for this call"""
+    if not cache_ttl or not LLM_CACHE_ENABLED:
+        return None, None
+    key = make_cache_key(payload)
+    cached = response_cache.get(key)
+    
+    tracker = _usage_tracker.get()
+    if cached is not None and tracker is not None:
+        tracker.cache_hits += 1
+    return key, cached
+
+
+def _cache_store(key: Optional[str], content: str, cache_ttl: Optional[float]) -> None:
+    if key and content:
+        response_cache.set(key, content, cache_ttl)
+
+
+async def _cache_lookup_async(payload: Dict[str, Any], cache_ttl: Optional[float]) -> Tuple[Optional[str], Optional[str]]:
+    """_cache_lookup with the SQLite work in a worker thread so the event loop isn't blocked"""
+    if not cache_ttl or not LLM_CACHE_ENABLED:
+        return None, None
+    # to_thread copies the context, so cache hits still reach the caller's usage tracker
+    return await asyncio.to_thread(_cache_lookup, payload, cache_ttl)
+
+
+async def _cache_store_async(key: Optional[str], content: str, cache_ttl: Optional[float]) -> None:
+    if key and content:
+        await asyncio.to_thread(_cache_store, key, content, cache_ttl)
+
+
 def generate_text(
     system_prompt: str,
     user_prompt: str,
     model: str = "gpt-4o",
     temperature: float = 0.7,
-    max_tokens: int = 4000
+    max_tokens: int = 4000,
+    cache_ttl: Optional[float] = None
 ) -> str:
     """
     Generate text using GPT-4
@@ -35,35 +282,19 @@ def generate_text(
         model: Model to use (default: gpt-4o)
         temperature: Randomness (0-2, default: 0.7)
         max_tokens: Max response length (default: 4000)
+        cache_ttl: Seconds to cache the response for (default: no caching)
     
     Returns:
         Generated text
     """
-    api_key = _get_api_key()
-    
-    with httpx.Client(timeout=120.0) as client:
-        response = client.post(
-            OPENAI_API_URL,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
-        
-        data = response.json()
-        return data["choices"][0]["message"]["content"] or ""
+    payload = _build_payload(system_prompt, user_prompt, model, temperature, max_tokens)
+    key, cached = _cache_lookup(payload, cache_ttl)
+    if cached is not None:
+        return cached
+    
+    content = _message_content(_post_completion(payload))
+    _cache_store(key, content, cache_ttl)
+    return content
 
 
 def generate_json(
@@ -71,7 +302,8 @@ def generate_json(
     user_prompt: str,
     model: str = "gpt-4o",
     temperature: float = 0.3,
-    max_tokens: int = 6000
+    max_tokens: int = 6000,
+    cache_ttl: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     Generate JSON response using GPT-4
@@ -82,40 +314,87 @@ def generate_json(
         model: Model to use (default: gpt-4o)
         temperature: Randomness (0-2, default: 0.3)
         max_tokens: Max response length (default: 6000)
+        cache_ttl: Seconds to cache the response for (default: no caching)
     
     Returns:
         Parsed JSON dictionary
     """
-    api_key = _get_api_key()
-    
-    # Add JSON instruction to system prompt
-    enhanced_system_prompt = system_prompt + "\n\nRespond ONLY with valid JSON, no markdown or other text."
-    
-    with httpx.Client(timeout=120.0) as client:
-        response = client.post(
-            OPENAI_API_URL,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": enhanced_system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "response_format": {"type": "json_object"}
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
-        
-        data = response.json()
-        content = data["choices"][0]["message"]["content"] or "{}"
-        return json.loads(content)
+    payload = _build_payload(system_prompt, user_prompt, model, temperature, max_tokens, json_mode=True)
+    key, cached = _cache_lookup(payload, cache_ttl)
+    if cached is not None:
+        return json.loads(cached)
+    
+    content = _message_content(_post_completion(payload)) or "{}"
+    result = json.loads(content)
+    # Only cache after a successful parse so malformed JSON is retried
+    _cache_store(key, content, cache_ttl)
+    return result
+
+
+async def generate_text_async(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = "gpt-4o",
+    temperature: float = 0.7,
+    max_tokens: int = 4000,
+    cache_ttl: Optional[float] = None
+) -> str:
+    """
+    Awaitable version of generate_text using the pooled async client
+    
+    Args:
+        system_prompt: System instructions
+        user_prompt: User query
+        model: Model to use (default: gpt-4o)
+        temperature: Randomness (0-2, default: 0.7)
+        max_tokens: Max response length (default: 4000)
+        cache_ttl: Seconds to cache the response for (default: no caching)
+    
+    Returns:
+        Generated text
+    """
+    payload = _build_payload(system_prompt, user_prompt, model, temperature, max_tokens)
+    key, cached = await _cache_lookup_async(payload, cache_ttl)
+    if cached is not None:
+        return cached
+    
+    content = _message_content(await _post_completion_async(payload))
+    await _cache_store_async(key, content, cache_ttl)
+    return content
+
+
+async def generate_json_async(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = "gpt-4o",
+    temperature: float = 0.3,
+    max_tokens: int = 6000,
+    cache_ttl: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Awaitable version of generate_json using the pooled async client
+    
+    Args:
+        system_prompt: System instructions
+        user_prompt: User query
+        model: Model to use (default: gpt-4o)
+        temperature: Randomness (0-2, default: 0.3)
+        max_tokens: Max response length (default: 6000)
+        cache_ttl: Seconds to cache the response for (default: no caching)
+    
+    Returns:
+        Parsed JSON dictionary
+    """
+    payload = _build_payload(system_prompt, user_prompt, model, temperature, max_tokens, json_mode=True)
+    key, cached = await _cache_lookup_async(payload, cache_ttl)
+    if cached is not None:
+        return json.loads(cached)
+    
+    content = _message_content(await _post_completion_async(payload)) or "{}"
+    result = json.loads(content)
+    # Only cache after a successful parse so malformed JSON is retried
+    await _cache_store_async(key, content, cache_ttl)
+    return result
 
 
 def generate_image_caption(
@@ -123,7 +402,8 @@ def generate_image_caption(
     article_excerpt: str,
     image_source: str = "ai_generated",
     image_prompt: str = None,
-    source_domain: str = None
+    source_domain: str = None,
+    cache_ttl: Optional[float] = CAPTION_CACHE_TTL
 ) -> str:
     """
     Generate a news-style image caption based on article context.
@@ -134,12 +414,11 @@ def generate_image_caption(
         image_source: Type of image ('extracted', 'ai_generated', 'dalle')
         image_prompt: The prompt used to generate AI images (if applicable)
         source_domain: Domain the image was extracted from (if applicable)
+        cache_ttl: Seconds to cache the caption for (default: 7 days, None disables)
     
     Returns:
         A professional news-style caption in italics format
     """
-    api_key = _get_api_key()
-    
     system_prompt = """You are a photo editor at a major newspaper like The Wall Street Journal or New York Times.
 Your job is to write concise, professional image captions that describe what the image depicts in context of the article.
 
@@ -174,31 +453,26 @@ Summary: {article_excerpt}
     
     user_prompt += "\n\nWrite a single caption (no quotes, no attribution, just the caption text):"
     
-    with httpx.Client(timeout=30.0) as client:
-        response = client.post(
-            OPENAI_API_URL,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-4o-mini",  # Use smaller model for speed/cost
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.5,
-                "max_tokens": 100
-            }
-        )
-        
-        if response.status_code != 200:
-            print(f"Caption generation failed: {response.status_code}")
-            return ""
-        
-        data = response.json()
-        caption = data["choices"][0]["message"]["content"] or ""
-        # Clean up the caption (remove quotes if present)
-        caption = caption.strip().strip('"').strip("'")
-        return caption
-
+    payload = _build_payload(
+        system_prompt,
+        user_prompt,
+        model="gpt-4o-mini",  # Use smaller model for speed/cost
+        temperature=0.5,
+        max_tokens=100
+    )
+    
+    key, cached = _cache_lookup(payload, cache_ttl)
+    if cached is not None:
+        return cached
+    
+    try:
+        data = _post_completion(payload, timeout=30.0)
+    except Exception as e:
+        print(f"Caption generation failed: {e}")
+        return ""
+    
+    caption = _message_content(data)
+    # Clean up the caption (remove quotes if present)
+    caption = caption.strip().strip('"').strip("'")
+    _cache_store(key, caption, cache_ttl)
+    return caption
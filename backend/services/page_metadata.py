@@ -0,0 +1,310 @@
+"""
+Page Metadata Service
+Streams just the <head> of a source page and reads its metadata in one pass
+
+Only the head carries og:/twitter: tags, the title and the canonical link,
+so the body is read incrementally and the connection is dropped at </head>
+(or <body>, or a byte cap) instead of downloading the whole page.
+"""
+import os
+import codecs
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Any
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+from services import source_cache
+
+# Stop reading a page after this many bytes even if </head> never shows up
+HEAD_BYTE_CAP = int(os.getenv('PAGE_HEAD_BYTE_CAP', str(256 * 1024)))
+SCRAPE_TIMEOUT = float(os.getenv('SCRAPE_TIMEOUT', '5'))
+SCRAPE_MAX_CONNECTIONS = int(os.getenv('SCRAPE_MAX_CONNECTIONS', '16'))
+
+# Source enrichment limits
+ENRICH_CONCURRENCY = int(os.getenv('SOURCE_ENRICH_CONCURRENCY', '8'))
+ENRICH_PER_HOST = int(os.getenv('SOURCE_ENRICH_PER_HOST', '2'))
+ENRICH_DEADLINE = float(os.getenv('SOURCE_ENRICH_DEADLINE', '10'))
+
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; NewsBot/1.0)',
+    'Accept': 'text/html,application/xhtml+xml',
+}
+
+# One pooled scraping client per event loop (routes and job workers each run their own loop)
+_scrape_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+# Meta keys for each field, in order of preference
+_IMAGE_KEYS = ('og:image', 'og:image:url', 'og:image:secure_url', 'twitter:image', 'twitter:image:src')
+_TITLE_KEYS = ('og:title', 'twitter:title')
+_DESCRIPTION_KEYS = ('og:description', 'description', 'twitter:description')
+_SITE_NAME_KEYS = ('og:site_name', 'application-name')
+_PUBLISHED_KEYS = ('article:published_time', 'og:published_time', 'datepublished', 'pubdate', 'parsely-pub-date', 'date')
+
+
+class PageMetadata:
+    """Metadata read from a page's <head>"""
+
+    def __init__(self, url: str, title: Optional[str] = None,
+                 description: Optional[str] = None,
+                 image: Optional[str] = None,
+                 canonical_url: Optional[str] = None,
+                 site_name: Optional[str] = None,
+                 published_time: Optional[str] = None,
+                 bytes_read: int = 0):
+        self.url = url
+        self.title = title
+        self.description = description
+        self.image = image
+        self.canonical_url = canonical_url
+        self.site_name = site_name
+        self.published_time = published_time
+        self.bytes_read = bytes_read
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'title': self.title,
+            'description': self.description,
+            'image': self.image,
+            'canonicalUrl': self.canonical_url,
+            'siteName': self.site_name,
+            'publishedTime': self.published_time,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PageMetadata':
+        return cls(
+            url=data['url'],
+            title=data.get('title'),
+            description=data.get('description'),
+            image=data.get('image'),
+            canonical_url=data.get('canonicalUrl'),
+            site_name=data.get('siteName'),
+            published_time=data.get('publishedTime')
+        )
+
+
+class _HeadParser(HTMLParser):
+    """Collects meta/link/title from the head and flags when the head is over"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.canonical: Optional[str] = None
+        self.title = ''
+        self.done = False
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.done = True
+            return
+
+        attributes = {name.lower(): value for name, value in attrs if value}
+        if tag == 'meta':
+            key = (attributes.get('property') or attributes.get('name') or attributes.get('itemprop') or '').lower()
+            content = attributes.get('content')
+            if key and content and key not in self.meta:
+                self.meta[key] = content.strip()
+        elif tag == 'link':
+            rel = (attributes.get('rel') or '').lower().split()
+            if 'canonical' in rel and attributes.get('href') and not self.canonical:
+                self.canonical = attributes['href'].strip()
+        elif tag == 'title':
+            self._in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+    def first(self, keys) -> Optional[str]:
+        for key in keys:
+            if self.meta.get(key):
+                return self.meta[key]
+        return None
+
+
+class HostLimiter:
+    """Caps concurrent requests overall and per host"""
+
+    def __init__(self, overall: int, per_host: int):
+        self._overall = asyncio.Semaphore(max(1, overall))
+        self._per_host = max(1, per_host)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlparse(url).hostname or ''
+        host_limit = self._hosts.setdefault(host, asyncio.Semaphore(self._per_host))
+        # Wait for the host first so tasks queued on a busy host don't hold global slots
+        async with host_limit, self._overall:
+            yield
+
+
+def get_scrape_client() -> httpx.AsyncClient:
+    """Get the pooled client used for source pages and image checks on the running loop"""
+    loop = asyncio.get_running_loop()
+    client = _scrape_clients.get(loop)
+
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=SCRAPE_TIMEOUT,
+            limits=httpx.Limits(max_connections=SCRAPE_MAX_CONNECTIONS, max_keepalive_connections=SCRAPE_MAX_CONNECTIONS // 2),
+            headers=SCRAPE_HEADERS,
+            follow_redirects=True
+        )
+        _scrape_clients[loop] = client
+    return client
+
+
+async def close_scrape_client() -> None:
+    """Close the pooled scraping client for the running loop (call before the loop ends)"""
+    loop = asyncio.get_running_loop()
+    client = _scrape_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+async def fetch_page_metadata(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    byte_cap: int = HEAD_BYTE_CAP
+) -> Optional[PageMetadata]:
+    """
+    Fetch title, description, site name, published time, OG image and canonical URL for a page
+
+    Args:
+        url: Page URL
+        client: Client to use (defaults to the pooled scraping client)
+        byte_cap: Max bytes to read before giving up on finding </head>
+
+    Returns:
+        PageMetadata with relative URLs resolved, or None if the page couldn't be read
+    """
+    client = client or get_scrape_client()
+    parser = _HeadParser()
+    bytes_read = 0
+
+    try:
+        async with client.stream('GET', url) as response:
+            if response.status_code != 200:
+                return None
+            content_type = response.headers.get('content-type', '')
+            if content_type and 'html' not in content_type:
+                return None
+
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            async for chunk in response.aiter_bytes():
+                bytes_read += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.done or bytes_read >= byte_cap:
+                    break
+            base_url = str(response.url)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[METADATA] Failed to read {url}: {e}")
+        return None
+
+    def resolve(value: Optional[str]) -> Optional[str]:
+        return urljoin(base_url, value) if value else None
+
+    return PageMetadata(
+        url=url,
+        title=parser.first(_TITLE_KEYS) or parser.title.strip() or None,
+        description=parser.first(_DESCRIPTION_KEYS),
+        image=resolve(parser.first(_IMAGE_KEYS)),
+        canonical_url=resolve(parser.canonical or parser.meta.get('og:url')),
+        site_name=parser.first(_SITE_NAME_KEYS),
+        published_time=parser.first(_PUBLISHED_KEYS),
+        bytes_read=bytes_read
+    )
+
+
+async def get_page_metadata(url: str, client: Optional[httpx.AsyncClient] = None) -> Optional[PageMetadata]:
+    """
+    Page metadata from the source cache, fetching it on a miss
+
+    Returns None without a request when the domain is in failure backoff;
+    failed fetches count toward that backoff.
+    """
+    cached = await asyncio.to_thread(source_cache.get_page, url)
+    if cached:
+        return PageMetadata.from_dict(cached)
+    if await asyncio.to_thread(source_cache.domain_blocked, url):
+        return None
+
+    metadata = await fetch_page_metadata(url, client)
+    if metadata is None:
+        await asyncio.to_thread(source_cache.record_domain_failure, url)
+        return None
+    await asyncio.to_thread(source_cache.set_page, url, metadata.to_dict())
+    return metadata
+
+
+def apply_metadata(source: Dict[str, Any], metadata: Optional[PageMetadata]) -> Dict[str, Any]:
+    """Copy page metadata onto a research source dict (marks it enriched even if the fetch failed)"""
+    source['enriched'] = True
+    if metadata is None:
+        return source
+
+    if metadata.title:
+        source['title'] = metadata.title
+    if metadata.description:
+        source['description'] = metadata.description
+        source['snippet'] = source.get('snippet') or metadata.description
+    source['siteName'] = metadata.site_name
+    source['publishedTime'] = metadata.published_time
+    source['image'] = metadata.image
+    source['canonicalUrl'] = metadata.canonical_url
+    return source
+
+
+async def enrich_sources(sources: List[Dict[str, Any]], deadline: float = ENRICH_DEADLINE) -> int:
+    """
+    Fetch each source page once and store its metadata on the source dict
+
+    Sources already marked enriched are skipped, so later stages (e.g. image
+    extraction) read the stored metadata instead of fetching the page again.
+    Pages are served from the source cache when possible, and domains in
+    failure backoff are not requested.
+    Sources not reached before the deadline are left as they were.
+
+    Returns:
+        Number of sources enriched
+    """
+    pending = {}
+    for source in sources:
+        url = source.get('url')
+        if url and not source.get('enriched'):
+            pending.setdefault(url, []).append(source)
+    if not pending:
+        return 0
+
+    client = get_scrape_client()
+    limiter = HostLimiter(ENRICH_CONCURRENCY, ENRICH_PER_HOST)
+
+    async def enrich(url: str) -> None:
+        async with limiter.slot(url):
+            metadata = await get_page_metadata(url, client)
+        for source in pending[url]:
+            apply_metadata(source, metadata)
+
+    tasks = [asyncio.create_task(enrich(url)) for url in pending]
+    done, not_done = await asyncio.wait(tasks, timeout=deadline)
+    for task in not_done:
+        task.cancel()
+    await asyncio.gather(*not_done, return_exceptions=True)
+
+    print(f"[METADATA] Enriched {len(done)}/{len(pending)} source(s)" + (f", {len(not_done)} timed out" if not_done else ''))
+    return len(done)
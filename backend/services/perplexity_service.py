@@ -2,11 +2,29 @@
 Perplexity API Service for Research
 """
 import os
+import re
+import time
 import httpx
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable
 from datetime import datetime
 
+# How long a batched topic-discovery result is shared between agents (seconds)
+TOPICS_CACHE_TTL = int(os.getenv('TOPICS_CACHE_TTL', '600'))
+
+SECTION_CONTEXT = {
+    'politics': 'US and global politics, elections, policy, legislation',
+    'economics': 'economy, Federal Reserve, inflation, employment, GDP, trade',
+    'opinion': 'controversial debates, editorial topics, thought leadership',
+    'world': 'international news, geopolitics, global events',
+    'business': 'corporate news, mergers, earnings, startups',
+    'tech': 'technology companies, AI, software, hardware, innovation',
+    'satire': 'absurd news stories, corporate culture, modern life frustrations, bureaucracy, tech industry, everyday situations that could be satirized in the style of The Onion'
+}
+
+# (sections, fetched_at, topics by section)
+_batched_topics_cache: Dict[tuple, tuple] = {}
+
 
 class ResearchResult:
     """Research result data class"""
@@ -19,6 +37,7 @@ class ResearchResult:
         self.raw_response = raw_response
         self.images = images or []
         self.original_topic = None  # Set by orchestrator with user's original topic
+        self.id = None  # Set once stored in the research table
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -94,23 +113,13 @@ async def get_trending_topics(section: str) -> List[str]:
     
     today = datetime.now().strftime("%A, %B %d, %Y")
     
-    section_context = {
-        'politics': 'US and global politics, elections, policy, legislation',
-        'economics': 'economy, Federal Reserve, inflation, employment, GDP, trade',
-        'opinion': 'controversial debates, editorial topics, thought leadership',
-        'world': 'international news, geopolitics, global events',
-        'business': 'corporate news, mergers, earnings, startups',
-        'tech': 'technology companies, AI, software, hardware, innovation',
-        'satire': 'absurd news stories, corporate culture, modern life frustrations, bureaucracy, tech industry, everyday situations that could be satirized in the style of The Onion'
-    }
-    
     # Special query for satire - look for topics to satirize, not breaking news
     if section == 'satire':
         system_content = f"You are a satirical news editor finding topics for Onion-style articles. TODAY IS {today}. Return ONLY a JSON array of 5 topic strings that would make good satire. Focus on absurd situations, corporate buzzwords, modern life frustrations, or news with unintentional irony."
         user_content = f"What are 5 topics from recent news or current trends that would make great Onion-style satirical articles? Think: corporate culture, tech industry hype, government bureaucracy, everyday frustrations. Return as JSON array of brief satirical angle descriptions like 'Study finds meetings could have been emails' or 'Tech company announces AI that writes AI'."
     else:
         system_content = f"You are a news editor identifying today's most important stories. TODAY IS {today}. Return ONLY a JSON array of 5 topic strings, no other text. All topics must be from TODAY or the last 24 hours."
-        user_content = f"What are the top 5 breaking news stories from TODAY ({today}) in {section_context.get(section, section)}? Only include stories from the last 24 hours. Return as JSON array of brief topic descriptions."
+        user_content = f"What are the top 5 breaking news stories from TODAY ({today}) in {SECTION_CONTEXT.get(section, section)}? Only include stories from the last 24 hours. Return as JSON array of brief topic descriptions."
     
     async with httpx.AsyncClient(timeout=60.0) as client:
         response = await client.post(
@@ -154,6 +163,87 @@ async def get_trending_topics(section: str) -> List[str]:
             return [line.strip() for line in content.split('\n') if line.strip()][:5]
 
 
+async def get_trending_topics_batch(sections: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Get trending topics for several sections with one Perplexity call
+    
+    The result is cached for TOPICS_CACHE_TTL seconds so every agent in a
+    run-all reads its slice from the same response.
+    
+    Args:
+        sections: Section names (politics, economics, etc.)
+    
+    Returns:
+        Dict of section -> list of topic strings (empty list if none came back)
+    """
+    sections = tuple(sections)
+    cached = _batched_topics_cache.get(sections)
+    if cached and time.time() - cached[0] < TOPICS_CACHE_TTL:
+        return cached[1]
+    
+    api_key = os.getenv('PERPLEXITY_API_KEY')
+    
+    if not api_key:
+        raise ValueError("PERPLEXITY_API_KEY must be set in environment variables")
+    
+    today = datetime.now().strftime("%A, %B %d, %Y")
+    
+    section_lines = "\n".join(f'- "{section}": {SECTION_CONTEXT.get(section, section)}' for section in sections)
+    system_content = f"You are a news editor identifying today's most important stories for every desk of a newspaper. TODAY IS {today}. Return ONLY a JSON object, no other text."
+    user_content = f"""For each section below, list 5 brief topic descriptions.
+
+{section_lines}
+
+News sections: only stories from TODAY ({today}) or the last 24 hours, and do not repeat the same story in two sections.
+"satire": Onion-style satirical angles drawn from recent news or trends, like 'Study finds meetings could have been emails'.
+
+Return a JSON object mapping each section name to an array of topic strings, e.g. {{"politics": ["...", "..."], ...}}"""
+    
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        response = await client.post(
+            'https://api.perplexity.ai/chat/completions',
+            headers={
+                'Authorization': f'Bearer {api_key}',
+                'Content-Type': 'application/json'
+            },
+            json={
+                'model': 'sonar',
+                'messages': [
+                    {'role': 'system', 'content': system_content},
+                    {'role': 'user', 'content': user_content}
+                ],
+                'max_tokens': 300 * len(sections),
+                'temperature': 0.3
+            }
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Perplexity API error: {response.status_code}")
+        
+        data = response.json()
+        content = data.get('choices', [{}])[0].get('message', {}).get('content', '{}')
+    
+    parsed = {}
+    try:
+        json_match = re.search(r'\{[\s\S]*\}', content)
+        if json_match:
+            parsed = json.loads(json_match.group(0))
+    except ValueError:
+        print("[TOPICS] Could not parse batched topics response")
+    
+    topics = {}
+    for section in sections:
+        section_topics = parsed.get(section) if isinstance(parsed, dict) else None
+        topics[section] = [str(t) for t in section_topics if t][:5] if isinstance(section_topics, list) else []
+    
+    # Don't cache a failed parse, or every agent would get no topics until the TTL expires
+    if any(topics.values()):
+        _batched_topics_cache[sections] = (time.time(), topics)
+    else:
+        print("[TOPICS] Batched topics response had no topics; not caching")
+    return topics
+
+
 def build_system_prompt(section: str) -> str:
     """Build system prompt for research"""
     today = datetime.now().strftime("%A, %B %d, %Y")
@@ -0,0 +1,144 @@
+"""
+Research Store
+Persists Perplexity research so revisions and reruns don't buy it again
+
+Research is saved in the research table, keyed by normalized topic,
+section, depth and date, and linked to the articles written from it
+(articles.research_id). Lookups only reuse research younger than the TTL.
+"""
+import os
+import re
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+
+from services.perplexity_service import ResearchResult, perform_research
+from services.page_metadata import enrich_sources
+
+# How long stored research counts as fresh for new articles (hours)
+RESEARCH_TTL_HOURS = float(os.getenv('RESEARCH_TTL_HOURS', '12'))
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9\s]', ' ', topic.lower())).strip()
+
+
+def research_key(topic: str, section: str, depth: str = 'deep', date: Optional[str] = None) -> str:
+    """Lookup key for a research brief: topic|section|depth|YYYY-MM-DD (UTC, like the TTL cutoff)"""
+    date = date or datetime.now(timezone.utc).date().isoformat()
+    return f"{normalize_topic(topic)}|{section}|{depth}|{date}"
+
+
+def _row_to_research(row: Dict[str, Any]) -> ResearchResult:
+    research = ResearchResult(
+        summary=row.get('summary') or '',
+        key_points=row.get('key_points') or [],
+        sources=row.get('sources') or [],
+        raw_response=row.get('raw_response') or ''
+    )
+    research.id = row['id']
+    research.original_topic = row.get('topic')
+    return research
+
+
+def find_research(topic: str, section: str, depth: str = 'deep',
+                  max_age_hours: float = RESEARCH_TTL_HOURS) -> Optional[ResearchResult]:
+    """Get the newest stored research for a topic that is still within the TTL"""
+    from database.supabase_client import supabase
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+
+    try:
+        response = supabase.table('research')\
+            .select('*')\
+            .eq('topic_key', research_key(topic, section, depth))\
+            .gte('created_at', cutoff.isoformat())\
+            .order('created_at', desc=True)\
+            .limit(1)\
+            .execute()
+    except Exception as e:
+        print(f"[RESEARCH] Lookup failed for '{topic}': {e}")
+        return None
+
+    if not response.data:
+        return None
+    return _row_to_research(response.data[0])
+
+
+def get_research(research_id: str) -> Optional[ResearchResult]:
+    """Get stored research by id, regardless of age"""
+    from database.supabase_client import supabase
+
+    try:
+        response = supabase.table('research').select('*').eq('id', research_id).execute()
+    except Exception as e:
+        print(f"[RESEARCH] Failed to load research {research_id}: {e}")
+        return None
+
+    if not response.data:
+        return None
+    return _row_to_research(response.data[0])
+
+
+def get_research_for_article(article: Dict[str, Any]) -> Optional[ResearchResult]:
+    """Stored research an article was written from, if it was linked"""
+    if not article.get('research_id'):
+        return None
+    return get_research(article['research_id'])
+
+
+def save_research(topic: str, section: str, depth: str, research: ResearchResult) -> Optional[str]:
+    """Store research and set research.id; returns the id, or None if storing failed"""
+    from database.supabase_client import supabase
+
+    try:
+        response = supabase.table('research').insert({
+            'topic_key': research_key(topic, section, depth),
+            'topic': topic,
+            'section': section,
+            'depth': depth,
+            'summary': research.summary,
+            'key_points': research.key_points,
+            'sources': research.sources,
+            'raw_response': research.raw_response,
+        }).execute()
+    except Exception as e:
+        print(f"[RESEARCH] Failed to store research for '{topic}': {e}")
+        return None
+
+    if not response.data:
+        return None
+    research.id = response.data[0]['id']
+    return research.id
+
+
+async def research_topic(topic: str, section: str, depth: str = 'deep') -> ResearchResult:
+    """
+    Get research for a topic, reusing fresh stored research when available
+
+    Sources are enriched with page metadata (title, description, site name,
+    published time, og:image) so later stages don't fetch them again.
+
+    Args:
+        topic: Research topic
+        section: Section (politics, economics, etc.)
+        depth: Research depth ('quick' or 'deep')
+
+    Returns:
+        ResearchResult with id set when it is stored
+    """
+    research = await asyncio.to_thread(find_research, topic, section, depth)
+    if research:
+        print(f"[RESEARCH] Reusing stored research for: {topic}")
+        research.original_topic = topic
+        # Research stored before enrichment existed has bare citations
+        await enrich_sources(research.sources)
+        return research
+
+    research = await perform_research(topic, section, depth)
+    research.original_topic = topic
+    # Fetch every citation once now; titles, descriptions and images are stored with the research
+    await enrich_sources(research.sources)
+    await asyncio.to_thread(save_research, topic, section, depth, research)
+    return research
@@ -0,0 +1,133 @@
+"""
+Single-Flight
+Coalesces identical concurrent reads into one upstream call
+
+When a story breaks, many requests run the same Supabase select at the
+same moment. The first caller for a key (the leader) runs the query;
+callers arriving while it's in flight wait for it and receive copies of
+its result (or its exception) instead of issuing their own.
+
+CoalescedQuery wraps a supabase select builder and records the table,
+projection and every filter/order/limit call, so identical chains map to
+the same key without call sites having to build one.
+"""
+import copy
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+
+class _Call:
+    """One in-flight upstream call and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'calls': 0,         # Upstream calls actually made
+            'coalesced': 0,     # Callers served by another caller's call
+            'errors': 0,        # Upstream calls that raised
+            'max_waiters': 0,   # Largest number of callers sharing one call
+        }
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Result of fn(), shared with any concurrent callers using the same key
+
+        Every caller gets its own deep copy when the result was shared, so
+        callers may mutate what they receive.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats['calls'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            # No caller can join once the call is removed, so waiters is final here
+            with self._lock:
+                self._calls.pop(key, None)
+                self.stats['max_waiters'] = max(self.stats['max_waiters'], call.waiters)
+            call.done.set()
+
+        # Waiters copy the pristine result; only copy it for the leader if it was shared
+        return copy.deepcopy(call.result) if call.waiters else call.result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Call/coalescing counters and current in-flight keys"""
+        with self._lock:
+            requests = self.stats['calls'] + self.stats['coalesced']
+            return {
+                **self.stats,
+                'coalesced_ratio': round(self.stats['coalesced'] / requests, 3) if requests else 0.0,
+                'in_flight': len(self._calls),
+            }
+
+
+# Process-wide instance shared by all data access
+single_flight = SingleFlight()
+
+
+class CoalescedQuery:
+    """A supabase select whose execute() is shared by identical concurrent queries"""
+
+    def __init__(self, builder, table: str, columns: str):
+        self._builder = builder
+        self._key: List[Any] = [table, columns]
+
+    def __getattr__(self, name: str):
+        method = getattr(self._builder, name)
+        if not callable(method):
+            return method
+
+        def chain(*args, **kwargs):
+            self._builder = method(*args, **kwargs)
+            self._key.append((name, args, sorted(kwargs.items())))
+            return self
+        return chain
+
+    @property
+    def key(self) -> str:
+        return repr(self._key)
+
+    def execute(self):
+        return single_flight.do(self.key, self._builder.execute)
+
+
+def coalesced_select(table: str, columns: str = '*') -> CoalescedQuery:
+    """supabase.table(table).select(columns), coalesced with identical in-flight queries"""
+    from database.supabase_client import supabase
+    return CoalescedQuery(supabase.table(table).select(columns), table, columns)
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """Get stampede-protection counters for coalesced reads"""
+    return single_flight.get_stats()
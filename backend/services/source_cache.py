@@ -0,0 +1,151 @@
+"""
+Source Cache
+Remembers what source pages and outlets returned so they aren't fetched again
+
+Four kinds of entries share one two-tier ResponseCache (memory + SQLite):
+1. page:<url>    - page metadata read from the source's head
+2. image:<url>   - the validated og:image for a source, or a miss
+3. imageinfo:<url> - probed format, size and perceptual hash of an image URL
+4. domain:<host> - consecutive failures for an outlet, with backoff
+
+A domain that keeps failing (blocked, timing out, or never exposing an
+og:image) is skipped outright until its backoff expires.
+
+These functions hit SQLite and are synchronous; async callers run them
+with asyncio.to_thread so disk reads and writes don't block the loop.
+"""
+import os
+import json
+import time
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+from services.llm_cache import ResponseCache
+
+SOURCE_CACHE_PATH = os.getenv(
+    'SOURCE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'source_cache.sqlite3')
+)
+
+# TTLs in seconds (overridable via environment)
+PAGE_TTL = int(os.getenv('SOURCE_PAGE_TTL', str(24 * 3600)))
+IMAGE_TTL = int(os.getenv('SOURCE_IMAGE_TTL', str(3 * 24 * 3600)))
+IMAGE_MISS_TTL = int(os.getenv('SOURCE_IMAGE_MISS_TTL', str(12 * 3600)))
+IMAGE_INFO_TTL = int(os.getenv('SOURCE_IMAGE_INFO_TTL', str(30 * 24 * 3600)))
+
+# Domain backoff: blocked after this many consecutive failures, doubling per further failure
+DOMAIN_FAILURE_THRESHOLD = int(os.getenv('SOURCE_DOMAIN_FAILURE_THRESHOLD', '3'))
+DOMAIN_BACKOFF_BASE = int(os.getenv('SOURCE_DOMAIN_BACKOFF_BASE', '1800'))
+DOMAIN_BACKOFF_MAX = int(os.getenv('SOURCE_DOMAIN_BACKOFF_MAX', str(7 * 24 * 3600)))
+# Failures older than this (with no block) are forgotten
+DOMAIN_FAILURE_WINDOW = 24 * 3600
+
+source_cache = ResponseCache(path=SOURCE_CACHE_PATH, memory_items=1024, max_bytes=16 * 1024 * 1024)
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or '').replace('www.', '')
+
+
+def _get_json(key: str) -> Optional[Dict[str, Any]]:
+    value = source_cache.get(key)
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def get_page(url: str) -> Optional[Dict[str, Any]]:
+    """Cached page metadata (PageMetadata.to_dict()) for a source URL"""
+    return _get_json(f'page:{url}')
+
+
+def set_page(url: str, metadata: Dict[str, Any]) -> None:
+    source_cache.set(f'page:{url}', json.dumps(metadata), PAGE_TTL)
+
+
+def get_image(url: str) -> Tuple[bool, Optional[str]]:
+    """
+    Cached image result for a source URL
+
+    Returns:
+        (found, image_url) - image_url is None for a cached miss
+    """
+    entry = _get_json(f'image:{url}')
+    if entry is None:
+        return False, None
+    return True, entry.get('image')
+
+
+def set_image(url: str, image_url: Optional[str]) -> None:
+    """Cache a validated image (or a miss, for a shorter TTL) for a source URL"""
+    source_cache.set(f'image:{url}', json.dumps({'image': image_url}), IMAGE_TTL if image_url else IMAGE_MISS_TTL)
+
+
+def get_image_info(image_url: str) -> Optional[Dict[str, Any]]:
+    """Cached ImageInfo.to_dict() for an image URL"""
+    return _get_json(f'imageinfo:{image_url}')
+
+
+def set_image_info(image_url: str, info: Dict[str, Any]) -> None:
+    source_cache.set(f'imageinfo:{image_url}', json.dumps(info), IMAGE_INFO_TTL)
+
+
+def domain_blocked(url: str) -> bool:
+    """Whether the URL's domain is in backoff after repeated failures"""
+    state = _get_json(f'domain:{_host(url)}')
+    return bool(state and state.get('blocked_until', 0) > time.time())
+
+
+def record_domain_failure(url: str) -> None:
+    """Count a failed fetch (error, timeout, block, no image); start or extend backoff"""
+    host = _host(url)
+    state = _get_json(f'domain:{host}') or {'failures': 0}
+    failures = state['failures'] + 1
+    state = {'failures': failures, 'blocked_until': 0}
+    ttl = DOMAIN_FAILURE_WINDOW
+
+    if failures >= DOMAIN_FAILURE_THRESHOLD:
+        backoff = min(DOMAIN_BACKOFF_MAX, DOMAIN_BACKOFF_BASE * 2 ** (failures - DOMAIN_FAILURE_THRESHOLD))
+        state['blocked_until'] = time.time() + backoff
+        ttl = backoff + DOMAIN_FAILURE_WINDOW
+        print(f"[SOURCES] Backing off {host} for {backoff}s after {failures} failures")
+
+    source_cache.set(f'domain:{host}', json.dumps(state), ttl)
+
+
+def record_domain_success(url: str) -> None:
+    """Clear a domain's failure count"""
+    key = f'domain:{_host(url)}'
+    if source_cache.get(key) is not None:
+        source_cache.delete(key)
+
+
+def lookup_source_image(url: str) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]], bool]:
+    """
+    Everything extraction needs to know about a source before fetching it, in one call
+
+    Returns:
+        (found, image_url, image_info, blocked) - image_info is the cached
+        ImageInfo.to_dict() of a cached image; blocked is whether the
+        domain is in backoff (only checked on a miss)
+    """
+    found, image_url = get_image(url)
+    if found:
+        return True, image_url, get_image_info(image_url) if image_url else None, False
+    return False, None, None, domain_blocked(url)
+
+
+def record_source_image(url: str, image_url: Optional[str], count_failure: bool = True) -> None:
+    """Cache a source's extraction result and update its domain's failure count"""
+    set_image(url, image_url)
+    if image_url:
+        record_domain_success(url)
+    elif count_failure:
+        record_domain_failure(url)
+
+
+def get_source_cache_stats() -> Dict[str, Any]:
+    return source_cache.get_stats()
@@ -0,0 +1,197 @@
+"""
+Topic Deduplication
+Near-duplicate detection for story topics using MinHash + LSH
+
+Agents for different sections often surface the same story. Before any
+research is bought, each topic is checked against the topics already
+claimed in the current run and the titles/excerpts of recent articles.
+
+Topics are shingled into content words plus word bigrams. LSH only
+proposes candidates; a candidate is a duplicate when the exact Jaccard
+similarity of the shingle sets reaches the threshold and the two texts
+don't name different entities ("ECB holds rates" vs "Fed holds rates"
+share most words but are different stories).
+"""
+import os
+import re
+import random
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+# Jaccard similarity (words + bigrams) at or above which two topics are the same story
+DEDUP_THRESHOLD = float(os.getenv('TOPIC_DEDUP_THRESHOLD', '0.5'))
+# How far back published/draft articles count as already covered (hours)
+DEDUP_LOOKBACK_HOURS = float(os.getenv('TOPIC_DEDUP_LOOKBACK_HOURS', '36'))
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 32  # 32 bands x 2 rows: lenient candidate generation, exact check after
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in',
+    'into', 'is', 'it', 'its', 'new', 'of', 'on', 'or', 'over', 'says', 'than', 'that',
+    'the', 'their', 'to', 'after', 'amid', 'with', 'will', 'was', 'were', 'this', 'us',
+}
+
+
+# Share of capitalized words above which a text is Title Case (capitals say nothing about entities)
+_TITLE_CASE_RATIO = 0.6
+
+
+def _normalize(word: str) -> str:
+    word = word.lower()
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    return word
+
+
+def _content_words(text: str) -> List[str]:
+    """Words in original case, stopwords and single characters dropped"""
+    return [
+        word for word in re.findall(r'[A-Za-z0-9]+', text)
+        if len(word) >= 2 and word.lower() not in _STOPWORDS
+    ]
+
+
+def shingles(text: str) -> Set[str]:
+    """Normalized content words plus adjacent word bigrams (stopwords dropped, plurals folded)"""
+    words = [_normalize(word) for word in _content_words(text)]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def entities(text: str) -> Optional[Set[str]]:
+    """
+    Normalized capitalized words and numbers (names, places, institutions)
+
+    Returns None for Title Case text, where capitalization carries no signal.
+    """
+    words = _content_words(text)
+    long_words = [word for word in words if len(word) > 3 and not any(c.isdigit() for c in word)]
+    if long_words and sum(1 for word in long_words if word[0].isupper()) / len(long_words) >= _TITLE_CASE_RATIO:
+        return None
+    return {
+        _normalize(word) for word in words
+        if any(c.isupper() for c in word) or any(c.isdigit() for c in word)
+    }
+
+
+def entities_conflict(a: Optional[Set[str]], b: Optional[Set[str]]) -> bool:
+    """Whether two texts each name an entity the other doesn't (e.g. ECB vs Fed)"""
+    if not a or not b:
+        return False
+    return bool(a - b) and bool(b - a)
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(shingle_set: Set[str]) -> Tuple[int, ...]:
+    """MinHash signature of a shingle set"""
+    if not shingle_set:
+        return tuple([_MERSENNE_PRIME] * NUM_PERMUTATIONS)
+
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+        for s in shingle_set
+    ]
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+class TopicIndex:
+    """MinHash LSH index of topics claimed in a run plus recently covered stories"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+        self._shingles: Dict[int, Set[str]] = {}
+        self._entities: Dict[int, Optional[Set[str]]] = {}
+        self._labels: Dict[int, str] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self.stats = {'checked': 0, 'duplicates': 0}
+
+    def add(self, text: str, label: str) -> None:
+        shingle_set = shingles(text)
+        signature = minhash(shingle_set)
+        entry_id = len(self._signatures)
+        self._signatures[entry_id] = signature
+        self._shingles[entry_id] = shingle_set
+        self._entities[entry_id] = entities(text)
+        self._labels[entry_id] = label
+        for band in range(LSH_BANDS):
+            key = (band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            self._buckets.setdefault(key, []).append(entry_id)
+
+    def find_duplicate(self, text: str) -> Optional[Tuple[str, float]]:
+        """Return (label, similarity) of the closest indexed near-duplicate, if any"""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return None
+
+        signature = minhash(shingle_set)
+        candidates = set()
+        for band in range(LSH_BANDS):
+            key = (band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            candidates.update(self._buckets.get(key, []))
+
+        text_entities = entities(text)
+        best = None
+        for entry_id in candidates:
+            similarity = jaccard(shingle_set, self._shingles[entry_id])
+            if similarity < self.threshold or (best is not None and similarity <= best[1]):
+                continue
+            if entities_conflict(text_entities, self._entities[entry_id]):
+                continue
+            best = (self._labels[entry_id], round(similarity, 3))
+        return best
+
+    def claim(self, topic: str, section: str) -> Optional[Tuple[str, float]]:
+        """
+        Claim a topic for a section
+
+        Returns None and indexes the topic if it is new; otherwise returns the
+        (label, similarity) of the story it duplicates and leaves the index alone.
+        """
+        self.stats['checked'] += 1
+        duplicate = self.find_duplicate(topic)
+        if duplicate:
+            self.stats['duplicates'] += 1
+            return duplicate
+        self.add(topic, f"{section} topic: {topic}")
+        return None
+
+    def load_recent_articles(self, hours: float = DEDUP_LOOKBACK_HOURS) -> int:
+        """Index titles and excerpts of articles created in the last `hours`"""
+        from database.supabase_client import supabase
+
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+        try:
+            response = supabase.table('articles')\
+                .select('title, excerpt, section')\
+                .gte('created_at', cutoff.isoformat())\
+                .neq('status', 'discarded')\
+                .limit(500)\
+                .execute()
+        except Exception as e:
+            print(f"[DEDUP] Could not load recent articles: {e}")
+            return 0
+
+        for row in response.data or []:
+            label = f"{row.get('section')} article: {row.get('title')}"
+            self.add(row.get('title') or '', label)
+            if row.get('excerpt'):
+                self.add(row['excerpt'], label)
+        return len(response.data or [])
@@ -0,0 +1,100 @@
+import pytest
+
+from services import article_cache as article_cache_module
+from services.article_cache import ArticleCache
+from services.llm_cache import ResponseCache
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / 'article_cache.sqlite3')
+
+
+def _shared(path):
+    return ResponseCache(path=path, memory_items=0)
+
+
+def test_invalidate_drops_memory_entries():
+    cache = ArticleCache()
+    cache.set('list:published', [{'id': 1}], ttl=60)
+    assert cache.get('list:published') == (True, [{'id': 1}])
+
+    assert cache.invalidate() == 1
+    assert cache.get('list:published') == (False, None)
+    assert cache.stats['invalidations'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ArticleCache()
+    cache.set('lead:current', {'id': 1}, ttl=-1)
+    assert cache.get('lead:current') == (False, None)
+
+
+def test_payload_built_during_invalidation_is_not_served():
+    cache = ArticleCache()
+    generation = cache.generation()
+    cache.invalidate()
+    cache.set('section:tech', ['stale'], ttl=60, generation=generation)
+    assert cache.get('section:tech') == (False, None)
+
+
+def test_invalidation_reaches_other_workers(shared_path, monkeypatch):
+    monkeypatch.setattr(article_cache_module, 'ARTICLE_CACHE_GENERATION_CHECK', 0)
+    publisher = ArticleCache(shared=_shared(shared_path))
+    reader = ArticleCache(shared=_shared(shared_path))
+
+    publisher.set('slug:fed-holds-rates', {'title': 'Old'}, ttl=60)
+    assert reader.get('slug:fed-holds-rates') == (True, {'title': 'Old'})
+    assert reader.stats['shared_hits'] == 1
+    assert reader.get('slug:fed-holds-rates') == (True, {'title': 'Old'})
+    assert reader.stats['memory_hits'] == 1
+
+    publisher.invalidate()
+    assert reader.generation() == 1
+    assert reader.get('slug:fed-holds-rates') == (False, None)
+
+
+def test_generation_is_reread_at_most_every_check_interval(shared_path, monkeypatch):
+    monkeypatch.setattr(article_cache_module, 'ARTICLE_CACHE_GENERATION_CHECK', 3600)
+    publisher = ArticleCache(shared=_shared(shared_path))
+    reader = ArticleCache(shared=_shared(shared_path))
+
+    assert reader.generation() == 0
+    publisher.invalidate()
+    assert reader.generation() == 0  # Trusts its last read until the interval passes
+
+    monkeypatch.setattr(article_cache_module, 'ARTICLE_CACHE_GENERATION_CHECK', 0)
+    assert reader.generation() == 1
+
+
+def test_read_through_caches_loader_results(monkeypatch):
+    monkeypatch.setattr(article_cache_module, 'article_cache', ArticleCache())
+    monkeypatch.setattr(article_cache_module, 'ARTICLE_CACHE_ENABLED', True)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'articles': len(loads)}
+
+    assert article_cache_module.read_through('list:published', loader) == {'articles': 1}
+    assert article_cache_module.read_through('list:published', loader) == {'articles': 1}
+    article_cache_module.invalidate_articles('test')
+    assert article_cache_module.read_through('list:published', loader) == {'articles': 2}
+
+    stats = article_cache_module.get_article_cache_stats()
+    assert stats['by_kind']['list'] == {'hits': 1, 'misses': 2, 'hit_ratio': 0.333}
+    assert stats['generation'] == 1
+
+
+def test_read_through_does_not_cache_none(monkeypatch):
+    monkeypatch.setattr(article_cache_module, 'article_cache', ArticleCache())
+    monkeypatch.setattr(article_cache_module, 'ARTICLE_CACHE_ENABLED', True)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return None
+
+    article_cache_module.read_through('slug:missing', loader)
+    article_cache_module.read_through('slug:missing', loader)
+    assert len(loads) == 2
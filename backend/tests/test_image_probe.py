@@ -0,0 +1,74 @@
+import struct
+
+import pytest
+
+from services.image_probe import parse_image_header, rejection_reason
+
+
+def _png(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def _gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00\x00\x00'
+
+
+def _webp(chunk, payload):
+    body = b'WEBP' + chunk + struct.pack('<I', len(payload)) + payload
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def _webp_vp8(width, height):
+    # Frame tag (3 bytes) + start code, then 14-bit width/height
+    return _webp(b'VP8 ', b'\x00\x00\x00\x9d\x01\x2a' + struct.pack('<HH', width, height))
+
+
+def _webp_vp8l(width, height):
+    bits = (width - 1) | ((height - 1) << 14)
+    return _webp(b'VP8L', b'\x2f' + struct.pack('<I', bits))
+
+
+def _webp_vp8x(width, height):
+    return _webp(b'VP8X', b'\x00\x00\x00\x00' + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little'))
+
+
+def _jpeg(width, height, sof=0xC0):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    frame = b'\xff' + bytes([sof]) + struct.pack('>HBHH', 17, 8, height, width) + b'\x00' * 10
+    return b'\xff\xd8' + app0 + frame
+
+
+@pytest.mark.parametrize('data, expected', [
+    (_png(1200, 675), ('png', 1200, 675)),
+    (_gif(640, 480), ('gif', 640, 480)),
+    (_webp_vp8(1024, 576), ('webp', 1024, 576)),
+    (_webp_vp8l(800, 600), ('webp', 800, 600)),
+    (_webp_vp8x(4000, 3000), ('webp', 4000, 3000)),
+    (_jpeg(1920, 1080), ('jpeg', 1920, 1080)),
+    (_jpeg(1600, 900, sof=0xC2), ('jpeg', 1600, 900)),
+])
+def test_parse_known_formats(data, expected):
+    assert parse_image_header(data) == expected
+
+
+def test_jpeg_skips_fill_bytes():
+    data = _jpeg(1280, 720)
+    assert parse_image_header(data[:2] + b'\xff' + data[2:]) == ('jpeg', 1280, 720)
+
+
+@pytest.mark.parametrize('data', [
+    _png(1200, 675)[:20],
+    _gif(640, 480)[:8],
+    _webp_vp8x(4000, 3000)[:26],
+    _jpeg(1920, 1080)[:24],
+    b'<html>not an image</html>',
+    b'',
+])
+def test_truncated_or_unknown_data(data):
+    assert parse_image_header(data) is None
+
+
+def test_rejection_reason():
+    assert rejection_reason(1200, 675) is None
+    assert rejection_reason(1, 1).startswith('too small')
+    assert rejection_reason(2000, 400).startswith('bad aspect ratio')
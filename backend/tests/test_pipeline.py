@@ -0,0 +1,70 @@
+import asyncio
+
+from agents.pipeline import Stage, run_pipeline
+
+
+def test_items_flow_through_every_stage():
+    async def double(item):
+        return item * 2
+
+    async def describe(item):
+        return f"item {item}"
+
+    result = asyncio.run(run_pipeline(range(5), [Stage('double', double, 2), Stage('describe', describe)]))
+
+    assert sorted(result['outputs']) == [f"item {n}" for n in (0, 2, 4, 6, 8)]
+    assert result['errors'] == []
+    assert set(result['stage_seconds']) == {'double', 'describe'}
+
+
+def test_single_worker_stages_keep_order():
+    async def passthrough(item):
+        await asyncio.sleep(0)
+        return item
+
+    result = asyncio.run(run_pipeline(range(10), [Stage('a', passthrough), Stage('b', passthrough)], queue_size=1))
+    assert result['outputs'] == list(range(10))
+
+
+def test_failures_and_none_drop_only_that_item():
+    async def check(item):
+        if item == 2:
+            raise ValueError('bad item')
+        return None if item == 3 else item
+
+    result = asyncio.run(run_pipeline(range(5), [Stage('check', check, 3)]))
+
+    assert sorted(result['outputs']) == [0, 1, 4]
+    assert result['errors'] == ['check: bad item']
+
+
+def test_later_stage_starts_before_earlier_stage_finishes():
+    events = []
+
+    async def research(item):
+        events.append(('research', item))
+        await asyncio.sleep(0.01)
+        return item
+
+    async def write(item):
+        events.append(('write', item))
+        return item
+
+    asyncio.run(run_pipeline(range(3), [Stage('research', research), Stage('write', write)]))
+
+    assert events.index(('write', 0)) < events.index(('research', 2))
+
+
+def test_stage_concurrency_is_bounded():
+    running = []
+    peak = []
+
+    async def work(item):
+        running.append(item)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(item)
+        return item
+
+    asyncio.run(run_pipeline(range(8), [Stage('work', work, 3)]))
+    assert max(peak) == 3
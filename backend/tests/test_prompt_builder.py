@@ -0,0 +1,80 @@
+import pytest
+
+from agents.prompt_builder import (
+    MAX_OUTPUT_TOKENS, MIN_OUTPUT_TOKENS, build_research_context, count_tokens,
+    max_output_tokens, truncate_to_tokens,
+)
+from services.perplexity_service import ResearchResult
+
+
+def _research(summary_sentences=40, key_points=20, raw=''):
+    summary = ' '.join(f"Sentence {n} of the research summary about the rate decision." for n in range(summary_sentences))
+    points = [f"Key fact number {n} about the decision and its effect on markets." for n in range(key_points)]
+    return ResearchResult(summary=summary, key_points=points, sources=[], raw_response=raw)
+
+
+def test_truncate_respects_budget():
+    text = ' '.join(f"Sentence {n} is here." for n in range(200))
+    truncated = truncate_to_tokens(text, 50)
+    assert count_tokens(truncated) <= 50
+    assert truncated.endswith('.')
+    assert truncate_to_tokens(text, 0) == ''
+    assert truncate_to_tokens('Short.', 50) == 'Short.'
+
+
+@pytest.mark.parametrize('budget', [200, 600, 1500])
+def test_research_context_fits_budget(budget):
+    raw = "QUOTES:\n" + '\n\n'.join(f"Quote paragraph {n} from an official about the outlook." for n in range(30))
+    context = build_research_context(_research(raw=raw), 'draft', budget=budget)
+    # Section headings and bullets add a few tokens on top of the budgeted text
+    assert count_tokens(context) <= budget * 1.1
+    assert context.startswith('RESEARCH SUMMARY:')
+
+
+def test_key_facts_are_deduplicated():
+    research = ResearchResult(
+        summary='Rates were held.',
+        key_points=['Rates held at 5%.', 'rates held at 5%', 'Two members dissented.'],
+        sources=[],
+        raw_response=''
+    )
+    context = build_research_context(research, 'review')
+    assert context.count('held at 5%') == 1
+    assert '• Two members dissented.' in context
+
+
+def test_raw_sections_already_in_summary_are_skipped():
+    research = ResearchResult(
+        summary='The central bank held rates.',
+        key_points=[],
+        sources=[],
+        raw_response="SUMMARY:\nThe central bank held rates.\n\nQUOTES:\n\"We remain vigilant,\" the chair said."
+    )
+    context = build_research_context(research, 'draft')
+    assert context.count('The central bank held rates.') == 1
+    assert 'ADDITIONAL RESEARCH:\nQUOTES:' in context
+
+
+def test_markdown_headings_do_not_repeat_summary_or_key_facts():
+    research = ResearchResult(
+        summary='The Federal Reserve held its benchmark rate at 5.25%.',
+        key_points=['Two members dissented.'],
+        sources=[],
+        raw_response=(
+            "## 1. SUMMARY:\nThe Federal Reserve held its benchmark rate at 5.25%. Markets had expected the hold.\n\n"
+            "## 2. **KEY FACTS:**\n- Two members dissented.\n- Futures priced a September cut.\n\n"
+            "## 3. QUOTES:\n\"We are not there yet,\" the chair said.\n\n"
+            "### 4. CONTEXT\nRates have been unchanged since July."
+        )
+    )
+    context = build_research_context(research, 'draft')
+    assert context.count('held its benchmark rate') == 1
+    assert 'Futures priced' not in context
+    assert '## 3. QUOTES:\n"We are not there yet," the chair said.' in context
+    assert 'Rates have been unchanged since July.' in context
+
+
+def test_max_output_tokens_is_clamped():
+    assert max_output_tokens(100) == MIN_OUTPUT_TOKENS
+    assert max_output_tokens(1000) == int(1000 * 1.35 * 1.25) + 300
+    assert max_output_tokens(100000) == MAX_OUTPUT_TOKENS
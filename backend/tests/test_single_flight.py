@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from services.single_flight import CoalescedQuery, SingleFlight
+
+
+def _run_concurrently(flight, key, fn, callers):
+    """Start callers for key while the leader's fn blocks; returns (results, errors)"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'rows': [1, 2, 3]}
+
+    threads, results, errors = _run_concurrently(flight, 'articles', fetch, 5)
+    _wait_for(lambda: flight.stats['coalesced'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert errors == []
+    assert results == [{'rows': [1, 2, 3]}] * 5
+    stats = flight.get_stats()
+    assert stats['calls'] == 1
+    assert stats['max_waiters'] == 4
+    assert stats['coalesced_ratio'] == 0.8
+    assert stats['in_flight'] == 0
+
+
+def test_shared_results_are_copies():
+    flight = SingleFlight()
+    release = threading.Event()
+    shared = {'rows': [1]}
+
+    def fetch():
+        release.wait(5)
+        return shared
+
+    threads, results, _ = _run_concurrently(flight, 'articles', fetch, 3)
+    _wait_for(lambda: flight.stats['coalesced'] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    results[0]['rows'].append(2)
+    assert shared == {'rows': [1]}
+    assert all(result is not shared for result in results)
+    assert results[1] == {'rows': [1]}
+
+
+def test_errors_fan_out_to_waiters():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError('upstream down')
+
+    threads, results, errors = _run_concurrently(flight, 'articles', fetch, 4)
+    _wait_for(lambda: flight.stats['coalesced'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == []
+    assert len(errors) == 4
+    assert all(str(e) == 'upstream down' for e in errors)
+    assert flight.stats['errors'] == 1
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    shared = {'rows': []}
+    assert flight.do('articles', lambda: shared) is shared
+    assert flight.do('articles', lambda: shared) is shared
+    assert flight.stats['calls'] == 2
+    assert flight.stats['coalesced'] == 0
+
+    with pytest.raises(ValueError):
+        flight.do('articles', lambda: int('x'))
+    assert flight.get_stats()['in_flight'] == 0
+
+
+class _FakeBuilder:
+    """Stand-in for a supabase select builder"""
+
+    def __init__(self):
+        self.calls = []
+
+    def eq(self, column, value):
+        self.calls.append(('eq', column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.calls.append(('order', column, desc))
+        return self
+
+
+def test_coalesced_query_key_follows_the_chain():
+    first = CoalescedQuery(_FakeBuilder(), 'articles', 'id, title').eq('status', 'published').order('created_at', desc=True)
+    same = CoalescedQuery(_FakeBuilder(), 'articles', 'id, title').eq('status', 'published').order('created_at', desc=True)
+    other = CoalescedQuery(_FakeBuilder(), 'articles', 'id, title').eq('status', 'draft').order('created_at', desc=True)
+
+    assert first.key == same.key
+    assert first.key != other.key
+    assert first._builder.calls == [('eq', 'status', 'published'), ('order', 'created_at', True)]
@@ -0,0 +1,72 @@
+from services.topic_dedup import TopicIndex, entities, entities_conflict, jaccard, shingles
+
+NEAR_DUPLICATES = [
+    ("Fed holds interest rates steady amid inflation worries",
+     "Fed holds interest rates steady as inflation worries persist"),
+    ("Apple unveils new iPhone with satellite messaging",
+     "Apple unveils iPhone with satellite messaging feature"),
+    ("Supreme Court hears arguments on abortion pill access",
+     "Supreme Court hears arguments over abortion pill access"),
+    ("OpenAI releases new reasoning model for developers",
+     "OpenAI releases reasoning model to developers"),
+    ("Israel and Hamas agree to ceasefire in Gaza",
+     "Israel, Hamas agree to Gaza ceasefire"),
+]
+
+DISTINCT = [
+    ("Fed holds interest rates steady amid inflation worries",
+     "ECB holds interest rates steady"),
+    ("Bank of England cuts rates for first time since 2020",
+     "Fed cuts rates for first time since 2020"),
+    ("Senate passes defense spending bill",
+     "House passes defense spending bill"),
+    ("Tesla shares fall after quarterly deliveries miss",
+     "Nvidia shares fall after quarterly earnings miss"),
+    ("Wildfire forces evacuations in southern California",
+     "Central bank raises rates to fight inflation"),
+]
+
+
+def test_near_duplicates_are_claimed_once():
+    for first, second in NEAR_DUPLICATES:
+        index = TopicIndex()
+        assert index.claim(first, 'politics') is None
+        duplicate = index.claim(second, 'world')
+        assert duplicate is not None, (first, second)
+        assert duplicate[0] == f"politics topic: {first}"
+        assert duplicate[1] >= index.threshold
+
+
+def test_distinct_topics_are_not_duplicates():
+    for first, second in DISTINCT:
+        index = TopicIndex()
+        assert index.claim(first, 'economics') is None
+        assert index.claim(second, 'world') is None, (first, second)
+
+
+def test_same_words_different_entity_across_sections():
+    index = TopicIndex()
+    assert index.claim("Fed holds interest rates steady amid inflation worries", 'economics') is None
+    assert index.claim("ECB holds interest rates steady", 'world') is None
+    assert index.stats == {'checked': 2, 'duplicates': 0}
+
+
+def test_recent_article_titles_are_indexed():
+    index = TopicIndex()
+    index.add("Apple unveils new iPhone with satellite messaging", "tech article: iPhone")
+    assert index.find_duplicate("Apple unveils iPhone with satellite messaging feature")[0] == "tech article: iPhone"
+    assert index.find_duplicate("Samsung cuts smartphone prices in Europe") is None
+
+
+def test_shingles_fold_plurals_and_add_bigrams():
+    assert shingles("The rates rise") == {'rate', 'rise', 'rate rise'}
+    assert jaccard(shingles("rates rise"), shingles("rate rises")) == 1.0
+    assert jaccard(set(), {'a'}) == 0.0
+
+
+def test_entities_ignore_title_case():
+    assert entities("ECB holds interest rates steady") == {'ecb'}
+    assert entities("Fed Holds Interest Rates Steady") is None
+    assert entities_conflict({'ecb'}, {'fed'})
+    assert not entities_conflict({'fed'}, {'fed', 'reserve'})
+    assert not entities_conflict(None, {'fed'})
@@ -7,6 +7,8 @@ interface GeneratedImage {
     prompt?: string;
     source: "extracted" | "gemini" | "dalle";
     sourceDomain?: string;
+    width?: number | null;
+    height?: number | null;
 }
 
 interface ImagePreviewModalProps {
@@ -63,6 +65,8 @@ const ImagePreview = ({
                 <img
                     src={image.url || `data:image/png;base64,${image.base64}`}
                     alt={`Option ${image.id}`}
+                    width={image.width ?? undefined}
+                    height={image.height ?? undefined}
                     className="w-full h-full object-cover"
                 />
             ) : (
@@ -33,6 +33,8 @@ interface GeneratedImage {
   prompt?: string
   source: 'extracted' | 'gemini' | 'dalle'
   sourceDomain?: string
+  width?: number | null
+  height?: number | null
 }
 
 const SECTIONS = [
@@ -83,6 +85,7 @@ export default function AdminPage() {
   const [selectedImageIndex, setSelectedImageIndex] = useState<number | null>(null)
   const [showImageModal, setShowImageModal] = useState(false)
   const [imageCaption, setImageCaption] = useState('')
+  const [prefetchedImagesFor, setPrefetchedImagesFor] = useState<string | null>(null)
   
   // Lead story state
   const [leadArticleId, setLeadArticleId] = useState<string | null>(null)
@@ -243,19 +246,26 @@ export default function AdminPage() {
     setSelectedImageIndex(null)
     setStatus('Getting images: Extracting → Gemini → DALL-E')
     
+    // Asking again after seeing the prefetched set means the editor wants fresh ones
+    const refresh = prefetchedImagesFor === selectedArticle.id
+    
     try {
       const data = await imagesApi.generateImages(
         selectedArticle.title,
         selectedArticle.excerpt,
         selectedArticle.section,
-        selectedArticle.sources
+        selectedArticle.sources,
+        selectedArticle.id,
+        refresh
       )
       
       if (data.success && data.images) {
         setGeneratedImages(data.images)
         setShowImageModal(true)
+        setPrefetchedImagesFor(data.prefetched ? selectedArticle.id : null)
         const b = data.breakdown || {}
-        setStatus(`Got ${data.images.length} images (${b.extracted || 0} extracted, ${b.gemini || 0} Gemini, ${b.dalle || 0} DALL-E)`)
+        const origin = data.prefetched ? 'Loaded prefetched' : 'Got'
+        setStatus(`${origin} ${data.images.length} images (${b.extracted || 0} extracted, ${b.gemini || 0} Gemini, ${b.dalle || 0} DALL-E)${data.prefetched ? ' - get images again for a fresh set' : ''}`)
       } else {
         setError(data.message || 'Failed to generate images')
       }
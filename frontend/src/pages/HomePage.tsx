@@ -22,19 +22,14 @@ const HomePage = () => {
 
   const loadArticles = async () => {
     try {
-      const [lead, allArticles, opinionArticles, satire, latestHeadlines] = await Promise.all([
-        articlesApi.getLeadArticle(),
-        articlesApi.getArticles({ limit: 12 }),
-        articlesApi.getArticles({ section: 'opinion', limit: 8 }),
-        articlesApi.getArticles({ section: 'satire', limit: 4 }),
-        articlesApi.getArticles({ limit: 10 }),
-      ])
+      const frontpage = await articlesApi.getFrontpage()
+      const rail = (ids: string[]) => ids.map(id => frontpage.articles[id]).filter(Boolean)
 
-      setLeadStory(lead)
-      setArticles(allArticles)
-      setOpinions(opinionArticles)
-      setSatireArticles(satire)
-      setHeadlines(latestHeadlines)
+      setLeadStory(frontpage.lead)
+      setArticles(rail(frontpage.top))
+      setOpinions(rail(frontpage.opinion))
+      setSatireArticles(rail(frontpage.satire))
+      setHeadlines(rail(frontpage.headlines))
     } catch (error) {
       console.error('Failed to load articles:', error)
     } finally {
@@ -55,15 +55,29 @@ export const authApi = {
   },
 }
 
+// Article projections served by list endpoints
+export type ArticleView = 'card' | 'summary' | 'full'
+
+export interface Frontpage {
+  lead: any | null
+  articles: Record<string, any>
+  top: string[]
+  headlines: string[]
+  opinion: string[]
+  satire: string[]
+}
+
 // Articles API
 export const articlesApi = {
-  getArticles: async (params?: { section?: string; limit?: number; status?: string }) => {
+  // view: 'card' (default, no body/sources), 'summary' or 'full'
+  getArticles: async (params?: { section?: string; limit?: number; status?: string; view?: ArticleView }) => {
     const { data } = await api.get('/articles', { params })
     return data.articles
   },
   
   getDrafts: async () => {
-    const { data } = await api.get('/articles', { params: { status: 'draft' } })
+    // The editor needs body and sources
+    const { data } = await api.get('/articles', { params: { status: 'draft', view: 'full' } })
     return data.articles
   },
   
@@ -87,6 +101,12 @@ export const articlesApi = {
     return data.article
   },
   
+  // Lead story and homepage rails in one request; rails hold ids into `articles`
+  getFrontpage: async (): Promise<Frontpage> => {
+    const { data } = await api.get('/frontpage')
+    return data
+  },
+  
   getLeadArticleId: async () => {
     try {
       const { data } = await api.get('/settings/lead-article')
@@ -175,6 +195,26 @@ export const usersApi = {
   },
 }
 
+// Agent runs are queued server-side; poll the job until it finishes
+const JOB_POLL_INTERVAL_MS = 3000
+
+async function waitForAgentJob(jobId: string) {
+  while (true) {
+    const { data } = await api.get(`/agents/jobs/${jobId}`)
+    const job = data.job
+    if (job.status === 'success' || job.status === 'error') {
+      return {
+        success: job.status === 'success',
+        articles_created: job.articles_created,
+        errors: job.errors,
+        error: job.errors?.[0],
+        job,
+      }
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+  }
+}
+
 // Agents API (Admin)
 export const agentsApi = {
   runAgent: async (section: string, wordCount?: number, writingStyle?: string, topic?: string) => {
@@ -184,7 +224,8 @@ export const agentsApi = {
       writing_style: writingStyle, 
       topic 
     })
-    return data
+    if (!data.job_id) return data
+    return waitForAgentJob(data.job_id)
   },
   
   runAllAgents: async (wordCount?: number, writingStyle?: string) => {
@@ -192,7 +233,23 @@ export const agentsApi = {
       word_count: wordCount, 
       writing_style: writingStyle 
     })
-    return data
+    if (!data.job_id) return data
+    return waitForAgentJob(data.job_id)
+  },
+  
+  regenerateArticle: async (articleId: string, wordCount?: number, writingStyle?: string) => {
+    const { data } = await api.post('/agents/regenerate', {
+      article_id: articleId,
+      word_count: wordCount,
+      writing_style: writingStyle
+    })
+    if (!data.job_id) return data
+    return waitForAgentJob(data.job_id)
+  },
+  
+  getJob: async (jobId: string) => {
+    const { data } = await api.get(`/agents/jobs/${jobId}`)
+    return data.job
   },
   
   getAgentStatus: async () => {
@@ -203,8 +260,16 @@ export const agentsApi = {
 
 // Images API (Admin)
 export const imagesApi = {
-  generateImages: async (title: string, excerpt: string, section: string, sources?: Array<{url: string; title?: string}>) => {
-    const { data } = await api.post('/images/generate', { title, excerpt, section, sources })
+  // Returns candidates prefetched for the article when available unless refresh is set
+  generateImages: async (
+    title: string,
+    excerpt: string,
+    section: string,
+    sources?: Array<{url: string; title?: string}>,
+    articleId?: string,
+    refresh = false
+  ) => {
+    const { data } = await api.post('/images/generate', { title, excerpt, section, sources, articleId, refresh })
     return data
   },
   